@@ -0,0 +1,328 @@
+"""Command line interface: plan, build LCIs (optionally in shards), run LCIA and sensitivities, diff, export and serve results and build premise databases.
+
+Selections are read from a JSON run config (see RunConfig); routes, products, scenarios and
+locations may be given by enum name or value. Heavy packages (bw2data, bw2calc, bw2io, premise)
+are only imported by the subcommands that need them.
+"""
+import argparse
+import json
+import os
+import sys
+from enum import Enum
+from pathlib import Path
+from typing import List, Optional
+
+# Workarounds for native library crashes on Windows (MKL/Numba/OpenMP)
+os.environ.setdefault("NUMBA_DISABLE_JIT", "1")
+os.environ.setdefault("MKL_THREADING_LAYER", "SEQUENTIAL")
+os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
+
+from code_folder.helpers.constants import (
+    PROJECT_NAME,
+    RESULTS_SERVICE_CACHE_SIZE,
+    RESULTS_SERVICE_HOST,
+    RESULTS_SERVICE_PORT,
+    Location,
+    Product,
+    Route,
+    RunConfig,
+    Scenario,
+)
+
+CONFIG_ENUMS = {"routes": Route, "products": Product, "scenarios": Scenario, "locations": Location}
+INVENTORIES_HELP = "Also store the biosphere inventories of every LCI, for lcia --recharacterize and export --system-processes (same as store_inventories in the run config)"
+
+
+def _parse_enum(enum_class, value) -> Enum:
+    """Accept an enum member by name (e.g. "PYRO_HYDRO") or by value (e.g. "BATT_LIBToPyro1")."""
+    if value in enum_class.__members__:
+        return enum_class[value]
+    try:
+        return enum_class(value)
+    except ValueError:
+        raise ValueError(f"Unknown {enum_class.__name__} '{value}'. Use one of: {', '.join(enum_class.__members__)}") from None
+
+
+def load_run_config(path: Optional[Path] = None) -> RunConfig:
+    """Read a JSON run config; keys left out keep their RunConfig default."""
+    if path is None:
+        return RunConfig()
+    with open(path, "r", encoding="utf-8") as f:
+        return load_run_config_dict(json.load(f))
+
+
+def load_run_config_dict(raw: dict) -> RunConfig:
+    """RunConfig of a parsed JSON run config."""
+    raw = dict(raw)
+    unknown = set(raw) - set(RunConfig.__dataclass_fields__)
+    if unknown:
+        raise ValueError(f"Unknown run config keys: {', '.join(sorted(unknown))}")
+    for key, enum_class in CONFIG_ENUMS.items():
+        if key in raw:
+            raw[key] = [_parse_enum(enum_class, value) for value in raw[key]]
+    if "years" in raw:
+        raw["years"] = [int(year) for year in raw["years"]]
+    if "lcia_methods" in raw:
+        raw["lcia_methods"] = [tuple(method) for method in raw["lcia_methods"]]
+    return RunConfig(**raw)
+
+
+def _new_builder(config: RunConfig):
+    import bw2data as bd
+    from code_folder.helpers.lca_builder import LCABuilder
+
+    bd.projects.set_current(PROJECT_NAME)
+    return LCABuilder(database_name=config.database_name, use_superstructure=config.use_superstructure, partition_by_background=config.partition_by_background)
+
+
+def _run_lcia(lca_builder, config: RunConfig) -> None:
+    lca_builder.run_lcia(lcia_methods=config.lcia_methods, store_inventories=config.store_inventories)
+    lca_builder.save_lcia_results()
+    lca_builder.export_lcia_results_to_excel(lcia_methods=config.lcia_methods)
+
+
+def cmd_plan(args, config: RunConfig) -> None:
+    from code_folder.helpers.run_planner import RunPlanner
+
+    plan = RunPlanner.plan(
+        route_selection=config.routes,
+        product_selection=config.products,
+        year_selection=config.years,
+        scenario_selection=config.scenarios,
+        location_selection=config.locations,
+        use_superstructure=config.use_superstructure,
+    )
+    RunPlanner.print_plan(plan, show_jobs=args.jobs)
+
+
+def cmd_build(args, config: RunConfig) -> None:
+    import bw2data as bd
+
+    bd.projects.set_current(PROJECT_NAME)
+    # If a previous version of the database (or of its per-background partitions) exists, remove it completely
+    for database_name in [name for name in bd.databases if name == config.database_name or name.startswith(f"{config.database_name}__")]:
+        bd.Database(database_name).deregister()
+
+    lca_builder = _new_builder(config)
+    if args.pipeline:
+        lca_builder.run_pipelined(
+            product_selection=config.products,
+            route_selection=config.routes,
+            year_selection=config.years,
+            scenario_selection=config.scenarios,
+            location_selection=config.locations,
+            add_scrap=config.add_scrap,
+            lcia_methods=config.lcia_methods,
+            prefetch=args.prefetch,
+            store_inventories=config.store_inventories,
+        )
+        if config.store_inventories:
+            # Saved with the results they match, for lcia --recharacterize
+            lca_builder.save_lcia_results()
+        lca_builder.export_lcia_results_to_excel(lcia_methods=config.lcia_methods)
+        if not args.no_excel:
+            lca_builder.save_database_to_excel()
+        return
+
+    lca_builder.build_all_lcis(
+        product_selection=config.products,
+        route_selection=config.routes,
+        year_selection=config.years,
+        scenario_selection=config.scenarios,
+        location_selection=config.locations,
+        add_scrap=config.add_scrap,
+    )
+    lca_builder.save_lcis()
+    if not args.no_excel:
+        lca_builder.save_database_to_excel()
+    if args.lcia:
+        _run_lcia(lca_builder, config)
+
+
+def cmd_lcia(args, config: RunConfig) -> None:
+    lca_builder = _new_builder(config)
+    if args.recharacterize:
+        lca_builder.recharacterize(lcia_methods=config.lcia_methods)
+        lca_builder.save_lcia_results()
+        lca_builder.export_lcia_results_to_excel(lcia_methods=config.lcia_methods)
+        return
+    lca_builder.load_latest_lcis()
+    _run_lcia(lca_builder, config)
+
+
+def cmd_sensitivity(args, config: RunConfig) -> None:
+    lca_builder = _new_builder(config)
+    lca_builder.load_latest_lcis()
+    lca_builder.run_sensitivity(lcia_methods=config.lcia_methods)
+    lca_builder.save_sensitivity_results()
+
+
+def cmd_export(args, config: RunConfig) -> None:
+    from code_folder.helpers.storage_helper import StorageHelper
+
+    if args.system_processes:
+        _new_builder(config).export_system_processes()
+    if args.database:
+        import bw2data as bd
+
+        bd.projects.set_current(PROJECT_NAME)
+        StorageHelper.save_database_to_excel(bd.Database(config.database_name))
+    lcia_results = StorageHelper.load_latest_lcia_results()
+    if lcia_results:
+        StorageHelper.save_lcia_results_to_excel(lcia_results, config.lcia_methods)
+
+
+def cmd_shard_plan(args, config: RunConfig) -> None:
+    from code_folder.helpers.shard_manifest import ShardManifest
+
+    ShardManifest.create(config, shard_by=args.by)
+
+
+def cmd_shard_run(args, config: RunConfig) -> None:
+    from code_folder.helpers.shard_manifest import ShardManifest
+
+    if args.local:
+        returncodes = ShardManifest.run_local(args.manifest, workers=args.workers, shard_ids=args.shards or None)
+        failed = any(returncodes.values())
+    else:
+        if not args.shards:
+            raise ValueError("Give the shard ids to run, or --local to run all shards of the manifest")
+        failed = any([ShardManifest.run_shard(args.manifest, shard_id) for shard_id in args.shards])
+    if failed:
+        sys.exit(1)
+
+
+def cmd_shard_merge(args, config: RunConfig) -> None:
+    import bw2data as bd
+    from code_folder.helpers.shard_manifest import ShardManifest
+
+    manifest = ShardManifest.load(args.manifest)
+    config = load_run_config_dict(manifest["config"])
+    bd.projects.set_current(PROJECT_NAME)
+    for database_name in [name for name in bd.databases if name == config.database_name or name.startswith(f"{config.database_name}__")]:
+        bd.Database(database_name).deregister()
+
+    lca_builder = _new_builder(config)
+    lca_builder.load_shard_results(args.manifest)
+    lca_builder.save_lcis()
+    lca_builder.save_lcia_results()
+    lca_builder.export_lcia_results_to_excel(lcia_methods=config.lcia_methods)
+    if not args.no_excel:
+        lca_builder.save_database_to_excel()
+
+
+def cmd_diff(args, config: RunConfig) -> None:
+    from code_folder.helpers.run_diff import RunDiff
+    from code_folder.helpers.storage_helper import StorageHelper
+
+    run_files = args.runs or StorageHelper.latest_lcia_run_files(count=2)
+    if len(run_files) != 2:
+        raise ValueError("Give two run files (lci_run_*.pkl or lcia_run_*.pkl), or save at least two LCIA runs to compare the latest ones")
+    summary, exchanges, scores = RunDiff.diff(StorageHelper.load_run(run_files[0]), StorageHelper.load_run(run_files[1]), rel_tol=args.rel_tol, abs_tol=args.abs_tol)
+
+    counts = summary["Status"].value_counts()
+    print(f"📋 {len(summary)} LCIs: " + ", ".join(f"{counts.get(status, 0)} {status}" for status in ("changed", "kept", "added", "removed")))
+    print(f"   {len(exchanges)} exchanges and {len(scores)} scores differ (rel_tol={args.rel_tol}, abs_tol={args.abs_tol})")
+    if len(scores):
+        largest = scores.reindex(scores["Relative delta"].abs().sort_values(ascending=False).index).head(args.top)
+        print(largest[["RecyclingRoute", "Product", "Year", "Scenario", "Impact_type", "Method", "Score old", "Score new", "Relative delta"]].to_string(index=False))
+    if not args.no_excel:
+        StorageHelper.save_run_diff(summary, exchanges, scores)
+
+
+def cmd_serve(args, config: RunConfig) -> None:
+    from code_folder.helpers.results_service import ResultsIndex, ResultsService
+
+    ResultsService.serve(ResultsIndex(run_path=args.run, cache_size=args.cache_size), host=args.host, port=args.port, reload_interval=args.reload_interval)
+
+
+def cmd_premise(args, config: RunConfig) -> None:
+    from code_folder.premise_superstructure import build_superstructure_db
+
+    build_superstructure_db(
+        write_scenario_databases=not args.superstructure_only,
+        max_workers=args.workers,
+        force=args.force,
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="lca-futuram", description="Build LCIs and LCIA results from FutuRaM MFA data with Brightway.")
+    parser.add_argument("-c", "--config", type=Path, help="JSON run config with selections (defaults to the battery deliverable run)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan = subparsers.add_parser("plan", help="Print the LCIs a run would build, without touching Brightway")
+    plan.add_argument("--jobs", action="store_true", help="List every planned LCI")
+    plan.set_defaults(func=cmd_plan)
+
+    build = subparsers.add_parser("build", help="(Re)create the foreground database and build all LCIs")
+    build.add_argument("--lcia", action="store_true", help="Also run LCIA and export the results")
+    build.add_argument("--no-excel", action="store_true", help="Skip the Brightway Excel export of the database")
+    build.add_argument("--pipeline", action="store_true", help="Build, write and score one (scenario, year) partition at a time (always runs LCIA)")
+    build.add_argument("--prefetch", type=int, default=1, help="Partitions whose inputs are read ahead in pipelined mode")
+    build.add_argument("--inventories", action="store_true", help=INVENTORIES_HELP)
+    build.set_defaults(func=cmd_build)
+
+    lcia = subparsers.add_parser("lcia", help="Run LCIA on the latest saved LCIs and export the results")
+    lcia.add_argument("--recharacterize", action="store_true", help="Score the configured methods from the latest saved biosphere inventories, without solving")
+    lcia.add_argument("--inventories", action="store_true", help=INVENTORIES_HELP)
+    lcia.set_defaults(func=cmd_lcia)
+
+    sensitivity = subparsers.add_parser("sensitivity", help="Rank the lci_builder amounts and Stock/Flow IDs of the latest saved LCIs by their influence on the scores")
+    sensitivity.set_defaults(func=cmd_sensitivity)
+
+    export = subparsers.add_parser("export", help="Export the latest saved LCIA results to Excel")
+    export.add_argument("--database", action="store_true", help="Also export the foreground database in Brightway Excel format")
+    export.add_argument("--system-processes", action="store_true", help="Also export the main and avoided activities as aggregated system processes")
+    export.set_defaults(func=cmd_export)
+
+    diff = subparsers.add_parser("diff", help="Compare two runs per LCI, exchange and score (default: the two latest LCIA runs)")
+    diff.add_argument("runs", nargs="*", type=Path, help="Old and new lci_run_*.pkl or lcia_run_*.pkl file")
+    diff.add_argument("--rel-tol", type=float, default=1e-6, help="Relative tolerance below which values count as unchanged")
+    diff.add_argument("--abs-tol", type=float, default=0.0, help="Absolute tolerance below which values count as unchanged")
+    diff.add_argument("--top", type=int, default=10, help="Largest score changes to print")
+    diff.add_argument("--no-excel", action="store_true", help="Only print the summary")
+    diff.set_defaults(func=cmd_diff)
+
+    serve = subparsers.add_parser("serve", help="Serve the scores and contributions of the latest (or a pinned) LCIA run over local HTTP")
+    serve.add_argument("--run", type=Path, help="lcia_run_*.pkl file or pipeline_run_* folder to serve instead of the latest run")
+    serve.add_argument("--host", default=RESULTS_SERVICE_HOST, help="Address to bind (default: localhost only)")
+    serve.add_argument("--port", type=int, default=RESULTS_SERVICE_PORT)
+    serve.add_argument("--cache-size", type=int, default=RESULTS_SERVICE_CACHE_SIZE, help="Query responses kept in memory")
+    serve.add_argument("--reload-interval", type=float, default=10.0, help="Seconds between checks for new runs and partitions")
+    serve.set_defaults(func=cmd_serve)
+
+    shard = subparsers.add_parser("shard", help="Split a run into shards, run them as separate processes and merge their results")
+    shard_commands = shard.add_subparsers(dest="shard_command", required=True)
+    shard_plan = shard_commands.add_parser("plan", help="Write a manifest with one run config per shard")
+    shard_plan.add_argument("--by", choices=["route", "scenario_year"], default="route", help="Shard per route or per (scenario, year)")
+    shard_plan.set_defaults(func=cmd_shard_plan)
+    shard_run = shard_commands.add_parser("run", help="Build and score shards of a manifest into their own output folders")
+    shard_run.add_argument("manifest", type=Path)
+    shard_run.add_argument("shards", nargs="*", help="Shard ids to run (e.g. shard_003)")
+    shard_run.add_argument("--local", action="store_true", help="Run the given (default: all) shards as local processes")
+    shard_run.add_argument("--workers", type=int, default=1, help="Shards run at the same time with --local, each in its own project copy")
+    shard_run.set_defaults(func=cmd_shard_run)
+    shard_merge = shard_commands.add_parser("merge", help="Merge the LCIs, LCIA results and databases of all shards into one run")
+    shard_merge.add_argument("manifest", type=Path)
+    shard_merge.add_argument("--no-excel", action="store_true", help="Skip the Brightway Excel export of the merged database")
+    shard_merge.set_defaults(func=cmd_shard_merge)
+
+    premise = subparsers.add_parser("premise", help="Build the premise scenario and superstructure databases")
+    premise.add_argument("--workers", type=int, default=None, help="Parallel premise processes (default: PREMISE_MAX_WORKERS or 2)")
+    premise.add_argument("--force", action="store_true", help="Rebuild databases that are up to date")
+    premise.add_argument("--superstructure-only", action="store_true", help="Skip writing one database per scenario")
+    premise.set_defaults(func=cmd_premise)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    config = load_run_config(args.config)
+    if getattr(args, "inventories", False):
+        config.store_inventories = True
+    args.func(args, config)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+from typing import Dict, Iterable, List
+
+import bw2calc as bc
+import bw2data as bd
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+from code_folder.helpers.constants import INVENTORY_SOLVE_CHUNK_SIZE, ExchangeTerm
+
+
+class BackgroundSolver:
+    """
+    Factorize a technosphere matrix once and reuse it for many demands and LCIA methods.
+
+    Per-unit scores of every product in the matrix come from a single transposed (adjoint)
+    solve with all methods as right-hand sides, so scoring a foreground exchange is a lookup.
+    """
+    def __init__(self, technosphere_matrix, biosphere_matrix, characterization_vectors: Dict[tuple, np.ndarray], product_index: Dict[tuple, int], activity_index: Dict[tuple, int], biosphere_index: Dict[tuple, int]):
+        self.technosphere_matrix = technosphere_matrix.tocsc()
+        self.biosphere_matrix = biosphere_matrix.tocsr()
+        self.methods: List[tuple] = list(characterization_vectors)
+        self.characterization = np.column_stack([np.asarray(characterization_vectors[method], dtype=float) for method in self.methods])
+        self.product_index = product_index
+        self.activity_index = activity_index
+        self.biosphere_index = biosphere_index
+        self._factorization = None
+        self._unit_scores = None
+
+    @classmethod
+    def from_activities(cls, activities: Iterable, lcia_methods: List[tuple]) -> "BackgroundSolver":
+        """Build the matrices of all databases the given activities depend on, without solving them."""
+        lca = bc.LCA({activity: 1 for activity in activities}, lcia_methods[0])
+        lca.load_lci_data()
+        characterization_vectors = {}
+        for method in lcia_methods:
+            if method != lca.method:
+                lca.switch_method(method)
+            else:
+                lca.load_lcia_data()
+            characterization_vectors[method] = lca.characterization_matrix.diagonal()
+        lca.remap_inventory_dicts()
+        return cls(
+            technosphere_matrix=lca.technosphere_matrix,
+            biosphere_matrix=lca.biosphere_matrix,
+            characterization_vectors=characterization_vectors,
+            product_index=dict(lca.dicts.product),
+            activity_index=dict(lca.dicts.activity),
+            biosphere_index=dict(lca.dicts.biosphere),
+        )
+
+    @classmethod
+    def from_database(cls, database_name: str, lcia_methods: List[tuple]) -> "BackgroundSolver":
+        """Build a solver covering a (foreground) database and everything it links to."""
+        return cls.from_activities(bd.Database(database_name), lcia_methods)
+
+    @property
+    def factorization(self):
+        """LU factorization of the technosphere matrix, computed on first use."""
+        if self._factorization is None:
+            self._factorization = splu(self.technosphere_matrix)
+        return self._factorization
+
+    @property
+    def unit_scores(self) -> np.ndarray:
+        """Score of one unit of each product for each method (n_products x n_methods)."""
+        if self._unit_scores is None:
+            characterized_biosphere = np.asarray(self.biosphere_matrix.T @ self.characterization)
+            self._unit_scores = self.factorization.solve(characterized_biosphere, trans="T")
+        return self._unit_scores
+
+    def method_labels(self) -> List[str]:
+        """Labels used as keys in SingleLCIAResult, one per method."""
+        return [method[1] for method in self.methods]
+
+    def exchange_unit_scores(self, input_key: tuple, exchange_type: str) -> np.ndarray:
+        """Score per unit of a technosphere input or biosphere flow, for each method."""
+        if exchange_type == "biosphere":
+            return self.characterization[self.biosphere_index[input_key]]
+        return self.unit_scores[self.product_index[input_key]]
+
+    def term_unit_scores(self, terms: List[ExchangeTerm]) -> np.ndarray:
+        """Per-unit scores of the inputs of a list of exchange terms (n_terms x n_methods)."""
+        if not terms:
+            return np.zeros((0, len(self.methods)))
+        return np.vstack([self.exchange_unit_scores(term.input, term.type) for term in terms])
+
+    def activity_scores(self, activity_key: tuple, demand: float = -1) -> np.ndarray:
+        """Scores for a demand of an activity in the matrix, for each method."""
+        return demand * self.unit_scores[self.product_index[activity_key]]
+
+    def foreground_scores(self, activity_key: tuple, foreground: Dict[tuple, dict], demand: float = -1) -> np.ndarray:
+        """Scores for a demand of an activity that is not in the matrix, from its exchanges in ``foreground``.
+
+        Inputs must be in the matrix or be other (acyclic) activities of ``foreground``.
+        """
+        return demand * self._foreground_unit_scores(activity_key, foreground)
+
+    def _foreground_unit_scores(self, activity_key: tuple, foreground: Dict[tuple, dict]) -> np.ndarray:
+        """Score per unit of product of a foreground activity: the scores of its exchanges divided by its production."""
+        production, total = 0.0, np.zeros(len(self.methods))
+        for exchange in foreground[activity_key]["exchanges"]:
+            if exchange["type"] == "production":
+                production += exchange["amount"]
+            elif exchange["type"] == "biosphere" or exchange["input"] in self.product_index:
+                total += exchange["amount"] * self.exchange_unit_scores(exchange["input"], exchange["type"])
+            else:
+                total += exchange["amount"] * self._foreground_unit_scores(exchange["input"], foreground)
+        return total / production
+
+    def inventories(self, activity_keys: List[tuple], foreground: Dict[tuple, dict] = None, demand: float = -1, chunk_size: int = INVENTORY_SOLVE_CHUNK_SIZE) -> sparse.csc_matrix:
+        """Aggregated biosphere inventories (n_biosphere x n_activities) for a demand of each activity, in batched solves.
+
+        Activities not in the matrix are expanded through their exchanges in ``foreground``. Demands are
+        solved ``chunk_size`` columns at a time, so the dense demand and supply arrays stay at
+        n_products x chunk_size however many activities are given.
+        """
+        chunks = [sparse.csc_matrix((len(self.biosphere_index), 0))]
+        for start in range(0, len(activity_keys), chunk_size):
+            chunk_keys = activity_keys[start:start + chunk_size]
+            product_demands = np.zeros((len(self.product_index), len(chunk_keys)))
+            direct_flows = np.zeros((len(self.biosphere_index), len(chunk_keys)))
+            for column, activity_key in enumerate(chunk_keys):
+                self._add_demand(activity_key, demand, foreground or {}, product_demands[:, column], direct_flows[:, column])
+            chunks.append(sparse.csc_matrix(self.biosphere_matrix @ self.solve(product_demands) + direct_flows))
+        return sparse.hstack(chunks, format="csc")
+
+    def _add_demand(self, activity_key: tuple, demand: float, foreground: Dict[tuple, dict], product_demand: np.ndarray, direct_flows: np.ndarray) -> None:
+        """Add the demand for an activity to a product demand vector, expanding foreground activities into their inputs and flows."""
+        if activity_key in self.product_index:
+            product_demand[self.product_index[activity_key]] += demand
+            return
+        exchanges = foreground[activity_key]["exchanges"]
+        scaling = demand / sum(exchange["amount"] for exchange in exchanges if exchange["type"] == "production")
+        for exchange in exchanges:
+            if exchange["type"] == "biosphere":
+                direct_flows[self.biosphere_index[exchange["input"]]] += scaling * exchange["amount"]
+            elif exchange["type"] != "production":
+                self._add_demand(exchange["input"], scaling * exchange["amount"], foreground, product_demand, direct_flows)
+
+    def solve(self, demand_matrix: np.ndarray) -> np.ndarray:
+        """Supply arrays for one or many demand vectors (columns), reusing the factorization."""
+        return self.factorization.solve(np.asarray(demand_matrix, dtype=float))
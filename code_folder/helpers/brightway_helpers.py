@@ -1,25 +1,51 @@
+from __future__ import annotations
+
 import uuid
-from collections import OrderedDict
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from code_folder.helpers.constants import (
     ExternalDatabase,
+    LOOKUP_CACHE_POLICY,
+    LOOKUP_CACHE_SIZES,
     Scenario,
     SCENARIO_DATABASE_YEARS,
+    SCENARIO_MAP,
     SCRAP_DATABASE_NAME,
 )
-import bw2data as bd
+from code_folder.helpers.lookup_cache import LookupCache, LookupTable
+
+if TYPE_CHECKING:
+    # Only used in annotations; importing bw2data is slow and not needed to resolve names
+    import bw2data as bd
 
 class BrightwayHelpers:
-    _ecoinvent_cache: OrderedDict = OrderedDict()
-    _biosphere_cache: OrderedDict = OrderedDict()
+    _ecoinvent_cache = LookupCache(max_size=LOOKUP_CACHE_SIZES["ecoinvent"], policy=LOOKUP_CACHE_POLICY)
+    _biosphere_cache = LookupCache(max_size=LOOKUP_CACHE_SIZES["biosphere"], policy=LOOKUP_CACHE_POLICY)
+    # Misses of the in-process caches are looked up in a memory-mapped table shared by all processes
+    use_lookup_tables = True
 
     @staticmethod
-    def build_base_process(name: str, database_name: str, is_waste: Optional[bool] = False):
-        """Create a minimal Brightway process with a production exchange.
+    def configure_lookup_caches(ecoinvent_size: Optional[int] = LOOKUP_CACHE_SIZES["ecoinvent"], biosphere_size: Optional[int] = LOOKUP_CACHE_SIZES["biosphere"], policy: str = LOOKUP_CACHE_POLICY, use_lookup_tables: bool = True) -> None:
+        """Replace the in-process lookup caches (``None`` sizes are unbounded) and switch the shared lookup tables on or off."""
+        BrightwayHelpers._ecoinvent_cache = LookupCache(max_size=ecoinvent_size, policy=policy)
+        BrightwayHelpers._biosphere_cache = LookupCache(max_size=biosphere_size, policy=policy)
+        BrightwayHelpers.use_lookup_tables = use_lookup_tables
+
+    @staticmethod
+    def lookup_cache_stats() -> Dict[str, dict]:
+        """Hit/miss counters of the in-process caches and of the lookup tables opened by this process."""
+        return {
+            "ecoinvent": BrightwayHelpers._ecoinvent_cache.stats(),
+            "biosphere": BrightwayHelpers._biosphere_cache.stats(),
+            "tables": LookupTable.stats(),
+        }
+
+    @staticmethod
+    def build_base_process(name: str, database_name: str, is_waste: Optional[bool] = False, code: Optional[str] = None):
+        """Create a minimal Brightway process with a production exchange, with a random code unless one is given.
 
         Returns (process_id, process_dict_fragment) suitable for Database.write.
         """
-        process_id = str(uuid.uuid4())
+        process_id = code or str(uuid.uuid4())
         return process_id, {
             (database_name, process_id): {
                 "name": name,
@@ -73,19 +99,44 @@ class BrightwayHelpers:
         return {
         "input": input,
         "name": process_name,
-        "amount": amount * (1 if database in [ExternalDatabase.ECOINVENT,ExternalDatabase.SCRAP] else -1) * (1 if flow_direction == "input" else -1),
+        "amount": amount * BrightwayHelpers.exchange_sign(database=database, flow_direction=flow_direction),
         "unit": unit,
         "type": "technosphere" if database in [ExternalDatabase.ECOINVENT,ExternalDatabase.SCRAP] else "biosphere",
         "location": location
     }
 
+    @staticmethod
+    def activity_fingerprint(activity: dict) -> tuple:
+        """Sorted (input, type, amount) of the non-production exchanges of a process dict, ignoring its name and code."""
+        production_amount = next(exchange["amount"] for exchange in activity["exchanges"] if exchange["type"] == "production")
+        return (production_amount,) + tuple(sorted(
+            (tuple(exchange["input"]), exchange["type"], round(float(exchange["amount"]), 12))
+            for exchange in activity["exchanges"]
+            if exchange["type"] != "production"
+        ))
+
+    @staticmethod
+    def exchange_sign(database: ExternalDatabase, flow_direction: str) -> float:
+        """Sign applied to an exchange amount: technosphere inputs and biosphere outputs are positive."""
+        return (1 if database in [ExternalDatabase.ECOINVENT,ExternalDatabase.SCRAP] else -1) * (1 if flow_direction == "input" else -1)
+
     @staticmethod
     def find_external_db_key_by_name(name, database: bd.Database, location, reference_product: Optional[str] = None):
         """Find (database_name, code) for an ecoinvent activity by exact name/location and optional reference product."""
         cache_key = (database.name, name.strip(), location.strip(), reference_product.strip() if reference_product else None)
-        if cache_key in BrightwayHelpers._ecoinvent_cache:
-            BrightwayHelpers._ecoinvent_cache.move_to_end(cache_key)
-            return BrightwayHelpers._ecoinvent_cache[cache_key]
+        result = BrightwayHelpers._ecoinvent_cache.get(cache_key)
+        if result is not None:
+            return result
+
+        table = LookupTable.for_database(database) if BrightwayHelpers.use_lookup_tables else None
+        if table is not None:
+            code = table.get(LookupTable.activity_key(name, location))
+            if code is None and reference_product and table.is_ambiguous(LookupTable.activity_key(name, location)):
+                code = table.get(LookupTable.activity_key(name, location, reference_product))
+            if code is not None:
+                result = (database.name, code)
+                BrightwayHelpers._ecoinvent_cache.put(cache_key, result)
+                return result
 
         matches = [
             act for act in database
@@ -113,9 +164,7 @@ class BrightwayHelpers:
         if len(matches) == 1:
             act = matches[0]
             result = (database.name, act["code"])
-            BrightwayHelpers._ecoinvent_cache[cache_key] = result
-            if len(BrightwayHelpers._ecoinvent_cache) > 150:
-                BrightwayHelpers._ecoinvent_cache.popitem(last=False)
+            BrightwayHelpers._ecoinvent_cache.put(cache_key, result)
             return result
 
         raise ValueError(
@@ -127,17 +176,22 @@ class BrightwayHelpers:
     def find_biosphere_key_by_name(name, biosphere: bd.Database, categories=("air", "urban air close to ground")):
         """Find (database_name, code) for a biosphere flow by exact name and categories."""
         cache_key = (biosphere.name, name.strip(), tuple(categories))
-        if cache_key in BrightwayHelpers._biosphere_cache:
-            BrightwayHelpers._biosphere_cache.move_to_end(cache_key)
-            return BrightwayHelpers._biosphere_cache[cache_key]
+        result = BrightwayHelpers._biosphere_cache.get(cache_key)
+        if result is not None:
+            return result
+
+        table = LookupTable.for_database(biosphere) if BrightwayHelpers.use_lookup_tables else None
+        code = table.get(LookupTable.flow_key(name, categories)) if table is not None else None
+        if code is not None:
+            result = (biosphere.name, code)
+            BrightwayHelpers._biosphere_cache.put(cache_key, result)
+            return result
 
         for flow in biosphere:
             if flow["name"].strip() == name.strip() and tuple(flow["categories"]) == categories:
                 # Use the actual database name for biosphere
                 result = (biosphere.name, flow["code"])
-                BrightwayHelpers._biosphere_cache[cache_key] = result
-                if len(BrightwayHelpers._biosphere_cache) > 50:
-                    BrightwayHelpers._biosphere_cache.popitem(last=False)
+                BrightwayHelpers._biosphere_cache.put(cache_key, result)
                 return result
         raise ValueError(f"Biosphere flow not found: {name} @ {categories}")
 
@@ -156,6 +210,39 @@ class BrightwayHelpers:
         closest_year = min(SCENARIO_DATABASE_YEARS, key=lambda candidate: (abs(candidate - year), candidate))
         return f"{scenario_name}_{closest_year}"
 
+    @staticmethod
+    def resolve_superstructure_scenario_name(
+        scenario: Scenario,
+        year: int,
+    ) -> str:
+        """Map a scenario/year to its column in the premise scenario-difference file ("model - pathway - year")."""
+        scenario_name = Scenario.BAU.value if scenario == Scenario.OBS else scenario.value
+        closest_year = min(SCENARIO_DATABASE_YEARS, key=lambda candidate: (abs(candidate - year), candidate))
+        spec = SCENARIO_MAP[scenario_name]
+        return f"{spec['model']} - {spec['pathway']} - {closest_year}"
+
+    @staticmethod
+    def resolve_scenario_anchor_weights(
+        scenario: Scenario,
+        year: int,
+    ) -> List[Tuple[str, float]]:
+        """Return the scenario databases bracketing a year with their linear interpolation weights.
+
+        Years outside ``SCENARIO_DATABASE_YEARS`` are clamped to the first/last database.
+        """
+        scenario_name = Scenario.BAU.value if scenario == Scenario.OBS else scenario.value
+        anchor_years = sorted(SCENARIO_DATABASE_YEARS)
+        if year <= anchor_years[0] or year >= anchor_years[-1] or year in anchor_years:
+            closest_year = min(anchor_years, key=lambda candidate: (abs(candidate - year), candidate))
+            return [(f"{scenario_name}_{closest_year}", 1.0)]
+        upper_year = min(candidate for candidate in anchor_years if candidate > year)
+        lower_year = max(candidate for candidate in anchor_years if candidate < year)
+        upper_weight = (year - lower_year) / (upper_year - lower_year)
+        return [
+            (f"{scenario_name}_{lower_year}", 1.0 - upper_weight),
+            (f"{scenario_name}_{upper_year}", upper_weight),
+        ]
+
     @staticmethod
     def resolve_scrap_db_name(
         scenario: Scenario,
@@ -1,11 +1,13 @@
 """Shared constants, enums, data paths, and simple data classes used across the project."""
 
+import os
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
-PROJECT_NAME = "premise"
+# Shards running side by side on one machine each use their own project copy (see ShardManifest)
+PROJECT_NAME = os.environ.get("LCA_FUTURAM_PROJECT", "premise")
 ECOINVENT_NAME = "ecoinvent-3.11-cutoff"
 SUPERSTRUCTURE_NAME = "scenario_superstructure"
 BIOSPHERE_NAME = "biosphere3"
@@ -69,10 +71,39 @@ SCRAP_PROCESSES_FILE = PROJECT_ROOT / "data" / "input_data" / "scrap_processes.x
 SUPPORTED_YEARS_OBS = range(2010, 2025)
 SUPPORTED_YEARS_SCENARIO = range(2025, 2051)
 INPUT_DATA_FOLDER = DATA_FOLDER / "input_data"
-LOADABLE_LCI_DATA_FOLDER = DATA_FOLDER / "output_data/loadable_lcis"
-LOADABLE_LCIA_RESULTS_DATA_FOLDER = DATA_FOLDER / "output_data/loadable_lcia_results"
-BW_FORMAT_LCIS_DATA_FOLDER = DATA_FOLDER / "output_data/bw_format_lcis"
-LCIA_RESULTS_EXCEL_FOLDER = DATA_FOLDER / "output_data/lcia_results_excel"
+SCENARIO_DIFFERENCE_FOLDER = DATA_FOLDER / "input_data" / "scenario_difference"
+# Run outputs can be redirected (e.g. to the folder of a shard) with LCA_FUTURAM_OUTPUT_FOLDER
+OUTPUT_DATA_FOLDER = Path(os.environ.get("LCA_FUTURAM_OUTPUT_FOLDER", DATA_FOLDER / "output_data"))
+LOADABLE_LCI_DATA_FOLDER = OUTPUT_DATA_FOLDER / "loadable_lcis"
+LOADABLE_LCIA_RESULTS_DATA_FOLDER = OUTPUT_DATA_FOLDER / "loadable_lcia_results"
+BW_FORMAT_LCIS_DATA_FOLDER = OUTPUT_DATA_FOLDER / "bw_format_lcis"
+LCIA_RESULTS_EXCEL_FOLDER = OUTPUT_DATA_FOLDER / "lcia_results_excel"
+MONTE_CARLO_RESULTS_FOLDER = OUTPUT_DATA_FOLDER / "monte_carlo_results"
+PIPELINE_RUNS_FOLDER = OUTPUT_DATA_FOLDER / "pipeline_runs"
+INVENTORY_VECTORS_FOLDER = OUTPUT_DATA_FOLDER / "inventory_vectors"
+SENSITIVITY_RESULTS_FOLDER = OUTPUT_DATA_FOLDER / "sensitivity_results"
+IMPACT_CUBES_FOLDER = OUTPUT_DATA_FOLDER / "impact_cubes"
+RUN_DIFFS_FOLDER = OUTPUT_DATA_FOLDER / "run_diffs"
+SYSTEM_PROCESSES_FOLDER = OUTPUT_DATA_FOLDER / "system_processes"
+SHARD_RUNS_FOLDER = DATA_FOLDER / "output_data/shard_runs"
+PREMISE_MANIFEST_FILE = DATA_FOLDER / "output_data/premise_manifest.json"
+WORKBOOK_CACHE_FOLDER = DATA_FOLDER / "cache" / "workbooks"
+LOOKUP_TABLES_FOLDER = DATA_FOLDER / "cache" / "lookup_tables"
+
+# Demand columns per batched inventory solve; each chunk holds two dense (products x chunk) arrays
+INVENTORY_SOLVE_CHUNK_SIZE = 32
+
+# In-process caches of BrightwayHelpers name lookups: maximum entries and eviction policy ("lru" or "fifo")
+LOOKUP_CACHE_SIZES = {"ecoinvent": 150, "biosphere": 50}
+LOOKUP_CACHE_POLICY = "lru"
+
+# Local read-only results service (lca-futuram serve): bind address and query responses kept in memory
+RESULTS_SERVICE_HOST = "127.0.0.1"
+RESULTS_SERVICE_PORT = 8765
+RESULTS_SERVICE_CACHE_SIZE = 256
+
+# dtypes used to parse every lci_builder.xlsx sheet
+LCI_BUILDER_DTYPES = {"Layer": str}
 
 LCIA_METHODS = [
     ('EF v3.0', 'climate change', 'global warming potential (GWP100)'),
@@ -124,6 +155,34 @@ route_lci_names = {
     Route.BATT_2RM_dismantlingToSmelter: "Dismantling and shredding of "
 }
 
+@dataclass
+class ExchangeTerm:
+    """Parametric form of one foreground exchange, so its amount can be recomputed from MFA values.
+
+    amount = sign * (builder_amount if uses_amount else 1) * factor
+             * sum(numerator rows) * sum(scaling rows) / (sum(input rows) if per_input else 1)
+    where a sum is left out (taken as 1) when its row list is None.
+    """
+    role: str # "main" or "avoided", the foreground activity holding the exchange
+    input: tuple # (database, code) of the linked process or biosphere flow
+    type: str # "technosphere" or "biosphere"
+    label: str # LCI Flow Name of the lci_builder row
+    builder_row: int # index of the row in the lci_builder sheet
+    sign: float # sign applied by BrightwayHelpers.build_external_exchange
+    builder_amount: float # 'Amount' column of the row (1 if the amount is read from the RM)
+    uses_amount: bool
+    factor: float # recovery multiplier or 1 / element to compound ratio
+    numerator_rows: Optional[List[int]] # positions in SingleLCI.mfa_values
+    scaling_rows: Optional[List[int]]
+    per_input: bool
+
+    # how the input was resolved, so the term can be relinked to another background database
+    database: Optional[str] = None # ExternalDatabase value
+    process_name: Optional[str] = None
+    location: Optional[str] = None
+    reference_product: Optional[str] = None
+    categories: Optional[tuple] = None
+
 @dataclass
 class SingleLCI:
     """Class that holds all information for an LCI"""
@@ -138,10 +197,81 @@ class SingleLCI:
     avoided_impacts_flow_name: str # LCI name of the avoided impacts activity
     total_inflow_amount: int #total amount of recycled material, (we need to multiply the impacts with this, to get total impact)
 
+    # MFA rows used by the LCI and the parametric exchanges built from them (used for uncertainty propagation)
+    mfa_values: List[float] = field(default_factory=list)
+    mfa_flow_ids: List[str] = field(default_factory=list)
+    input_rows: List[int] = field(default_factory=list)
+    exchange_terms: List[ExchangeTerm] = field(default_factory=list)
+    database_name: Optional[str] = None # foreground database holding lci_dict; None means the builder's database
+
 @dataclass
 class SingleLCIAResult:
     """Class that holds all information for an LCIA"""
     total_impacts: Dict[str, float] # impact of 1kg of recycling
     avoided_impacts: Dict[str, float]
     lci: SingleLCI
-    # impact_per_element: dict
\ No newline at end of file
+    exchange_contributions: Dict[str, Dict[str, Dict[str, float]]] = field(default_factory=dict) # "normal"/"avoided" -> method -> exchange name -> score
+    impact_per_element: Dict[str, Dict[str, float]] = field(default_factory=dict) # method -> recovered material -> avoided impact
+
+@dataclass(frozen=True)
+class LCIJob:
+    """One LCI to build, as planned by RunPlanner"""
+    route: Route
+    product: Product
+    year: int
+    scenario: Scenario
+    location: Location
+    background_db: str # scenario (or superstructure) database the LCI links to
+    scrap_db: str
+
+@dataclass
+class RunPlan:
+    """Explicit work list for a run, with the combinations that were skipped and a cost estimate"""
+    jobs: List[LCIJob]
+    skipped: Dict[str, int] # reason -> number of skipped combinations
+    cost: Dict[str, float]
+
+@dataclass
+class UncertaintySpec:
+    """Multiplicative uncertainty around a deterministic value"""
+    distribution: str = "lognormal" # normal, lognormal, uniform or triangular
+    scale: float = 0.1 # relative standard deviation (normal/lognormal) or relative half-width (uniform/triangular)
+
+@dataclass
+class MonteCarloConfig:
+    """Settings for the Monte Carlo mode of LCABuilder"""
+    iterations: int = 1000
+    seed: Optional[int] = None
+    mfa_uncertainty: UncertaintySpec = field(default_factory=UncertaintySpec) # default for all MFA values
+    flow_uncertainty: Dict[str, UncertaintySpec] = field(default_factory=dict) # overrides per Stock/Flow ID
+    amount_uncertainty: Optional[UncertaintySpec] = None # perturbs lci_builder 'Amount' values when set
+    percentiles: Tuple[float, ...] = (2.5, 50, 97.5)
+
+@dataclass
+class MonteCarloResult:
+    """Summary statistics of the Monte Carlo samples of one LCI"""
+    lci: SingleLCI
+    iterations: int
+    statistics: Dict[str, Dict[str, Dict[str, float]]] # impact type (normal/avoided/net) -> method -> statistic -> value
+
+@dataclass
+class SensitivityResult:
+    """Local sensitivities of the main (normal) and avoided scores of one LCI"""
+    lci: SingleLCI
+    scores: Dict[str, Dict[str, float]] # impact type (normal/avoided) -> method -> score
+    parameters: List[dict] # one row per impact type, method and parameter, ranked by absolute elasticity
+
+@dataclass
+class RunConfig:
+    """Selections and options of a CLI run; defaults are the battery deliverable run"""
+    database_name: str = "batt_deliverable"
+    routes: List[Route] = field(default_factory=lambda: [Route.BATT_2RM_dismantlingToSmelter, Route.BATT_ZnAlkaliSorted, Route.BATT_EVInspectedReuse, Route.BATT_LeadAcidSorted, Route.BATT_NiCdSorted, Route.BATT_NiMHSorted, Route.DIRECT, Route.PYRO_HYDRO, Route.HYDRO, Route.PYRO_HYDRO_PRETREATMENT])
+    products: List[Product] = field(default_factory=lambda: [Product.battPackXEV, Product.BattZn, Product.battLiNMC111, Product.battLiCO_subsub, Product.battLiFP_subsub, Product.battLiNMC811, Product.battLiMO_subsub, Product.battLiNCA_subsub, Product.BattNiCd, Product.BattNiMH, Product.BattPb])
+    years: List[int] = field(default_factory=lambda: [2010, 2020, 2030, 2040, 2050])
+    scenarios: List[Scenario] = field(default_factory=lambda: [Scenario.OBS, Scenario.REC, Scenario.BAU, Scenario.CIR])
+    locations: List[Location] = field(default_factory=lambda: [Location.EU27_4])
+    lcia_methods: List[tuple] = field(default_factory=lambda: list(LCIA_METHODS))
+    add_scrap: bool = False
+    use_superstructure: bool = False
+    partition_by_background: bool = False
+    store_inventories: bool = False # keep biosphere inventories for recharacterization and system processes
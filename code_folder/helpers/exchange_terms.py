@@ -0,0 +1,102 @@
+from typing import Optional
+
+import numpy as np
+
+from code_folder.helpers.constants import SingleLCI
+
+# Converts sum(amount * unit score) over an activity's exchanges into the score of that activity
+# for a demand of -1 (see LCABuilder.compute_lcia_for_lci): the main activity is a waste treatment
+# (production -1), the avoided impacts activity a regular process (production +1).
+ROLE_SIGNS = {"main": 1.0, "avoided": -1.0}
+
+
+class ExchangeTerms:
+    """Vectorized evaluation of the parametric exchanges (SingleLCI.exchange_terms) of an LCI."""
+
+    @staticmethod
+    def row_matrices(lci: SingleLCI):
+        """Return 0/1 matrices (n_rows x n_terms) selecting the numerator and scaling rows of each term, and the input row vector."""
+        n_rows, n_terms = len(lci.mfa_values), len(lci.exchange_terms)
+        numerator = np.zeros((n_rows, n_terms))
+        scaling = np.zeros((n_rows, n_terms))
+        for column, term in enumerate(lci.exchange_terms):
+            # np.add.at keeps rows that are selected twice, like calculate_flow_amount does
+            np.add.at(numerator[:, column], term.numerator_rows or [], 1.0)
+            np.add.at(scaling[:, column], term.scaling_rows or [], 1.0)
+        inflow = np.zeros(n_rows)
+        np.add.at(inflow, lci.input_rows, 1.0)
+        return numerator, scaling, inflow
+
+    @staticmethod
+    def _row_sums(lci: SingleLCI, mfa_values: np.ndarray):
+        """Numerator, scaling and input sums of every term (n_samples x n_terms); a sum a term does not use is 1."""
+        terms = lci.exchange_terms
+        numerator, scaling, inflow = ExchangeTerms.row_matrices(lci)
+        has_numerator = np.array([term.numerator_rows is not None for term in terms], dtype=bool)
+        has_scaling = np.array([term.scaling_rows is not None for term in terms], dtype=bool)
+        per_input = np.array([term.per_input for term in terms], dtype=bool)
+        numerator_sums = np.where(has_numerator, mfa_values @ numerator, 1.0)
+        scaling_sums = np.where(has_scaling, mfa_values @ scaling, 1.0)
+        input_sums = np.where(per_input, (mfa_values @ inflow)[:, np.newaxis], 1.0)
+        return numerator_sums, scaling_sums, input_sums
+
+    @staticmethod
+    def evaluate(lci: SingleLCI, mfa_values: Optional[np.ndarray] = None, amount_factors: Optional[np.ndarray] = None) -> np.ndarray:
+        """Exchange amounts of all terms for one or many sets of MFA values.
+
+        mfa_values has shape (n_samples, n_rows) and amount_factors (n_samples, n_terms) multiplies
+        the lci_builder 'Amount' of terms that use it. Returns an array of shape (n_samples, n_terms).
+        """
+        if mfa_values is None:
+            mfa_values = np.asarray(lci.mfa_values, dtype=float)[np.newaxis, :]
+        mfa_values = np.atleast_2d(mfa_values)
+        terms = lci.exchange_terms
+        uses_amount = np.array([term.uses_amount for term in terms], dtype=bool)
+        coefficient = np.array([term.sign * term.factor * (term.builder_amount if term.uses_amount else 1.0) for term in terms])
+        numerator_sums, scaling_sums, input_sums = ExchangeTerms._row_sums(lci, mfa_values)
+
+        amounts = np.broadcast_to(coefficient, (mfa_values.shape[0], len(terms))).copy()
+        if amount_factors is not None:
+            amounts *= np.where(uses_amount, amount_factors, 1.0)
+        return amounts * numerator_sums * scaling_sums / input_sums
+
+    @staticmethod
+    def amount_derivatives(lci: SingleLCI) -> np.ndarray:
+        """Derivative of each term's amount with respect to its lci_builder 'Amount' (0 for terms that do not use it)."""
+        mfa_values = np.asarray(lci.mfa_values, dtype=float)[np.newaxis, :]
+        numerator_sums, scaling_sums, input_sums = ExchangeTerms._row_sums(lci, mfa_values)
+        coefficient = np.array([term.sign * term.factor if term.uses_amount else 0.0 for term in lci.exchange_terms])
+        return (coefficient * numerator_sums * scaling_sums / input_sums)[0]
+
+    @staticmethod
+    def jacobian(lci: SingleLCI) -> np.ndarray:
+        """Derivatives of all term amounts with respect to the MFA values (n_rows x n_terms), at the LCI's values."""
+        mfa_values = np.asarray(lci.mfa_values, dtype=float)[np.newaxis, :]
+        terms = lci.exchange_terms
+        numerator, scaling, inflow = ExchangeTerms.row_matrices(lci)
+        numerator_sums, scaling_sums, input_sums = (sums[0] for sums in ExchangeTerms._row_sums(lci, mfa_values))
+        per_input = np.array([term.per_input for term in terms], dtype=bool)
+        coefficient = np.array([term.sign * term.factor * (term.builder_amount if term.uses_amount else 1.0) for term in terms])
+        # Product rule on numerator * scaling / input; unused sums are constant 1 with all-zero row selections
+        input_derivative = np.where(per_input, inflow[:, np.newaxis], 0.0)
+        return coefficient * (
+            numerator * scaling_sums / input_sums
+            + numerator_sums * scaling / input_sums
+            - numerator_sums * scaling_sums * input_derivative / input_sums ** 2
+        )
+
+    @staticmethod
+    def role_signs(lci: SingleLCI) -> np.ndarray:
+        """Per-term multiplier that turns amount * unit score into a contribution to the activity score."""
+        return np.array([ROLE_SIGNS[term.role] for term in lci.exchange_terms])
+
+    @staticmethod
+    def role_mask(lci: SingleLCI, role: str) -> np.ndarray:
+        """Boolean mask of the terms belonging to the main or avoided activity."""
+        return np.array([term.role == role for term in lci.exchange_terms], dtype=bool)
+
+    @staticmethod
+    def contributions(lci: SingleLCI, unit_scores: np.ndarray) -> np.ndarray:
+        """Score contribution of each term to its activity score, for each method (n_terms x n_methods)."""
+        amounts = ExchangeTerms.evaluate(lci)[0] * ExchangeTerms.role_signs(lci)
+        return amounts[:, np.newaxis] * unit_scores
@@ -0,0 +1,124 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from code_folder.helpers.constants import Location, Product, Route, Scenario, SingleLCIAResult
+
+IMPACT_CUBE_DIMS = ("scenario", "year", "location", "product", "route", "method", "impact_type")
+IMPACT_TYPES = ("normal", "avoided", "net")
+DIM_ENUMS = {"scenario": Scenario, "location": Location, "product": Product, "route": Route}
+DIM_COLUMNS = {"scenario": "Scenario", "year": "Year", "location": "Location", "product": "Product", "route": "RecyclingRoute", "method": "Method", "impact_type": "Impact_type"}
+
+
+class ImpactCube:
+    """
+    Absolute impacts (per-kg score x total inflow) as a dense array over IMPACT_CUBE_DIMS.
+
+    Combinations without an LCI are NaN. Roll-ups sum over dimensions with ``nansum`` but stay NaN
+    where every summed cell is NaN, so missing data is not reported as zero impact.
+    """
+    def __init__(self, dims: Sequence[str], coords: Dict[str, list], values: np.ndarray):
+        self.dims = tuple(dims)
+        self.coords = {dim: list(coords[dim]) for dim in self.dims}
+        self.values = np.asarray(values, dtype=float)
+        if self.values.shape != tuple(len(self.coords[dim]) for dim in self.dims):
+            raise ValueError(f"Values of shape {self.values.shape} do not match the coordinates of {self.dims}")
+
+    @classmethod
+    def from_lcia_results(cls, lcia_results: List[SingleLCIAResult], method_labels: Optional[List[str]] = None) -> "ImpactCube":
+        """Build the cube from LCIA results; methods default to all labels found in the results."""
+        if method_labels is None:
+            method_labels = list(dict.fromkeys(label for result in lcia_results for label in result.total_impacts))
+        labels = {
+            "scenario": [result.lci.scenario.value for result in lcia_results],
+            "year": [result.lci.year for result in lcia_results],
+            "location": [result.lci.location.value for result in lcia_results],
+            "product": [result.lci.product.value for result in lcia_results],
+            "route": [result.lci.route.value for result in lcia_results],
+        }
+        coords = {}
+        for dim, values in labels.items():
+            present = set(values)
+            # Enum dimensions keep their declaration order, years are sorted
+            coords[dim] = [member.value for member in DIM_ENUMS[dim] if member.value in present] if dim in DIM_ENUMS else sorted(present)
+        coords["method"] = list(method_labels)
+        coords["impact_type"] = list(IMPACT_TYPES)
+
+        positions = tuple(
+            np.array([{value: position for position, value in enumerate(coords[dim])}[value] for value in values], dtype=int)
+            for dim, values in labels.items()
+        )
+        flat = np.ravel_multi_index(positions, [len(coords[dim]) for dim in labels]) if lcia_results else np.zeros(0, dtype=int)
+        _, first = np.unique(flat, return_index=True)
+        if len(first) != len(flat):
+            # e.g. a location selected twice; such results are identical, so the first one is kept
+            print(f"⚠️ {len(flat) - len(first)} LCIA results repeat a scenario, year, location, product and route; using the first of each.")
+            first = np.sort(first)
+            lcia_results = [lcia_results[index] for index in first]
+            positions = tuple(position[first] for position in positions)
+
+        inflows = np.array([result.lci.total_inflow_amount for result in lcia_results], dtype=float)
+        normal = np.array([[result.total_impacts.get(label, np.nan) for label in method_labels] for result in lcia_results], dtype=float).reshape(len(lcia_results), len(method_labels))
+        avoided = np.array([[result.avoided_impacts.get(label, np.nan) for label in method_labels] for result in lcia_results], dtype=float).reshape(len(lcia_results), len(method_labels))
+        normal, avoided = normal * inflows[:, np.newaxis], avoided * inflows[:, np.newaxis]
+
+        values = np.full([len(coords[dim]) for dim in IMPACT_CUBE_DIMS], np.nan)
+        values[positions] = np.stack([normal, avoided, normal - avoided], axis=-1)
+        return cls(dims=IMPACT_CUBE_DIMS, coords=coords, values=values)
+
+    def sel(self, **selection) -> "ImpactCube":
+        """Select coordinates per dimension; a single value drops the dimension, a list keeps it in the given order."""
+        unknown = set(selection) - set(self.dims)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(sorted(unknown))}. Use one of: {', '.join(self.dims)}")
+        index, dims, coords = [], [], {}
+        for dim in self.dims:
+            wanted = selection.get(dim, self.coords[dim])
+            positions = [self._position(dim, value) for value in (wanted if isinstance(wanted, (list, tuple)) else [wanted])]
+            if isinstance(wanted, (list, tuple)):
+                dims.append(dim)
+                coords[dim] = [self.coords[dim][position] for position in positions]
+            index.append(np.array(positions, dtype=int))
+        values = self.values[np.ix_(*index)].reshape([len(coords[dim]) for dim in dims])
+        return ImpactCube(dims=dims, coords=coords, values=values)
+
+    def _position(self, dim: str, value) -> int:
+        value = value.value if hasattr(value, "value") else value
+        try:
+            return self.coords[dim].index(value)
+        except ValueError:
+            raise ValueError(f"'{value}' is not a coordinate of {dim}. Available: {self.coords[dim]}") from None
+
+    def sum(self, dims: Sequence[str]) -> "ImpactCube":
+        """Sum over the given dimensions (e.g. ["product", "route"] for totals per scenario, year and location)."""
+        dims = [dims] if isinstance(dims, str) else list(dims)
+        unknown = set(dims) - set(self.dims)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(sorted(unknown))}. Use one of: {', '.join(self.dims)}")
+        axes = tuple(self.dims.index(dim) for dim in dims)
+        totals = np.nansum(self.values, axis=axes)
+        totals[np.all(np.isnan(self.values), axis=axes)] = np.nan
+        kept = [dim for dim in self.dims if dim not in dims]
+        return ImpactCube(dims=kept, coords={dim: self.coords[dim] for dim in kept}, values=totals)
+
+    def rollup(self, keep: Sequence[str]) -> "ImpactCube":
+        """Sum over every dimension not in ``keep``."""
+        return self.sum([dim for dim in self.dims if dim not in keep])
+
+    def to_frame(self, methods_as_columns: bool = True) -> pd.DataFrame:
+        """Long table of the non-NaN cells, with one column per method when the cube has a method dimension."""
+        index = pd.MultiIndex.from_product([self.coords[dim] for dim in self.dims], names=[DIM_COLUMNS.get(dim, dim) for dim in self.dims])
+        frame = pd.Series(self.values.ravel(), index=index, name="Value").dropna().reset_index()
+        if methods_as_columns and "method" in self.dims:
+            row_columns = [DIM_COLUMNS.get(dim, dim) for dim in self.dims if dim != "method"]
+            frame = frame.pivot_table(index=row_columns, columns="Method", values="Value", sort=False).reset_index()
+            frame.columns.name = None
+            frame = frame[row_columns + [label for label in self.coords["method"] if label in frame.columns]]
+        return frame
+
+    def to_xarray(self):
+        """The cube as an xarray.DataArray (requires xarray)."""
+        import xarray as xr
+
+        return xr.DataArray(self.values, dims=self.dims, coords=self.coords, name="absolute_impact")
@@ -0,0 +1,95 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from code_folder.helpers.constants import SingleLCI
+
+
+class InventoryStore:
+    """
+    Aggregated biosphere inventories of LCIs, main (normal) and avoided, as one sparse matrix.
+
+    Column ``2 * i`` holds the inventory of the main activity of entry ``i`` and column ``2 * i + 1``
+    that of its avoided activity, both for the demand scored by LCIA (-1). Rows are biosphere flow
+    keys, so scores for any method are a characterization vector times this matrix.
+    """
+    def __init__(self, biosphere_keys: List[tuple], matrix: sparse.csc_matrix, entries: List[dict]):
+        self.biosphere_keys = biosphere_keys
+        self.matrix = sparse.csc_matrix(matrix)
+        self.entries = entries
+
+    @staticmethod
+    def entry(lci: SingleLCI) -> dict:
+        """JSON-serializable label of an LCI, used to match inventories to LCIA results."""
+        return {
+            "route": lci.route.value,
+            "product": lci.product.value,
+            "year": lci.year,
+            "scenario": lci.scenario.value,
+            "location": lci.location.value,
+            "main_activity_flow_name": lci.main_activity_flow_name,
+        }
+
+    @classmethod
+    def combine(cls, groups: List[Tuple[Dict[tuple, int], sparse.spmatrix, List[SingleLCI]]]) -> "InventoryStore":
+        """Merge (biosphere index, inventories, LCIs) groups of different solvers onto one set of biosphere rows."""
+        return cls._merge([(biosphere_index, inventories, [cls.entry(lci) for lci in lcis]) for biosphere_index, inventories, lcis in groups])
+
+    @classmethod
+    def concatenate(cls, stores: List["InventoryStore"]) -> "InventoryStore":
+        """Stack the entries of several stores (e.g. of shards), aligning their biosphere rows."""
+        return cls._merge([({key: row for row, key in enumerate(store.biosphere_keys)}, store.matrix, store.entries) for store in stores])
+
+    @classmethod
+    def _merge(cls, groups: List[Tuple[Dict[tuple, int], sparse.spmatrix, List[dict]]]) -> "InventoryStore":
+        biosphere_keys, key_rows = [], {}
+        rows, cols, data, entries = [], [], [], []
+        for biosphere_index, inventories, group_entries in groups:
+            for key in biosphere_index:
+                if key not in key_rows:
+                    key_rows[key] = len(biosphere_keys)
+                    biosphere_keys.append(key)
+            row_map = np.empty(len(biosphere_index), dtype=int)
+            for key, row in biosphere_index.items():
+                row_map[row] = key_rows[key]
+            block = sparse.coo_matrix(inventories)
+            rows.append(row_map[block.row])
+            cols.append(block.col + 2 * len(entries))
+            data.append(block.data)
+            entries += group_entries
+        matrix = sparse.csc_matrix(
+            (np.concatenate(data or [np.zeros(0)]), (np.concatenate(rows or [np.zeros(0, dtype=int)]), np.concatenate(cols or [np.zeros(0, dtype=int)]))),
+            shape=(len(biosphere_keys), 2 * len(entries)),
+        )
+        return cls(biosphere_keys=biosphere_keys, matrix=matrix, entries=entries)
+
+    def reordered(self, order) -> "InventoryStore":
+        """Copy with the entries (and their two columns each) in the given order."""
+        columns = [column for entry_index in order for column in (2 * entry_index, 2 * entry_index + 1)]
+        return InventoryStore(biosphere_keys=self.biosphere_keys, matrix=self.matrix[:, columns], entries=[self.entries[entry_index] for entry_index in order])
+
+    @staticmethod
+    def method_vectors(lcia_methods: List[tuple], biosphere_keys: List[tuple]) -> np.ndarray:
+        """Characterization factors of methods for the given biosphere keys (n_keys x n_methods), read from Brightway."""
+        import bw2data as bd
+        from bw2data.backends import ActivityDataset
+
+        key_rows = {key: row for row, key in enumerate(biosphere_keys)}
+        vectors = np.zeros((len(biosphere_keys), len(lcia_methods)))
+        for column, method in enumerate(lcia_methods):
+            factors = [(flow, cf["amount"] if isinstance(cf, dict) else cf) for flow, cf, *_ in bd.Method(method).load()]
+            flow_ids = [flow for flow, _ in factors if isinstance(flow, int)]
+            id_keys = {}
+            for start in range(0, len(flow_ids), 500):
+                batch = ActivityDataset.select(ActivityDataset.id, ActivityDataset.database, ActivityDataset.code).where(ActivityDataset.id << flow_ids[start:start + 500])
+                id_keys.update({row.id: (row.database, row.code) for row in batch})
+            for flow, cf in factors:
+                key = id_keys.get(flow) if isinstance(flow, int) else tuple(flow)
+                if key in key_rows:
+                    vectors[key_rows[key], column] += cf
+        return vectors
+
+    def characterize(self, characterization: np.ndarray) -> np.ndarray:
+        """Scores (n_columns x n_methods) of every stored inventory column for characterization vectors (n_keys x n_methods)."""
+        return np.asarray(self.matrix.T @ characterization)
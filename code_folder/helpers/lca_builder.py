@@ -1,10 +1,27 @@
+import hashlib
+import queue
+import threading
+import numpy as np
 import pandas as pd
-from typing import List
-from code_folder.helpers.constants import SCENARIO_DATABASE_YEARS, SCRAP_DATABASE_NAME, SCRAP_PROCESSES_FILE, SingleLCI, SingleLCIAResult, ExternalDatabase,  Location, Scenario, Route, Product, INPUT_DATA_FOLDER, ECOINVENT_NAME, BIOSPHERE_NAME, route_lci_names, SUPPORTED_YEARS_OBS, SUPPORTED_YEARS_SCENARIO, SUPERSTRUCTURE_NAME
+from dataclasses import replace
+from typing import List, Optional
+from code_folder.helpers.constants import SCENARIO_DATABASE_YEARS, SCRAP_DATABASE_NAME, SCRAP_PROCESSES_FILE, SingleLCI, SingleLCIAResult, ExchangeTerm, LCIJob, RunPlan, MonteCarloConfig, MonteCarloResult, SensitivityResult, ExternalDatabase,  Location, Scenario, Route, Product, INPUT_DATA_FOLDER, ECOINVENT_NAME, BIOSPHERE_NAME, route_lci_names, LCI_BUILDER_DTYPES, SUPERSTRUCTURE_NAME
 import bw2data as bd
-import bw2calc as bc
+from bw2data.backends import sqlite3_lci_db
 from code_folder.helpers.brightway_helpers import BrightwayHelpers
+from code_folder.helpers.background_solver import BackgroundSolver
+from code_folder.helpers.exchange_terms import ExchangeTerms
+from code_folder.helpers.impact_cube import ImpactCube
+from code_folder.helpers.inventory_store import InventoryStore
+from code_folder.helpers.mfa_reader import MFAReader
+from code_folder.helpers.monte_carlo import MonteCarloHelper
+from code_folder.helpers.run_planner import RunPlanner
+from code_folder.helpers.sensitivity import SensitivityHelper
+from code_folder.helpers.shard_manifest import ShardManifest
+from code_folder.helpers.superstructure_solver import SuperstructureSolver
+from code_folder.helpers.workbook_cache import WorkbookCache
 from code_folder.helpers.storage_helper import StorageHelper
+from code_folder.helpers.system_processes import SystemProcessHelper
 
 
 class LCABuilder:
@@ -15,11 +32,21 @@ class LCABuilder:
     - Reading per-route/product inputs
     - Building Brightway processes and exchanges
     - Running LCIA and persisting results
+
+    With ``use_superstructure`` the LCIs link to the premise superstructure database and each
+    scenario is scored by patching its matrices with the scenario-difference file, instead of
+    linking to the individual scenario databases.
+
+    With ``partition_by_background`` the LCIs are written to one foreground database per background
+    database (``{database_name}__{background}``), so each LCIA solve only includes that background.
     """
-    def __init__(self, database_name: str):
+    def __init__(self, database_name: str, use_superstructure: bool = False, partition_by_background: bool = False):
 
         self.background_db = bd.Database(SUPERSTRUCTURE_NAME)
+        self.use_superstructure = use_superstructure
+        self.partition_by_background = partition_by_background
         self.database_name = database_name
+        self.foreground_db_name = database_name
         self.database = bd.Database(database_name)
         self.biosphere = bd.Database(BIOSPHERE_NAME)
         self.scrap = None
@@ -28,6 +55,11 @@ class LCABuilder:
         self.scrap_processes: List[dict] = []
         self.lcis: List[SingleLCI] = []
         self.lcia_results: List[SingleLCIAResult] = []
+        self.monte_carlo_results: List[MonteCarloResult] = []
+        self.sensitivity_results: List[SensitivityResult] = []
+        self.inventories: Optional[InventoryStore] = None
+        self._equivalent_lcis: dict = {}
+        self._mfa_frames: dict = {}
 
     def build_all_lcis(self,
                        route_selection:List[Route],
@@ -35,62 +67,303 @@ class LCABuilder:
                        year_selection: List[int],
                        scenario_selection: List[Scenario],
                        location_selection: List[Location],
-                       add_scrap: bool
+                       add_scrap: bool,
+                       dry_run: bool = False,
                        ):
-        """Build LCIs for all combinations of the provided selections and write to DB."""
-        for year in year_selection:
-            for scenario in scenario_selection:
-                # Filter scenarios for relevant years
-                if (scenario == Scenario.OBS and year not in SUPPORTED_YEARS_OBS) or \
-                (scenario in [Scenario.BAU, Scenario.CIR, Scenario.REC] and year not in SUPPORTED_YEARS_SCENARIO):
-                    continue
-                resolved_ecoinvent_db = BrightwayHelpers.resolve_scenario_db_name(
-                            scenario=scenario,
-                            year=year,
-                        )
-                self.background_db = bd.Database(resolved_ecoinvent_db)
-                scrap_db_name = BrightwayHelpers.resolve_scrap_db_name(
-                    scenario=scenario,
-                    year=year,
-                )
-                if add_scrap and scrap_db_name not in self.built_scrap_dbs:
-                    if scrap_db_name in bd.databases:
-                        bd.Database(scrap_db_name).deregister()
-                    self.scrap = bd.Database(scrap_db_name)
-                    scrap_processes = self.build_scrap_processes()
-                    self.scrap.write({k: v for d in scrap_processes for k, v in d.items()})
-                    self.built_scrap_dbs.add(scrap_db_name)
-                else:
-                    self.scrap = bd.Database(scrap_db_name)
+        """Plan the LCIs for the provided selections, build the possible ones and write them to the DB.
+
+        With ``dry_run`` only the plan is printed and returned.
+        """
+        plan = RunPlanner.plan(
+            route_selection=route_selection,
+            product_selection=product_selection,
+            year_selection=year_selection,
+            scenario_selection=scenario_selection,
+            location_selection=location_selection,
+            use_superstructure=self.use_superstructure,
+        )
+        RunPlanner.print_plan(plan, show_jobs=dry_run)
+        if dry_run:
+            return plan
+
+        self._prepare_mfa_inputs(plan)
+
+        for jobs in RunPlanner.partitions(plan).values():
+            self._set_partition_databases(job=jobs[0], add_scrap=add_scrap)
+            location_groups = {}
+            for job in jobs:
+                location_groups.setdefault((job.route, job.product), []).append(job)
+            for location_jobs in location_groups.values():
+                for lci in self._build_shared_lcis(location_jobs):
+                    self.lcis.append(lci)
+                    print(f"Finished LCI for route: {lci.route.value}, scenario: {lci.scenario.value}, product: {lci.product.value}, year: {lci.year}, location: {lci.location.value}")
+
+        for name, stats in BrightwayHelpers.lookup_cache_stats()["tables"].items():
+            print(f"📋 Lookup table {name}: {stats['hits']} hits, {stats['misses']} misses")
+        self._write_lcis(self.lcis)
+        return plan
+
+    def _foreground_db_name(self, background_db: str) -> str:
+        """Name of the foreground database that LCIs linking to a background database are written to."""
+        if not self.partition_by_background:
+            return self.database_name
+        return f"{self.database_name}__{background_db}"
+
+    def foreground_database_names(self) -> List[str]:
+        """Registered foreground databases of this builder: the database itself and its per-background partitions."""
+        return [name for name in bd.databases if name == self.database_name or name.startswith(f"{self.database_name}__")]
+
+    def _lci_database_name(self, lci: SingleLCI) -> str:
+        return lci.database_name or self.database_name
+
+    def _write_lcis(self, lcis: List[SingleLCI]) -> None:
+        """Write the activities of LCIs to their foreground databases, one write per database."""
+        datasets = {}
+        for lci in lcis:
+            datasets.setdefault(self._lci_database_name(lci), {}).update(lci.lci_dict)
+        for database_name, data in datasets.items():
+            bd.Database(database_name).write(data)
+
+    def run_pipelined(self,
+                      route_selection: List[Route],
+                      product_selection: List[Product],
+                      year_selection: List[int],
+                      scenario_selection: List[Scenario],
+                      location_selection: List[Location],
+                      add_scrap: bool,
+                      lcia_methods,
+                      prefetch: int = 1,
+                      store_inventories: bool = False,
+                      ):
+        """Build, write and score the LCIs one (scenario, year) partition at a time.
+
+        The inputs of the next ``prefetch`` partitions (at most) are read on a background thread
+        while the current partition is built and solved. Each partition's activities are
+        appended to the database, scored against its background database only, and its LCIs and LCIA
+        results are saved to a pipeline run folder and released, so peak memory depends on the partition
+        size. ``self.lcia_results`` keeps the scores with LCIs stripped of their activities and exchange
+        terms; ``StorageHelper.load_pipeline_run`` loads the full LCIs. With ``store_inventories``
+        ``self.inventories`` holds the biosphere inventories of all partitions, as after ``run_lcia``.
+        Returns the run folder.
+        """
+        plan = RunPlanner.plan(
+            route_selection=route_selection,
+            product_selection=product_selection,
+            year_selection=year_selection,
+            scenario_selection=scenario_selection,
+            location_selection=location_selection,
+            use_superstructure=self.use_superstructure,
+        )
+        RunPlanner.print_plan(plan)
+        partitions = RunPlanner.partitions(plan)
+
+        # Activities are appended per partition instead of writing the whole database once
+        for database_name in self.foreground_database_names():
+            bd.Database(database_name).deregister()
 
-                for route in route_selection:
-                    for product in product_selection:
-                        for location in location_selection:
-                            lci = self.build_lci(route=route, product=product, year=year, scenario=scenario, location=location)
-                            if lci:
-                                self.lcis.append(lci)
-                                print(f"Finished LCI for route: {route.value}, scenario: {scenario.value}, product: {product.value}, year: {year}, location: {location.value}")
+        superstructure = None
+        if self.use_superstructure:
+            for jobs in partitions.values():
+                self._set_partition_databases(job=jobs[0], add_scrap=add_scrap)
+            scrap_activities = [activity for scrap_db in sorted({job.scrap_db for job in plan.jobs} & set(bd.databases)) for activity in bd.Database(scrap_db)]
+            superstructure = SuperstructureSolver.from_activities([next(iter(self.background_db))] + scrap_activities, lcia_methods)
 
+        run_folder = StorageHelper.new_pipeline_run_folder()
+        solver, solver_key = None, None
+        self.lcia_results, self.inventories, inventory_groups = [], None, []
+        for (year, scenario), jobs, mfa_frames in self._prefetched_partitions(partitions, prefetch):
+            self._set_partition_databases(job=jobs[0], add_scrap=add_scrap)
+            self._mfa_frames = mfa_frames
+            # Equivalent LCIs always share the background database; drop the others to bound memory
+            self._equivalent_lcis = {key: lci for key, lci in self._equivalent_lcis.items() if key[2] == jobs[0].background_db}
 
-        # Adds all the lci_dict together in a big dict
-        big_dict = {k: v for lci in self.lcis for k, v in lci.lci_dict.items()}
-        self.database.write(big_dict)
+            lcis = []
+            location_groups = {}
+            for job in jobs:
+                location_groups.setdefault((job.route, job.product), []).append(job)
+            for location_jobs in location_groups.values():
+                for lci in self._build_shared_lcis(location_jobs):
+                    lcis.append(lci)
+                    print(f"Finished LCI for route: {lci.route.value}, scenario: {lci.scenario.value}, product: {lci.product.value}, year: {lci.year}, location: {lci.location.value}")
+            self._append_to_database(self.foreground_db_name, {k: v for lci in lcis for k, v in lci.lci_dict.items()})
 
-    def build_lci(self, route:Route, product:Product, year: int, scenario:Scenario, location:Location):
-        """Build a sifngle LCI for a specific (route, product, year, scenario, location)."""
-        mfa_df, lci_builder_df = self._read_inputs(route=route, product=product, year=year, scenario=scenario)
+            if superstructure is not None:
+                solver = superstructure.for_scenario(BrightwayHelpers.resolve_superstructure_scenario_name(scenario=scenario, year=year))
+            elif solver_key != (jobs[0].background_db, jobs[0].scrap_db):
+                solver_key = (jobs[0].background_db, jobs[0].scrap_db)
+                solver = self._partition_solver(lcia_methods)
+            lcia_results = self._score_lcis(lcia_methods, solver, lcis, done=len(self.lcia_results), total=len(plan.jobs))
+
+            if store_inventories:
+                inventory_groups.append((solver.biosphere_index, self._inventory_vectors(solver, lcis), [result.lci for result in lcia_results]))
+
+            StorageHelper.save_partition(run_folder, f"{scenario.value}_{year}", lcis, lcia_results)
+            self.lcia_results.extend(replace(result, lci=self._stripped_lci(result.lci)) for result in lcia_results)
+
+        if store_inventories:
+            self.inventories = InventoryStore.combine(inventory_groups)
+        self._mfa_frames = {}
+        self._equivalent_lcis = {}
+        for database_name in self.foreground_database_names():
+            bd.Database(database_name).process()
+        return run_folder
+
+    def _prefetched_partitions(self, partitions: dict, prefetch: int):
+        """Yield ((year, scenario), jobs, MFA frames) per partition, reading up to ``prefetch`` partitions ahead on a background thread.
+
+        A partition is only read once a slot is free, so at most ``prefetch`` read partitions wait
+        beside the one being processed.
+        """
+        inputs = queue.Queue()
+        slots = threading.Semaphore(max(prefetch, 1))
+
+        def read_partitions():
+            try:
+                for partition_key, jobs in partitions.items():
+                    slots.acquire()
+                    inputs.put((partition_key, jobs, self._read_mfa_frames(jobs)))
+            except Exception as exc:
+                inputs.put(exc)
+                return
+            inputs.put(None)
+
+        reader = threading.Thread(target=read_partitions, name="partition-reader", daemon=True)
+        reader.start()
+        while True:
+            item = inputs.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            slots.release()
+            yield item
+        reader.join()
+
+    def _partition_solver(self, lcia_methods) -> BackgroundSolver:
+        """Solver covering only the current background database and, if it exists, the scrap database."""
+        activities = [next(iter(self.background_db))]
+        if self.scrap.name in bd.databases:
+            activities += list(self.scrap)
+        return BackgroundSolver.from_activities(activities, lcia_methods)
+
+    @staticmethod
+    def _append_to_database(database_name: str, lci_dict: dict) -> None:
+        """Add activities to a database without rewriting it; databases are processed once at the end of a pipelined run."""
+        database = bd.Database(database_name)
+        if database_name not in bd.databases:
+            database.register()
+        with sqlite3_lci_db.db.atomic():
+            for (_, code), dataset in lci_dict.items():
+                activity = database.new_activity(code=code, **{key: value for key, value in dataset.items() if key != "exchanges"})
+                activity.save()
+                for exchange in dataset["exchanges"]:
+                    activity.new_exchange(**exchange).save()
+
+    @staticmethod
+    def _stripped_lci(lci: SingleLCI) -> SingleLCI:
+        """Copy of an LCI without its activities, MFA rows and exchange terms, for results kept in memory."""
+        return replace(lci, lci_dict={}, mfa_values=[], mfa_flow_ids=[], input_rows=[], exchange_terms=[])
+
+    def _set_partition_databases(self, job: LCIJob, add_scrap: bool) -> None:
+        """Point the builder to the background and scrap database of a job, building the scrap database if requested."""
+        self.background_db = bd.Database(job.background_db)
+        self.foreground_db_name = self._foreground_db_name(job.background_db)
+        scrap_db_name = job.scrap_db
+        if add_scrap and scrap_db_name not in self.built_scrap_dbs:
+            if scrap_db_name in bd.databases:
+                bd.Database(scrap_db_name).deregister()
+            self.scrap = bd.Database(scrap_db_name)
+            scrap_processes = self.build_scrap_processes()
+            self.scrap.write({k: v for d in scrap_processes for k, v in d.items()})
+            self.built_scrap_dbs.add(scrap_db_name)
+        else:
+            self.scrap = bd.Database(scrap_db_name)
+
+    def _build_shared_lcis(self, jobs: List[LCIJob]) -> List[SingleLCI]:
+        """Build the LCI of jobs that differ only in location once, reusing an equivalent earlier LCI if there is one.
+
+        The location does not filter the MFA data, so all locations share one LCI (and its activities).
+        An earlier LCI is equivalent when it has the same route, product, background (and scrap, if used)
+        database and MFA rows; it is then copied under the new year/scenario label instead of being rebuilt.
+        """
+        job = jobs[0]
+        mfa_df, lci_builder_df = self._read_inputs(route=job.route, product=job.product, year=job.year, scenario=job.scenario)
+        if lci_builder_df is None:
+            return []
+
+        uses_scrap = lci_builder_df["Linked process"].astype(str).str.upper().str.startswith(ExternalDatabase.SCRAP.value).any()
+        equivalence_key = (job.route, job.product, job.background_db, job.scrap_db if uses_scrap else None, self._mfa_fingerprint(mfa_df))
+        equivalent_lci = self._equivalent_lcis.get(equivalence_key)
+        if equivalent_lci is not None:
+            print(f"Reusing equivalent LCI ({equivalent_lci.scenario.value} {equivalent_lci.year}) for route: {job.route.value}, scenario: {job.scenario.value}, product: {job.product.value}, year: {job.year}")
+            lci = self._relabel_lci(equivalent_lci, year=job.year, scenario=job.scenario)
+        else:
+            lci = self.build_lci(route=job.route, product=job.product, year=job.year, scenario=job.scenario, location=job.location, inputs=(mfa_df, lci_builder_df))
+            if lci is None:
+                return []
+            self._equivalent_lcis[equivalence_key] = lci
+        return [replace(lci, location=location_job.location) for location_job in jobs]
+
+    @staticmethod
+    def _mfa_fingerprint(mfa_df: pd.DataFrame) -> str:
+        """Hash of the MFA rows of one year/scenario, ignoring only the Year and Scenario labels.
+
+        Flow IDs, layers and values all select or scale exchanges, so every other column is hashed
+        (with its name, in row order, as exchange terms refer to row positions).
+        """
+        content = mfa_df.drop(columns=["Year", "Scenario"])
+        digest = hashlib.sha256("\x1f".join(map(str, content.columns)).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(content, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _relabel_lci(lci: SingleLCI, year: int, scenario: Scenario) -> SingleLCI:
+        """Copy an LCI under another year/scenario label, with new activity codes and names."""
+        old_suffix = f" - {lci.year} - {lci.scenario.value}".lower()
+        new_suffix = f" - {year} - {scenario.value}".lower()
+        lci_dict = {}
+        for (database_name, _), activity in lci.lci_dict.items():
+            production_exchange = next(exchange for exchange in activity["exchanges"] if exchange["type"] == "production")
+            activity_id, activity_dict = BrightwayHelpers.build_base_process(
+                name=activity["name"][:-len(old_suffix)] + new_suffix,
+                database_name=database_name,
+                is_waste=production_exchange["amount"] < 0,
+            )
+            activity_dict[(database_name, activity_id)]["exchanges"] += [
+                {field: value for field, value in exchange.items() if field != "output"}  # set to the old activity once it was written
+                for exchange in activity["exchanges"] if exchange["type"] != "production"
+            ]
+            lci_dict.update(activity_dict)
+        return replace(
+            lci,
+            year=year,
+            scenario=scenario,
+            lci_dict=lci_dict,
+            main_activity_flow_name=lci.main_activity_flow_name[:-len(old_suffix)] + new_suffix,
+            avoided_impacts_flow_name=lci.avoided_impacts_flow_name[:-len(old_suffix)] + new_suffix,
+        )
+
+    def build_lci(self, route:Route, product:Product, year: int, scenario:Scenario, location:Location, inputs: tuple = None):
+        """Build a sifngle LCI for a specific (route, product, year, scenario, location).
+
+        ``inputs`` can pass (mfa_df, lci_builder_df) when they were already read.
+        """
+        mfa_df, lci_builder_df = inputs or self._read_inputs(route=route, product=product, year=year, scenario=scenario)
         if lci_builder_df is None:
             return
 
         lci_dict = {}
+        row_positions = {}
+        exchange_terms = []
 
-        main_activity_id, main_activity_flow_name, input_amount, product_list = self._build_main_activity(
+        main_activity_id, main_activity_flow_name, input_amount, product_list, input_rows = self._build_main_activity(
             lci_dict=lci_dict,
             lci_builder_df=lci_builder_df,
             route=route,
             year=year,
             scenario=scenario,
             mfa_df=mfa_df,
+            row_positions=row_positions,
         )
 
         if input_amount == 0:
@@ -117,6 +390,8 @@ class LCABuilder:
             product_list=product_list,
             mfa_df=mfa_df,
             input_amount=input_amount,
+            row_positions=row_positions,
+            exchange_terms=exchange_terms,
         )
 
         self._add_external_exchanges(
@@ -126,8 +401,12 @@ class LCABuilder:
             product_list=product_list,
             mfa_df=mfa_df,
             input_amount=input_amount,
+            row_positions=row_positions,
+            exchange_terms=exchange_terms,
         )
 
+        used_rows = mfa_df.loc[list(row_positions)]
+
         return SingleLCI(
             main_activity_flow_name=main_activity_flow_name,
             avoided_impacts_flow_name=avoided_impacts_flow_name,
@@ -137,48 +416,83 @@ class LCABuilder:
             year=year,
             location=location,
             lci_dict=lci_dict,
-            total_inflow_amount=input_amount)
+            total_inflow_amount=input_amount,
+            mfa_values=[float(value) for value in used_rows["Value"]],
+            mfa_flow_ids=[str(flow_id) for flow_id in used_rows["Stock/Flow ID"]],
+            input_rows=input_rows,
+            exchange_terms=exchange_terms,
+            database_name=self.foreground_db_name)
 
     def _read_inputs(self, route: Route, product: Product, year: int, scenario: Scenario):
         """Load inputs for route/product and filter MFA by year/scenario.
 
+        Uses the rows read by _prepare_mfa_inputs when available, otherwise streams the whole file.
         Returns (mfa_df_filtered, lci_builder_df) or (mfa_df_filtered, None) if sheet missing.
         """
         input_folder = INPUT_DATA_FOLDER / route.value
 
-        mfa_df = pd.read_csv(input_folder / "rm_output.csv").fillna("")
-        if product.value in pd.ExcelFile(input_folder / "lci_builder.xlsx").sheet_names:
-            lci_builder_df = pd.read_excel(
-                input_folder / "lci_builder.xlsx",
-                sheet_name=product.value,
-                dtype={"Layer": str}
-            ).fillna("")
-        else:
-            return mfa_df[(mfa_df["Year"] == year) & (mfa_df["Scenario"] == scenario.value)], None
-
+        mfa_df = self._mfa_frames.get(route)
+        if mfa_df is None:
+            mfa_df = MFAReader.read(input_folder / "rm_output.csv")
         mfa_df = mfa_df[
             (mfa_df["Year"] == year) &
             (mfa_df["Scenario"] == scenario.value)
         ]
-        return mfa_df, lci_builder_df
+        return mfa_df, self._read_lci_builder_sheet(route=route, product=product)
+
+    def _read_lci_builder_sheet(self, route: Route, product: Product):
+        """Return the lci_builder sheet of a product, or None if the route has no sheet for it."""
+        input_folder = INPUT_DATA_FOLDER / route.value
+        sheets = WorkbookCache.load(input_folder / "lci_builder.xlsx", dtype=LCI_BUILDER_DTYPES)
+        if product.value not in sheets:
+            return None
+        return sheets[product.value].fillna("")
+
+    def _prepare_mfa_inputs(self, plan: RunPlan) -> None:
+        """Read each planned route's rm_output.csv once, keeping only the rows its planned LCIs can use."""
+        self._mfa_frames = self._read_mfa_frames(plan.jobs)
 
-    def _build_main_activity(self,  lci_dict: dict, lci_builder_df: pd.DataFrame, route: Route, year: int, scenario: Scenario, mfa_df: pd.DataFrame):
+    def _read_mfa_frames(self, jobs: List[LCIJob]) -> dict:
+        """Return {route: MFA rows} for the given jobs, streaming each route's rm_output.csv once.
+
+        Rows are filtered on the Stock/Flow IDs and Layer 1 products referenced by the selected
+        lci_builder sheets and on the jobs' years and scenarios, so memory scales with the rows used.
+        """
+        mfa_frames = {}
+        route_jobs = {}
+        for job in jobs:
+            route_jobs.setdefault(job.route, []).append(job)
+        for route, jobs in route_jobs.items():
+            lci_builder_dfs = [self._read_lci_builder_sheet(route=route, product=product) for product in dict.fromkeys(job.product for job in jobs)]
+            flow_ids, products = MFAReader.required_filters(df for df in lci_builder_dfs if df is not None)
+            mfa_frames[route] = MFAReader.read(
+                INPUT_DATA_FOLDER / route.value / "rm_output.csv",
+                flow_ids=flow_ids,
+                products=products,
+                years={job.year for job in jobs},
+                scenarios={job.scenario.value for job in jobs},
+            )
+            print(f"Read {len(mfa_frames[route])} relevant MFA rows for route {route.value}")
+        return mfa_frames
+
+    def _build_main_activity(self,  lci_dict: dict, lci_builder_df: pd.DataFrame, route: Route, year: int, scenario: Scenario, mfa_df: pd.DataFrame, row_positions: dict):
         """Create the main activity and compute total inflow amount.
 
-        Returns (main_activity_id, main_activity_flow_name, input_amount, product_list).
+        Returns (main_activity_id, main_activity_flow_name, input_amount, product_list, input_rows).
         """
         main_activity_row = lci_builder_df[lci_builder_df["LCI Flow Type"]=="production"]
         main_activity_flow_name = f"{route_lci_names[route]} {main_activity_row['LCI Flow Name'].iloc[0]} - {year} - {scenario.value}".lower()
         main_activity_id, main_activity_dict = BrightwayHelpers.build_base_process(
             name=main_activity_flow_name,
-            database_name=self.database_name,
+            database_name=self.foreground_db_name,
             is_waste=True
         )
         lci_dict.update(main_activity_dict)
         input_flow_ids = [m.strip() for m in main_activity_row.iloc[0]['Stock/Flow IDs'].split(',')]
         product_list = [] if not main_activity_row["Materials"].iloc[0] else [m.strip() for m in main_activity_row["Materials"].iloc[0].split(',')]
-        input_amount = self.calculate_flow_amount(mfa_df=mfa_df, flows_list=input_flow_ids, product_list=product_list, layer="")
-        return main_activity_id, main_activity_flow_name, input_amount, product_list
+        input_rows = self.select_flow_rows(mfa_df=mfa_df, flows_list=input_flow_ids, product_list=product_list, layer="")
+        input_amount = mfa_df.loc[input_rows, "Value"].sum()
+        return main_activity_id, main_activity_flow_name, input_amount, product_list, self._register_rows(row_positions, input_rows)
 
     def _build_avoided_activity(self, lci_dict: dict, lci_builder_df: pd.DataFrame, route: Route, year: int, scenario: Scenario):
         """Create the avoided impacts activity.
@@ -189,33 +503,36 @@ class LCABuilder:
         avoided_impacts_flow_name =  f"avoided impacts for {route_lci_names[route]} {main_activity_row['LCI Flow Name'].iloc[0]} - {year} - {scenario.value}".lower()
         avoided_impacts_activity_id, avoided_impacts_dict = BrightwayHelpers.build_base_process(
             name=avoided_impacts_flow_name,
-            database_name=self.database_name,
+            database_name=self.foreground_db_name,
             is_waste=False
         )
         lci_dict.update(avoided_impacts_dict)
         return avoided_impacts_activity_id, avoided_impacts_flow_name
 
-    def _add_recovered_materials(self, lci_dict: dict, lci_builder_df: pd.DataFrame, avoided_impacts_activity_id: str, product_list: list, mfa_df: pd.DataFrame, input_amount: float) -> None:
+    def _add_recovered_materials(self, lci_dict: dict, lci_builder_df: pd.DataFrame, avoided_impacts_activity_id: str, product_list: list, mfa_df: pd.DataFrame, input_amount: float, row_positions: dict, exchange_terms: List[ExchangeTerm]) -> None:
         """Add recovered material exchanges to the avoided impacts activity."""
         output_recovered_material_rows = lci_builder_df[
     (lci_builder_df["Flow Direction"] == "recovered") |
     (lci_builder_df["LCI Flow Type"] == "recovered")
     ]
-        for _, output_reco_row in output_recovered_material_rows.iterrows():
+        for row_index, output_reco_row in output_recovered_material_rows.iterrows():
             material_list = [m.strip() for m in output_reco_row["Materials"].split(',') if m.strip()]
             flows_list = [m.strip() for m in output_reco_row["Stock/Flow IDs"].split(',') if m.strip()]
             multiplier = self._get_recovery_multiplier(output_reco_row)
 
             if flows_list:
-                total_material = self.calculate_flow_amount(
+                material_rows = self.select_flow_rows(
                     mfa_df=mfa_df,
                     flows_list=flows_list,
                     product_list=product_list,
                     material_list=material_list,
-                    layer=str(output_reco_row["Layer"])) * multiplier
+                    layer=str(output_reco_row["Layer"]))
+                total_material = mfa_df.loc[material_rows, "Value"].sum() * multiplier
                 amount_per_unit = total_material / input_amount
+                builder_amount, numerator_rows = 1.0, self._register_rows(row_positions, material_rows)
             elif output_reco_row.get("Amount") != "":
                 amount_per_unit = float(output_reco_row["Amount"]) * multiplier
+                builder_amount, numerator_rows = float(output_reco_row["Amount"]), None
             else:
                 continue
 
@@ -238,34 +555,59 @@ class LCABuilder:
                 reference_product=reference_product if linked_process_database == ExternalDatabase.ECOINVENT else None,
             )
             self._merge_exchange(
-                lci_dict[(self.database_name, avoided_impacts_activity_id)]["exchanges"],
+                lci_dict[(self.foreground_db_name, avoided_impacts_activity_id)]["exchanges"],
                 avoided_impact_exchange,
             )
+            exchange_terms.append(ExchangeTerm(
+                role="avoided",
+                input=avoided_impact_exchange["input"],
+                type=avoided_impact_exchange["type"],
+                label=output_reco_row["LCI Flow Name"],
+                builder_row=row_index,
+                sign=BrightwayHelpers.exchange_sign(database=linked_process_database, flow_direction="output"),
+                builder_amount=builder_amount,
+                uses_amount=numerator_rows is None,
+                factor=multiplier,
+                numerator_rows=numerator_rows,
+                scaling_rows=None,
+                per_input=numerator_rows is not None,
+                database=linked_process_database.value,
+                process_name=linked_process_name,
+                location=output_reco_row["Region"] if output_reco_row["Region"] else "RER",
+                reference_product=reference_product if linked_process_database == ExternalDatabase.ECOINVENT else None,
+                categories=tuple(map(str.strip, output_reco_row["Categories"].split(", "))),
+            ))
 
-    def _add_external_exchanges(self, lci_dict: dict, lci_builder_df: pd.DataFrame, main_activity_id: str, product_list: list, mfa_df: pd.DataFrame, input_amount: float) -> None:
+    def _add_external_exchanges(self, lci_dict: dict, lci_builder_df: pd.DataFrame, main_activity_id: str, product_list: list, mfa_df: pd.DataFrame, input_amount: float, row_positions: dict, exchange_terms: List[ExchangeTerm]) -> None:
         """Add external exchanges (ecoinvent/biosphere) to the main activity."""
         external_activity_rows = lci_builder_df[(lci_builder_df['Linked process']!='')&(lci_builder_df['Flow Direction']!="recovered")&(lci_builder_df['LCI Flow Type']!="recovered")]
-        for _, external_row in external_activity_rows.iterrows():
+        for row_index, external_row in external_activity_rows.iterrows():
+            numerator_rows, scaling_rows, factor = None, None, 1.0
             if external_row['Stock/Flow IDs']:
-                total_flow = self.calculate_flow_amount(
+                flow_rows = self.select_flow_rows(
                     mfa_df=mfa_df,
                     product_list=product_list,
                     material_list=[m.strip() for m in external_row["Materials"].split(',')],
                     flows_list=[m.strip() for m in external_row["Stock/Flow IDs"].split(',')],
                     layer=str(external_row['Layer']))
+                total_flow = mfa_df.loc[flow_rows, "Value"].sum()
                 amount = total_flow/input_amount
+                numerator_rows = self._register_rows(row_positions, flow_rows)
             elif external_row["Scaled by flows"]:
                 scaled_by_flows = [m.strip() for m in external_row["Scaled by flows"].split(',')]
-                scaling_ratio = self.calculate_flow_amount(
+                scaling_flow_rows = self.select_flow_rows(
                     mfa_df=mfa_df,
                     flows_list=scaled_by_flows,
                     product_list=product_list,
-                    )/input_amount
+                    )
+                scaling_ratio = mfa_df.loc[scaling_flow_rows, "Value"].sum()/input_amount
                 if "Element to compound ratio" in external_row and not external_row["Element to compound ratio"]=="":
                     element_to_compound_ratio = float(external_row["Element to compound ratio"])
                 else:
                     element_to_compound_ratio = 1
                 amount = external_row['Amount']*scaling_ratio / element_to_compound_ratio
+                scaling_rows = self._register_rows(row_positions, scaling_flow_rows)
+                factor = 1 / element_to_compound_ratio
             else:
                 amount = external_row['Amount']
             linked_process_database, linked_process_name = tuple(external_row['Linked process'].split(':'))
@@ -286,23 +628,47 @@ class LCABuilder:
                 reference_product=reference_product if linked_process_database == ExternalDatabase.ECOINVENT else None,
             )
             self._merge_exchange(
-                lci_dict[(self.database_name, main_activity_id)]["exchanges"],
+                lci_dict[(self.foreground_db_name, main_activity_id)]["exchanges"],
                 external_exchange,
             )
+            exchange_terms.append(ExchangeTerm(
+                role="main",
+                input=external_exchange["input"],
+                type=external_exchange["type"],
+                label=external_row["LCI Flow Name"],
+                builder_row=row_index,
+                sign=BrightwayHelpers.exchange_sign(database=linked_process_database, flow_direction=external_row["Flow Direction"]),
+                builder_amount=1.0 if numerator_rows is not None else float(external_row['Amount']),
+                uses_amount=numerator_rows is None,
+                factor=factor,
+                numerator_rows=numerator_rows,
+                scaling_rows=scaling_rows,
+                per_input=numerator_rows is not None or scaling_rows is not None,
+                database=linked_process_database.value,
+                process_name=linked_process_name,
+                location=external_row["Region"] if external_row["Region"] else "RER",
+                reference_product=reference_product if linked_process_database == ExternalDatabase.ECOINVENT else None,
+                categories=tuple(map(str.strip, external_row["Categories"].split(", "))),
+            ))
 
     def calculate_flow_amount(self, mfa_df: pd.DataFrame, flows_list: List[str], product_list: List[str], material_list: List[str] = [], layer: str = "4") -> int:
         """Calculate summed flow amount with optional material and layer filters."""
+        rows = self.select_flow_rows(mfa_df=mfa_df, flows_list=flows_list, product_list=product_list, material_list=material_list, layer=layer)
+        return mfa_df.loc[rows, "Value"].sum()
+
+    def select_flow_rows(self, mfa_df: pd.DataFrame, flows_list: List[str], product_list: List[str], material_list: List[str] = [], layer: str = "4") -> list:
+        """Return the index labels of the MFA rows summed by calculate_flow_amount."""
         if not layer:
             # If layer is not specified sum all products together for the total flow
-            return mfa_df[
+            return list(mfa_df.index[
                         (mfa_df["Stock/Flow ID"].isin(flows_list)) 
                         & (mfa_df["Layer 4"] != "" )
                         & (mfa_df["Layer 1"].isin(product_list))
-                    ]["Value"].sum()
+                    ])
 
         if "," not in layer:
             # If all material are in same layer
-            return mfa_df[
+            return list(mfa_df.index[
                     (
                         True 
                         if not material_list 
@@ -317,14 +683,14 @@ class LCABuilder:
                     & (
                         mfa_df["Layer 1"].isin(product_list)
                     )
-                ]["Value"].sum()
+                ])
         
         layers = layer.split(',') if ',' in layer else [layer for _ in range(0, len(material_list))]
         if len(layers)!=len(material_list):
             raise ValueError("number of layers and materials are mismatched")
-        amount = 0
+        rows = []
         for i in range(0, len(material_list)):
-            amount += mfa_df[
+            rows += list(mfa_df.index[
                     (
                         True 
                         if not material_list 
@@ -339,44 +705,342 @@ class LCABuilder:
                     & (
                         mfa_df["Layer 1"].isin(product_list)
                     )
-                ]["Value"].sum()
-        return amount
+                ])
+        return rows
+
+    @staticmethod
+    def _register_rows(row_positions: dict, rows: list) -> List[int]:
+        """Map MFA index labels to positions in SingleLCI.mfa_values, adding unseen rows."""
+        for row in rows:
+            row_positions.setdefault(row, len(row_positions))
+        return [row_positions[row] for row in rows]
+
+    def run_lcia(self, lcia_methods, store_inventories: bool = False):
+        """Compute LCIA for all built LCIs and store results in memory, replacing those of an earlier run.
+
+        The technosphere is factorized once and scored for all methods in one transposed solve;
+        every LCI score and contribution is then read from those per-unit scores. With
+        ``store_inventories`` the biosphere inventories of every LCI are also kept (for ``recharacterize``
+        and ``export_system_processes``), which takes one more batched solve per factorization.
+        """
+        lcia_results, inventory_groups = {}, []
+        for solver, lci_indices in self._lci_solvers(lcia_methods):
+            lci_indices = sorted(lci_indices)
+            lcis = [self.lcis[lci_index] for lci_index in lci_indices]
+            results = self._score_lcis(lcia_methods, solver, lcis, done=len(lcia_results), total=len(self.lcis))
+            lcia_results.update(zip(lci_indices, results))
+            if store_inventories:
+                inventory_groups.append((lci_indices, solver.biosphere_index, self._inventory_vectors(solver, lcis), lcis))
+        self.lcia_results = [lcia_results[lci_index] for lci_index in sorted(lcia_results)]
+        self.inventories = None
+        if store_inventories:
+            # Stored in the order of lcia_results, so inventories and results can be matched by position
+            lci_order = np.argsort([lci_index for group in inventory_groups for lci_index in group[0]], kind="stable")
+            self.inventories = InventoryStore.combine([group[1:] for group in inventory_groups]).reordered(lci_order)
+
+    def _inventory_vectors(self, solver: BackgroundSolver, lcis: List[SingleLCI]):
+        """Biosphere inventories of the main and avoided activity of LCIs (two columns per LCI), solving each distinct LCI once."""
+        columns_by_content, activity_keys, foreground = {}, [], {}
+        for lci in lcis:
+            content_key = self._lci_content_key(lci)
+            if content_key not in columns_by_content:
+                columns_by_content[content_key] = len(activity_keys)
+                activity_keys += [self._activity_key(lci, lci.main_activity_flow_name), self._activity_key(lci, lci.avoided_impacts_flow_name)]
+                foreground.update(lci.lci_dict)
+        inventories = solver.inventories(activity_keys, foreground=foreground)
+        columns = [column for lci in lcis for column in (columns_by_content[self._lci_content_key(lci)], columns_by_content[self._lci_content_key(lci)] + 1)]
+        return inventories[:, columns]
+
+    def recharacterize(self, lcia_methods):
+        """Add scores for (new) LCIA methods to the LCIA results from the stored biosphere inventories, without solving again.
+
+        Uses the inventories of the last run_lcia(store_inventories=True) or, if there are none in memory, the latest saved ones
+        together with the latest saved LCIA results. Contributions are not recomputed.
+        """
+        if self.inventories is None:
+            self.inventories = StorageHelper.load_latest_inventories()
+            if self.inventories is None:
+                return
+            self.lcia_results = StorageHelper.load_latest_lcia_results() or []
+        if [InventoryStore.entry(result.lci) for result in self.lcia_results] != self.inventories.entries:
+            raise ValueError("Stored inventories do not match the LCIA results; run run_lcia(store_inventories=True) again for these LCIs.")
+
+        scores = self.inventories.characterize(InventoryStore.method_vectors(lcia_methods, self.inventories.biosphere_keys))
+        method_labels = [method[1] for method in lcia_methods]
+        for index, result in enumerate(self.lcia_results):
+            result.total_impacts.update(zip(method_labels, scores[2 * index].tolist()))
+            result.avoided_impacts.update(zip(method_labels, scores[2 * index + 1].tolist()))
+
+    def export_system_processes(self, database_name: Optional[str] = None):
+        """Export the main and avoided activities of the LCIA results as aggregated system processes.
+
+        Uses the inventories of the last run_lcia(store_inventories=True) or, if there are none in memory, the latest saved ones
+        together with the latest saved LCIA results. The processes are saved as a Brightway data dict
+        for ``{database_name}_system`` (or ``database_name``) and as a long table of biosphere flows.
+        """
+        if self.inventories is None:
+            self.inventories = StorageHelper.load_latest_inventories()
+            if self.inventories is None:
+                return
+            self.lcia_results = StorageHelper.load_latest_lcia_results() or []
+        database_name = database_name or f"{self.database_name}_system"
+        data, table = SystemProcessHelper.build(self.inventories, [result.lci for result in self.lcia_results], database_name)
+        StorageHelper.save_system_processes(database_name, data, table)
+        return data, table
+
+    def _score_lcis(self, lcia_methods, solver: BackgroundSolver, lcis: List[SingleLCI], done: int, total: int) -> List[SingleLCIAResult]:
+        """Score LCIs with one solver; LCIs with identical activity content (e.g. several locations) are scored once and fanned out."""
+        results, results_by_content = [], {}
+        for lci in lcis:
+            content_key = self._lci_content_key(lci)
+            if content_key in results_by_content:
+                results.append(replace(results_by_content[content_key], lci=lci))
+                continue
+            print(
+                f"Running LCIA {done + len(results) + 1}/{total} for {lci.main_activity_flow_name}",
+                flush=True,
+            )
+            results_by_content[content_key] = self.compute_lcia_for_lci(lcia_methods=lcia_methods, lci=lci, solver=solver)
+            results.append(results_by_content[content_key])
+        return results
+
+    def _lci_content_key(self, lci: SingleLCI) -> tuple:
+        """Exchanges of the main and avoided activity of an LCI, independent of activity names and codes."""
+        return tuple(
+            BrightwayHelpers.activity_fingerprint(lci.lci_dict[self._activity_key(lci, flow_name)])
+            for flow_name in (lci.main_activity_flow_name, lci.avoided_impacts_flow_name)
+        )
+
+    def _lci_solvers(self, lcia_methods):
+        """Yield (solver, indices of self.lcis) pairs, one factorization per group of LCIs.
+
+        Without superstructure there is one solver per foreground database, covering the backgrounds it
+        links to (a single one with ``partition_by_background``); with superstructure there is one patched
+        solver per scenario column.
+        """
+        if not self.use_superstructure:
+            database_groups = {}
+            for lci_index, lci in enumerate(self.lcis):
+                database_groups.setdefault(self._lci_database_name(lci), []).append(lci_index)
+            for database_name, lci_indices in database_groups.items():
+                yield BackgroundSolver.from_database(database_name, lcia_methods), lci_indices
+            return
+
+        foreground_activities = [activity for database_name in dict.fromkeys(self._lci_database_name(lci) for lci in self.lcis) for activity in bd.Database(database_name)]
+        superstructure = SuperstructureSolver.from_activities(foreground_activities, lcia_methods)
+        lci_groups = {}
+        for lci_index, lci in enumerate(self.lcis):
+            scenario_column = BrightwayHelpers.resolve_superstructure_scenario_name(scenario=lci.scenario, year=lci.year)
+            lci_groups.setdefault(scenario_column, []).append(lci_index)
+        for scenario_column, lci_indices in lci_groups.items():
+            print(f"Patching superstructure matrices for scenario {scenario_column}", flush=True)
+            yield superstructure.for_scenario(scenario_column), lci_indices
+
+    def compute_lcia_for_lci(self, lcia_methods, lci, solver: BackgroundSolver = None):
+        """Compute the main and avoided scores of an LCI, with contributions per exchange and recovered material."""
+        if solver is None:
+            solver = BackgroundSolver.from_database(self._lci_database_name(lci), lcia_methods)
+        method_labels = solver.method_labels()
+
+        main_key = self._activity_key(lci, lci.main_activity_flow_name)
+        avoided_key = self._activity_key(lci, lci.avoided_impacts_flow_name)
+        total_impacts = dict(zip(method_labels, self._activity_scores(solver, lci, main_key).tolist()))
+        avoided_impacts = dict(zip(method_labels, self._activity_scores(solver, lci, avoided_key).tolist()))
+
+        exchange_contributions, impact_per_element = self._contribution_breakdowns(
+            lci=lci,
+            method_labels=method_labels,
+            unit_scores=solver.term_unit_scores(lci.exchange_terms),
+            activity_keys={"main": main_key, "avoided": avoided_key},
+        )
+        return SingleLCIAResult(
+            total_impacts=total_impacts,
+            avoided_impacts=avoided_impacts,
+            lci=lci,
+            exchange_contributions=exchange_contributions,
+            impact_per_element=impact_per_element,
+        )
+
+    @staticmethod
+    def _activity_scores(solver: BackgroundSolver, lci: SingleLCI, activity_key: tuple) -> np.ndarray:
+        """Scores of an LCI activity; activities not in the solver's matrices (pipelined mode) are scored from their exchanges."""
+        if activity_key in solver.product_index:
+            return solver.activity_scores(activity_key)
+        return solver.foreground_scores(activity_key, lci.lci_dict)
+
+    def _contribution_breakdowns(self, lci: SingleLCI, method_labels: List[str], unit_scores: np.ndarray, activity_keys: dict):
+        """Split the scores of an LCI over its exchanges and recovered materials, given the per-unit scores of its terms.
+
+        Returns (exchange_contributions, impact_per_element) as stored on SingleLCIAResult.
+        """
+        exchange_contributions = {"normal": {label: {} for label in method_labels}, "avoided": {label: {} for label in method_labels}}
+        impact_per_element = {label: {} for label in method_labels}
+        if not lci.exchange_terms:
+            return exchange_contributions, impact_per_element
+
+        contributions = ExchangeTerms.contributions(lci, unit_scores)
+        for role, impact_type in (("main", "normal"), ("avoided", "avoided")):
+            exchange_names = {exchange["input"]: exchange["name"] for exchange in lci.lci_dict[activity_keys[role]]["exchanges"]}
+            for term, term_contributions in zip(lci.exchange_terms, contributions):
+                if term.role != role:
+                    continue
+                for label, value in zip(method_labels, term_contributions.tolist()):
+                    per_exchange = exchange_contributions[impact_type][label]
+                    per_exchange[exchange_names[term.input]] = per_exchange.get(exchange_names[term.input], 0.0) + value
+                    if role == "avoided":
+                        impact_per_element[label][term.label] = impact_per_element[label].get(term.label, 0.0) + value
+        return exchange_contributions, impact_per_element
+
+    @staticmethod
+    def _activity_key(lci: SingleLCI, flow_name: str) -> tuple:
+        """Key of the activity in lci_dict with the given (lower case) name."""
+        return next(key for key, activity in lci.lci_dict.items() if activity["name"].lower() == flow_name)
+
+    def run_interpolated_lcia(self, lcia_methods):
+        """Compute LCIA for all built LCIs, interpolating the background linearly between scenario database years.
+
+        Only the anchor-year databases (``SCENARIO_DATABASE_YEARS``) are scored; each exchange of an
+        intermediate year is relinked to the two bracketing databases and its per-unit score is the
+        weighted mean of both, combined with the year-specific MFA amounts of the LCI.
+        """
+        anchors = {lci_key: BrightwayHelpers.resolve_scenario_anchor_weights(scenario=lci_key[0], year=lci_key[1]) for lci_key in {(lci.scenario, lci.year) for lci in self.lcis}}
+        anchor_db_names = sorted({db_name for weights in anchors.values() for db_name, _ in weights})
+        demand_activities = [next(iter(bd.Database(db_name))) for db_name in anchor_db_names]
+        for lci in self.lcis:
+            demand_activities += self._scrap_anchor_activities(lci, anchors[(lci.scenario, lci.year)])
+            if not lci.exchange_terms:
+                demand_activities += [bd.get_activity(key) for key in lci.lci_dict]
+        solver = BackgroundSolver.from_activities(demand_activities, lcia_methods)
+        method_labels = solver.method_labels()
 
-    def run_lcia(self, lcia_methods):
-        """Compute LCIA for all built LCIs and store results in memory."""
         total_lcis = len(self.lcis)
         for index, lci in enumerate(self.lcis, start=1):
             print(
-                f"Running LCIA {index}/{total_lcis} for {lci.main_activity_flow_name}",
+                f"Running interpolated LCIA {index}/{total_lcis} for {lci.main_activity_flow_name}",
                 flush=True,
             )
-            lcia_result = self.compute_lcia_for_lci(lcia_methods=lcia_methods, lci=lci)
-            self.lcia_results.append(lcia_result)
-
-    def compute_lcia_for_lci(self, lcia_methods, lci):
-        main_act = next(act for act in self.database if lci.main_activity_flow_name == act["name"].lower())
-        avoided_act = next(act for act in self.database if lci.avoided_impacts_flow_name == act["name"].lower())
-
-        total_impacts, avoided_impacts = {}, {}
-
-        lca = bc.LCA({main_act: -1}, lcia_methods[0])
-        lca.lci()
-        for method in lcia_methods:
-            if method != lca.method:
-                lca.switch_method(method)
-            lca.lcia()
-            total_impacts[method[1]] = lca.score
-
-        lca_avoided = bc.LCA({avoided_act: -1}, lcia_methods[0])
-        lca_avoided.lci()
-        for method in lcia_methods:
-            if method != lca_avoided.method:
-                lca_avoided.switch_method(method)
-            lca_avoided.lcia()
-            avoided_impacts[method[1]] = lca_avoided.score
-
-        return SingleLCIAResult(total_impacts=total_impacts, avoided_impacts=avoided_impacts, lci=lci)
-    
+            if not lci.exchange_terms:
+                print(f"⚠️ LCI {lci.main_activity_flow_name} has no exchange terms (built by an older version); using its linked database without interpolation.")
+                self.lcia_results.append(self.compute_lcia_for_lci(lcia_methods=lcia_methods, lci=lci, solver=solver))
+                continue
+
+            unit_scores = np.zeros((len(lci.exchange_terms), len(method_labels)))
+            for db_name, weight in anchors[(lci.scenario, lci.year)]:
+                relinked_terms = [self._relink_term(term, bd.Database(db_name), lci) for term in lci.exchange_terms]
+                unit_scores += weight * solver.term_unit_scores(relinked_terms)
+
+            main_key = self._activity_key(lci, lci.main_activity_flow_name)
+            avoided_key = self._activity_key(lci, lci.avoided_impacts_flow_name)
+            exchange_contributions, impact_per_element = self._contribution_breakdowns(
+                lci=lci,
+                method_labels=method_labels,
+                unit_scores=unit_scores,
+                activity_keys={"main": main_key, "avoided": avoided_key},
+            )
+            self.lcia_results.append(SingleLCIAResult(
+                total_impacts={label: sum(exchange_contributions["normal"][label].values()) for label in method_labels},
+                avoided_impacts={label: sum(exchange_contributions["avoided"][label].values()) for label in method_labels},
+                lci=lci,
+                exchange_contributions=exchange_contributions,
+                impact_per_element=impact_per_element,
+            ))
+
+    def _relink_term(self, term: ExchangeTerm, background_db: bd.Database, lci: SingleLCI) -> ExchangeTerm:
+        """Return a copy of an exchange term whose input is resolved in another background (and scrap) database."""
+        if term.database == ExternalDatabase.ECOINVENT.value:
+            input_key = BrightwayHelpers.find_external_db_key_by_name(
+                name=term.process_name,
+                database=background_db,
+                location=term.location,
+                reference_product=term.reference_product,
+            )
+        elif term.database == ExternalDatabase.SCRAP.value:
+            scrap_db_name = BrightwayHelpers.resolve_scrap_db_name(scenario=lci.scenario, year=int(background_db.name.rsplit("_", 1)[1]))
+            if scrap_db_name not in bd.databases:
+                return term
+            input_key = BrightwayHelpers.find_external_db_key_by_name(
+                name=term.process_name,
+                database=bd.Database(scrap_db_name),
+                location=term.location,
+                reference_product=term.reference_product,
+            )
+        else:
+            return term
+        return replace(term, input=input_key)
+
+    @staticmethod
+    def _scrap_anchor_activities(lci: SingleLCI, weights: list) -> list:
+        """One activity of each scrap database an LCI's scrap terms resolve to across its anchors, so the solver includes them.
+
+        An anchor whose scrap database was not built keeps the LCI's own scrap inputs (see ``_relink_term``),
+        so the LCI's own scrap database is included instead.
+        """
+        own_scrap_db_names = {term.input[0] for term in lci.exchange_terms if term.database == ExternalDatabase.SCRAP.value}
+        if not own_scrap_db_names:
+            return []
+        scrap_db_names = set()
+        for db_name, _ in weights:
+            scrap_db_name = BrightwayHelpers.resolve_scrap_db_name(scenario=lci.scenario, year=int(db_name.rsplit("_", 1)[1]))
+            if scrap_db_name in bd.databases:
+                scrap_db_names.add(scrap_db_name)
+                continue
+            missing = sorted(name for name in own_scrap_db_names if name not in bd.databases)
+            if missing:
+                raise ValueError(f"Scrap database {scrap_db_name} for anchor {db_name} does not exist, and neither does {', '.join(missing)} used by {lci.main_activity_flow_name}")
+            print(f"⚠️ Scrap database {scrap_db_name} for anchor {db_name} does not exist; {lci.main_activity_flow_name} keeps its own scrap inputs for that anchor.")
+            scrap_db_names |= own_scrap_db_names
+        return [next(iter(bd.Database(scrap_db_name))) for scrap_db_name in sorted(scrap_db_names)]
+
+    def run_monte_carlo(self, lcia_methods, config: MonteCarloConfig):
+        """Propagate MFA (and optionally builder Amount) uncertainty through all built LCIs.
+
+        The background is factorized once; each LCI's samples are then scored with one
+        matrix product against the per-unit background scores, instead of re-solving LCAs.
+        """
+        rng = np.random.default_rng(config.seed)
+        total_lcis = len(self.lcis)
+        monte_carlo_results = {}
+        for solver, lci_indices in self._lci_solvers(lcia_methods):
+            method_labels = solver.method_labels()
+            for lci_index in lci_indices:
+                lci = self.lcis[lci_index]
+                print(
+                    f"Running Monte Carlo {len(monte_carlo_results) + 1}/{total_lcis} ({config.iterations} iterations) for {lci.main_activity_flow_name}",
+                    flush=True,
+                )
+                samples = MonteCarloHelper.sample_scores(lci=lci, solver=solver, config=config, rng=rng)
+                monte_carlo_results[lci_index] = MonteCarloHelper.summarize(lci=lci, samples=samples, method_labels=method_labels, config=config)
+        self.monte_carlo_results = [monte_carlo_results[lci_index] for lci_index in sorted(monte_carlo_results)]
+
+    def save_monte_carlo_results(self):
+        """Persist Monte Carlo summaries to a timestamped pickle and Excel file."""
+        StorageHelper.save_monte_carlo_results(self.monte_carlo_results)
+
+    def run_sensitivity(self, lcia_methods):
+        """Compute ranked local sensitivities of every LCI's scores to its lci_builder amounts and Stock/Flow IDs.
+
+        Uses the per-unit scores of one transposed solve per factorization (all methods at once), so the
+        cost does not grow with the number of parameters.
+        """
+        total_lcis = len(self.lcis)
+        sensitivity_results = {}
+        for solver, lci_indices in self._lci_solvers(lcia_methods):
+            for lci_index in lci_indices:
+                lci = self.lcis[lci_index]
+                if not lci.exchange_terms:
+                    print(f"⚠️ LCI {lci.main_activity_flow_name} has no exchange terms (built by an older version); skipping sensitivity analysis.")
+                    continue
+                print(
+                    f"Running sensitivity analysis {len(sensitivity_results) + 1}/{total_lcis} for {lci.main_activity_flow_name}",
+                    flush=True,
+                )
+                sensitivity_results[lci_index] = SensitivityHelper.analyze(lci=lci, solver=solver)
+        self.sensitivity_results = [sensitivity_results[lci_index] for lci_index in sorted(sensitivity_results)]
+
+    def save_sensitivity_results(self):
+        """Persist ranked sensitivities to a timestamped pickle and Excel file."""
+        StorageHelper.save_sensitivity_results(self.sensitivity_results)
+
     def save_lcis(self):
         """Persist built LCIs to a timestamped pickle file."""
         StorageHelper.save_lcis(self.lcis)
@@ -384,21 +1048,49 @@ class LCABuilder:
     def load_latest_lcis(self):
         """Load the latest saved LCIs and write their processes to the database."""
         self.lcis = StorageHelper.load_latest_lcis()
-        big_dict = {k: v for lci in self.lcis for k, v in lci.lci_dict.items()}
-        self.database.write(big_dict)
+        self._write_lcis(self.lcis)
+
+    def load_shard_results(self, manifest_path):
+        """Load the LCIs, LCIA results and inventories of all shards of a manifest and write the LCIs to this builder's database(s)."""
+        self.lcis, self.lcia_results, self.inventories = ShardManifest.load_shard_results(manifest_path)
+        self._build_missing_scrap_databases(self.lcis)
+        self._write_lcis(self.lcis)
+
+    def _build_missing_scrap_databases(self, lcis: List[SingleLCI]) -> None:
+        """Build the scrap databases LCIs link to that are missing from the current project, e.g. when their shards ran in project copies."""
+        for lci in lcis:
+            if not any(term.database == ExternalDatabase.SCRAP.value for term in lci.exchange_terms):
+                continue
+            scrap_db_name = BrightwayHelpers.resolve_scrap_db_name(scenario=lci.scenario, year=lci.year)
+            if scrap_db_name in bd.databases:
+                continue
+            print(f"Building scrap database {scrap_db_name} used by the merged LCIs")
+            self.background_db = bd.Database(SUPERSTRUCTURE_NAME if self.use_superstructure else BrightwayHelpers.resolve_scenario_db_name(scenario=lci.scenario, year=lci.year))
+            self.scrap = bd.Database(scrap_db_name)
+            self.scrap.write({k: v for d in self.build_scrap_processes() for k, v in d.items()})
+            self.built_scrap_dbs.add(scrap_db_name)
 
     def save_database_to_excel(self):
-        """Export the current database to an Excel file in output_data."""
-        StorageHelper.save_database_to_excel(self.database)
+        """Export the foreground database(s) to Excel files in output_data."""
+        for database_name in self.foreground_database_names():
+            StorageHelper.save_database_to_excel(bd.Database(database_name))
 
     def save_lcia_results(self):
-        """Persist LCIA results to a timestamped pickle file."""
+        """Persist LCIA results to a timestamped pickle file, with their biosphere inventories if available."""
         StorageHelper.save_lcia_results(self.lcia_results)
+        StorageHelper.save_impact_cube(self.impact_cube())
+        if self.inventories is not None:
+            StorageHelper.save_inventories(self.inventories)
 
     def load_latest_lcia_results(self):
         """Load the latest saved LCIA results from disk into memory."""
         self.lcia_results = StorageHelper.load_latest_lcia_results()
 
+    def impact_cube(self, lcia_methods=None) -> ImpactCube:
+        """Absolute impacts (per-kg score x total inflow) of the in-memory LCIA results as an ImpactCube."""
+        method_labels = None if lcia_methods is None else [method[1] for method in lcia_methods]
+        return ImpactCube.from_lcia_results(self.lcia_results, method_labels)
+
     def export_lcia_results_to_excel(self, lcia_methods):
         """Export the in-memory LCIA results to an Excel workbook."""
         StorageHelper.save_lcia_results_to_excel(self.lcia_results, lcia_methods)
@@ -431,19 +1123,19 @@ class LCABuilder:
     def build_scrap_processes(self):
         """
         Manually added piece of code to create (scrap) processes that can be universally used by the other processes
+
+        Codes are derived from the scrap database and process name, so a scrap database rebuilt in
+        another project (e.g. by a parallel shard worker) has the same keys.
         """
         scrap_processes = []
-        for sheet_name in pd.ExcelFile(SCRAP_PROCESSES_FILE).sheet_names:
+        for sheet_name, exchanges_list in WorkbookCache.load(SCRAP_PROCESSES_FILE).items():
             activity_id, activity_dict = BrightwayHelpers.build_base_process(
             name=sheet_name,
             database_name=self.scrap.name,
-            is_waste=True
+            is_waste=True,
+            code=hashlib.md5(f"{self.scrap.name}|{sheet_name}".encode("utf-8")).hexdigest(),
             )
-            exchanges_list = pd.read_excel(
-                SCRAP_PROCESSES_FILE,
-                sheet_name=sheet_name,
-            ).fillna("")
-            for _, row in exchanges_list.iterrows():
+            for _, row in exchanges_list.fillna("").iterrows():
                 external_exchange = BrightwayHelpers.build_external_exchange(
                     database=ExternalDatabase(row['database'].upper()),
                     ecoinvent=self.background_db,
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, Optional
+
+import numpy as np
+
+from code_folder.helpers.constants import LOOKUP_TABLES_FOLDER
+
+EVICTION_POLICIES = ("lru", "fifo")
+# Code stored for lookup keys that match more than one node; those fall back to a database scan
+AMBIGUOUS = b""
+
+
+class LookupCache:
+    """
+    Bounded in-process cache with LRU or FIFO eviction and hit/miss counters.
+
+    ``max_size=None`` keeps every entry.
+    """
+    def __init__(self, max_size: Optional[int] = 150, policy: str = "lru"):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{policy}'. Use one of: {', '.join(EVICTION_POLICIES)}")
+        self.max_size = max_size
+        self.policy = policy
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: Hashable):
+        """Cached value of a key, or None (counted as a miss)."""
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.policy == "lru":
+            self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key: Hashable, value) -> None:
+        self._entries[key] = value
+        if self.policy == "lru":
+            self._entries.move_to_end(key)
+        while self.max_size is not None and len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "policy": self.policy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+class LookupTable:
+    """
+    Memory-mapped (lookup key -> code) table of one Brightway database, built once and read by all processes.
+
+    Keys are 64-bit hashes of the normalized lookup tuples, stored sorted next to a fixed-width code
+    column as ``.npy`` files, so worker processes open them with ``mmap_mode="r"`` and share the pages
+    instead of each scanning the database. A table is rebuilt when the database's ``modified``
+    timestamp changes.
+    """
+    _open: Dict[str, Optional["LookupTable"]] = {}
+
+    def __init__(self, keys: np.ndarray, codes: np.ndarray):
+        self.keys = keys
+        self.codes = codes
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def activity_key(name: str, location: str, reference_product: Optional[str] = None) -> tuple:
+        return ("activity", name.strip(), location.strip(), reference_product.strip() if reference_product else None)
+
+    @staticmethod
+    def flow_key(name: str, categories: Iterable[str]) -> tuple:
+        return ("flow", name.strip(), tuple(categories))
+
+    @staticmethod
+    def hash_key(key: tuple) -> int:
+        return int.from_bytes(hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).digest(), "little")
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Code of a lookup key; None if the key is unknown or ambiguous (counted as a miss)."""
+        hashed = np.uint64(self.hash_key(key))
+        position = int(np.searchsorted(self.keys, hashed))
+        if position < len(self.keys) and self.keys[position] == hashed and self.codes[position] != AMBIGUOUS:
+            self.hits += 1
+            return self.codes[position].decode("utf-8")
+        self.misses += 1
+        return None
+
+    def is_ambiguous(self, key: tuple) -> bool:
+        hashed = np.uint64(self.hash_key(key))
+        position = int(np.searchsorted(self.keys, hashed))
+        return position < len(self.keys) and self.keys[position] == hashed and self.codes[position] == AMBIGUOUS
+
+    @classmethod
+    def for_database(cls, database) -> Optional["LookupTable"]:
+        """Open (building it first if missing or stale) the table of a database, once per process.
+
+        Returns None for databases without a ``modified`` timestamp, whose tables could not be validated.
+        """
+        modified = (getattr(database, "metadata", None) or {}).get("modified")
+        if modified is None:
+            return None
+        open_key = f"{database.name}|{modified}"
+        if open_key not in cls._open:
+            folder = cls._folder(database.name)
+            if cls._read_meta(folder).get("modified") != modified:
+                cls.build(database, folder, modified)
+            cls._open[open_key] = cls(
+                keys=np.load(folder / "keys.npy", mmap_mode="r"),
+                codes=np.load(folder / "codes.npy", mmap_mode="r"),
+            )
+        return cls._open[open_key]
+
+    @staticmethod
+    def _folder(database_name: str) -> Path:
+        name_key = hashlib.sha1(database_name.encode("utf-8")).hexdigest()[:12]
+        return LOOKUP_TABLES_FOLDER / f"{''.join(c if c.isalnum() else '_' for c in database_name)}_{name_key}"
+
+    @staticmethod
+    def _read_meta(folder: Path) -> dict:
+        if not (folder / "meta.json").exists():
+            return {}
+        with open(folder / "meta.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def build(database, folder: Path, modified: str) -> None:
+        """Scan a database once and write its activity and biosphere flow lookup keys."""
+        codes: Dict[int, bytes] = {}
+
+        def add(key: tuple, code: str, keep_first: bool = False) -> None:
+            hashed = LookupTable.hash_key(key)
+            if hashed not in codes:
+                codes[hashed] = code.encode("utf-8")
+            elif not keep_first and codes[hashed] != code.encode("utf-8"):
+                codes[hashed] = AMBIGUOUS
+
+        print(f"Building lookup table for {database.name}", flush=True)
+        for node in database:
+            if node.get("location") is not None:
+                add(LookupTable.activity_key(node["name"], node.get("location", "")), node["code"])
+                add(LookupTable.activity_key(node["name"], node.get("location", ""), str(node.get("reference product", ""))), node["code"])
+            if node.get("categories") is not None:
+                # Flow lookups return the first match, as a scan of the database would
+                add(LookupTable.flow_key(node["name"], node["categories"]), node["code"], keep_first=True)
+
+        hashes = np.fromiter(codes, dtype=np.uint64, count=len(codes))
+        order = np.argsort(hashes)
+        values = np.array([codes[int(hashed)] for hashed in hashes[order]], dtype=f"S{max([len(code) for code in codes.values()] + [1])}")
+        os.makedirs(folder, exist_ok=True)
+        # Write next to the final files and swap them in, so readers never see a partial table
+        for file_name, array in (("keys.npy", hashes[order]), ("codes.npy", values)):
+            temporary_path = folder / f"{file_name}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as f:
+                np.save(f, array)
+            os.replace(temporary_path, folder / file_name)
+        temporary_path = folder / f"meta.json.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({"database": database.name, "modified": modified, "keys": len(hashes)}, f)
+        os.replace(temporary_path, folder / "meta.json")
+        print(f"✅ Built lookup table for {database.name} with {len(hashes)} keys in {folder}")
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, int]]:
+        return {open_key.split("|")[0]: {"hits": table.hits, "misses": table.misses, "keys": len(table.keys)} for open_key, table in cls._open.items() if table is not None}
@@ -0,0 +1,70 @@
+from pathlib import Path
+from typing import Iterable, Optional, Set, Tuple
+
+import pandas as pd
+
+MFA_COLUMNS = ["Year", "Scenario", "Stock/Flow ID", "Layer 1", "Layer 2", "Layer 3", "Layer 4", "Value"]
+CATEGORICAL_COLUMNS = ["Scenario", "Layer 1", "Layer 2", "Layer 3", "Layer 4"]
+TEXT_COLUMNS = ["Stock/Flow ID"] + CATEGORICAL_COLUMNS
+
+
+class MFAReader:
+    """Stream rm_output.csv in chunks, keeping only the columns and rows the selected lci_builder sheets can use."""
+
+    chunk_rows = 200_000
+
+    @staticmethod
+    def required_filters(lci_builder_dfs: Iterable[pd.DataFrame]) -> Tuple[Set[str], Set[str]]:
+        """Return the Stock/Flow IDs and Layer 1 products referenced by lci_builder sheets.
+
+        Flow IDs come from 'Stock/Flow IDs' and 'Scaled by flows'; products from the 'Materials' of the
+        production row, which calculate_flow_amount always filters 'Layer 1' on.
+        """
+        flow_ids, products = set(), set()
+        for lci_builder_df in lci_builder_dfs:
+            for column in ("Stock/Flow IDs", "Scaled by flows"):
+                if column in lci_builder_df:
+                    for value in lci_builder_df[column]:
+                        flow_ids.update(m.strip() for m in str(value).split(',') if m.strip())
+            production_rows = lci_builder_df[lci_builder_df["LCI Flow Type"] == "production"]
+            for value in production_rows["Materials"]:
+                products.update(m.strip() for m in str(value).split(',') if m.strip())
+        return flow_ids, products
+
+    @staticmethod
+    def read(
+        path: Path,
+        flow_ids: Optional[Set[str]] = None,
+        products: Optional[Set[str]] = None,
+        years: Optional[Set[int]] = None,
+        scenarios: Optional[Set[str]] = None,
+    ) -> pd.DataFrame:
+        """Read the matching rows of an rm_output.csv; a filter left as None keeps all values.
+
+        Layer and Scenario columns are categorical and Value is float. Missing text cells (pandas' default
+        NA tokens, e.g. "", "NA" or "N/A") are "", as with the former ``pd.read_csv(path).fillna("")``.
+        """
+        chunks = pd.read_csv(
+            path,
+            usecols=MFA_COLUMNS,
+            dtype={"Stock/Flow ID": str, "Scenario": str, "Layer 1": str, "Layer 2": str, "Layer 3": str, "Layer 4": str, "Value": "float64"},
+            chunksize=MFAReader.chunk_rows,
+        )
+        kept = []
+        for chunk in chunks:
+            chunk = chunk.fillna({column: "" for column in TEXT_COLUMNS})
+            mask = pd.Series(True, index=chunk.index)
+            if flow_ids is not None:
+                mask &= chunk["Stock/Flow ID"].isin(flow_ids)
+            if products is not None:
+                mask &= chunk["Layer 1"].isin(products)
+            if years is not None:
+                mask &= chunk["Year"].isin(years)
+            if scenarios is not None:
+                mask &= chunk["Scenario"].isin(scenarios)
+            kept.append(chunk[mask])
+
+        mfa_df = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=MFA_COLUMNS)
+        for column in CATEGORICAL_COLUMNS:
+            mfa_df[column] = mfa_df[column].astype("category")
+        return mfa_df
@@ -0,0 +1,75 @@
+from typing import Dict, List
+
+import numpy as np
+
+from code_folder.helpers.background_solver import BackgroundSolver
+from code_folder.helpers.constants import MonteCarloConfig, MonteCarloResult, SingleLCI, UncertaintySpec
+from code_folder.helpers.exchange_terms import ExchangeTerms
+
+
+class MonteCarloHelper:
+    """Sample MFA values and builder amounts and score all samples of an LCI in one matrix product."""
+
+    @staticmethod
+    def sample_factors(spec: UncertaintySpec, size, rng: np.random.Generator) -> np.ndarray:
+        """Draw multiplicative factors with expected value 1 for the given distribution."""
+        if spec.scale == 0:
+            return np.ones(size)
+        if spec.distribution == "normal":
+            return np.clip(rng.normal(1.0, spec.scale, size), 0.0, None)
+        if spec.distribution == "lognormal":
+            # sigma chosen so that the relative standard deviation of the factor equals spec.scale
+            sigma = np.sqrt(np.log1p(spec.scale ** 2))
+            return rng.lognormal(-sigma ** 2 / 2, sigma, size)
+        if spec.distribution == "uniform":
+            return rng.uniform(1.0 - spec.scale, 1.0 + spec.scale, size)
+        if spec.distribution == "triangular":
+            return rng.triangular(1.0 - spec.scale, 1.0, 1.0 + spec.scale, size)
+        raise ValueError(f"Unknown distribution '{spec.distribution}' for Monte Carlo sampling")
+
+    @staticmethod
+    def sample_mfa_values(lci: SingleLCI, config: MonteCarloConfig, rng: np.random.Generator) -> np.ndarray:
+        """Perturbed MFA values of the rows used by the LCI (n_samples x n_rows)."""
+        values = np.asarray(lci.mfa_values, dtype=float)
+        samples = np.empty((config.iterations, len(values)))
+        flow_ids = np.asarray(lci.mfa_flow_ids, dtype=object)
+        default_columns = np.ones(len(values), dtype=bool)
+        for flow_id, spec in config.flow_uncertainty.items():
+            columns = flow_ids == flow_id
+            samples[:, columns] = MonteCarloHelper.sample_factors(spec, (config.iterations, int(columns.sum())), rng)
+            default_columns &= ~columns
+        samples[:, default_columns] = MonteCarloHelper.sample_factors(config.mfa_uncertainty, (config.iterations, int(default_columns.sum())), rng)
+        return samples * values
+
+    @staticmethod
+    def sample_scores(lci: SingleLCI, solver: BackgroundSolver, config: MonteCarloConfig, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Return sampled scores (n_samples x n_methods) for the normal, avoided and net impacts."""
+        mfa_samples = MonteCarloHelper.sample_mfa_values(lci, config, rng)
+        amount_factors = None
+        if config.amount_uncertainty is not None:
+            amount_factors = MonteCarloHelper.sample_factors(config.amount_uncertainty, (config.iterations, len(lci.exchange_terms)), rng)
+
+        amounts = ExchangeTerms.evaluate(lci, mfa_values=mfa_samples, amount_factors=amount_factors)
+        contributions = amounts * ExchangeTerms.role_signs(lci)
+        unit_scores = solver.term_unit_scores(lci.exchange_terms)
+
+        normal = contributions[:, ExchangeTerms.role_mask(lci, "main")] @ unit_scores[ExchangeTerms.role_mask(lci, "main")]
+        avoided = contributions[:, ExchangeTerms.role_mask(lci, "avoided")] @ unit_scores[ExchangeTerms.role_mask(lci, "avoided")]
+        return {"normal": normal, "avoided": avoided, "net": normal - avoided}
+
+    @staticmethod
+    def summarize(lci: SingleLCI, samples: Dict[str, np.ndarray], method_labels: List[str], config: MonteCarloConfig) -> MonteCarloResult:
+        """Reduce sampled scores to mean, standard deviation and percentiles per impact type and method."""
+        statistics = {}
+        for impact_type, scores in samples.items():
+            percentiles = np.percentile(scores, config.percentiles, axis=0)
+            statistics[impact_type] = {}
+            for column, label in enumerate(method_labels):
+                method_statistics = {
+                    "mean": float(scores[:, column].mean()),
+                    "std": float(scores[:, column].std(ddof=1)) if len(scores) > 1 else 0.0,
+                }
+                for percentile, value in zip(config.percentiles, percentiles[:, column]):
+                    method_statistics[f"p{percentile:g}"] = float(value)
+                statistics[impact_type][label] = method_statistics
+        return MonteCarloResult(lci=lci, iterations=config.iterations, statistics=statistics)
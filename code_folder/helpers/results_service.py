@@ -0,0 +1,245 @@
+import json
+import os
+import pickle
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from code_folder.helpers.constants import (
+    LOADABLE_LCIA_RESULTS_DATA_FOLDER,
+    PIPELINE_RUNS_FOLDER,
+    RESULTS_SERVICE_CACHE_SIZE,
+    SingleLCIAResult,
+)
+from code_folder.helpers.lookup_cache import LookupCache
+
+METADATA_COLUMNS = ["Scenario", "Year", "Location", "Product", "RecyclingRoute"]
+RESULT_TABLES = {
+    "scores": METADATA_COLUMNS + ["Impact_type", "Method", "Score", "Absolute"],
+    "contributions": METADATA_COLUMNS + ["Impact_type", "Breakdown", "Flow", "Method", "Value"],
+}
+# Query parameter -> column it filters
+RESULT_FILTERS = {"scenario": "Scenario", "year": "Year", "location": "Location", "product": "Product", "route": "RecyclingRoute", "impact_type": "Impact_type", "method": "Method", "breakdown": "Breakdown"}
+RESPONSE_FORMATS = {"json": "application/json", "arrow": "application/vnd.apache.arrow.stream"}
+
+
+class ResultsIndex:
+    """
+    Scores and contributions of one run as in-memory long tables, filtered per query with an LRU response cache.
+
+    The run is a saved ``lcia_run_*.pkl`` or a pipelined run folder, pinned or (by default) the latest
+    one. Every partition file is loaded once and kept by modification time, so ``refresh`` only reads
+    partitions that were added or rewritten and switches to a newer run when one lands.
+    """
+    def __init__(self, run_path=None, cache_size: Optional[int] = RESULTS_SERVICE_CACHE_SIZE):
+        self.pinned = Path(run_path) if run_path else None
+        self.run_path: Optional[Path] = None
+        self.partitions: Dict[Path, Tuple[int, Dict[str, pd.DataFrame]]] = {}
+        self.tables = {name: pd.DataFrame(columns=columns) for name, columns in RESULT_TABLES.items()}
+        self.version = 0
+        self.cache = LookupCache(max_size=cache_size, policy="lru")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def latest_run() -> Optional[Path]:
+        """Newest saved LCIA run: an lcia_run_*.pkl file or a pipeline_run_* folder, by their timestamp."""
+        runs = []
+        if os.path.isdir(LOADABLE_LCIA_RESULTS_DATA_FOLDER):
+            runs += [(f[len("lcia_run_"):-len(".pkl")], Path(LOADABLE_LCIA_RESULTS_DATA_FOLDER) / f) for f in os.listdir(LOADABLE_LCIA_RESULTS_DATA_FOLDER) if f.startswith("lcia_run_") and f.endswith(".pkl")]
+        if os.path.isdir(PIPELINE_RUNS_FOLDER):
+            runs += [(f[len("pipeline_run_"):], Path(PIPELINE_RUNS_FOLDER) / f) for f in os.listdir(PIPELINE_RUNS_FOLDER) if f.startswith("pipeline_run_")]
+        return max(runs)[1] if runs else None
+
+    @staticmethod
+    def partition_files(run_path: Path) -> List[Path]:
+        if run_path.is_dir():
+            return sorted(run_path / f for f in os.listdir(run_path) if f.startswith("lcia_") and f.endswith(".pkl"))
+        return [run_path]
+
+    def refresh(self) -> bool:
+        """Load new or rewritten partitions of the run (switching to a newer run unless pinned). Returns True if the tables changed."""
+        with self._lock:
+            run_path = self.pinned or self.latest_run()
+            if run_path != self.run_path:
+                self.run_path, self.partitions = run_path, {}
+            files = {path: path.stat().st_mtime_ns for path in self.partition_files(run_path)} if run_path and run_path.exists() else {}
+            stale = [path for path, mtime in files.items() if self.partitions.get(path, (None,))[0] != mtime]
+            removed = set(self.partitions) - set(files)
+            if not stale and not removed and self.version:
+                return False
+
+            for path in removed:
+                del self.partitions[path]
+            for path in stale:
+                try:
+                    with open(path, "rb") as f:
+                        lcia_results = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError):
+                    # Still being written; picked up by the next refresh
+                    continue
+                self.partitions[path] = (files[path], self.result_tables(lcia_results))
+            self.tables = {
+                name: pd.concat([tables[name] for _, tables in self.partitions.values()], ignore_index=True) if self.partitions else pd.DataFrame(columns=columns)
+                for name, columns in RESULT_TABLES.items()
+            }
+            self.version += 1
+            self.cache.clear()
+        print(f"✅ Serving {len(self.tables['scores'])} scores and {len(self.tables['contributions'])} contributions of {run_path} ({len(self.partitions)} partitions, {len(stale)} loaded)", flush=True)
+        return True
+
+    @staticmethod
+    def result_tables(lcia_results: List[SingleLCIAResult]) -> Dict[str, pd.DataFrame]:
+        """Long score table (per-kg and absolute, with net = normal - avoided) and contribution table of LCIA results."""
+        score_rows, contribution_rows = [], []
+        for result in lcia_results:
+            lci = result.lci
+            metadata = (lci.scenario.value, lci.year, lci.location.value, lci.product.value, lci.route.value)
+            for method_label, score in result.total_impacts.items():
+                avoided = result.avoided_impacts.get(method_label, float("nan"))
+                for impact_type, value in (("normal", score), ("avoided", avoided), ("net", score - avoided)):
+                    score_rows.append((*metadata, impact_type, method_label, value, value * lci.total_inflow_amount))
+            for impact_type, methods in result.exchange_contributions.items():
+                for method_label, exchanges in methods.items():
+                    contribution_rows += [(*metadata, impact_type, "exchange", exchange_name, method_label, value) for exchange_name, value in exchanges.items()]
+            for method_label, materials in result.impact_per_element.items():
+                contribution_rows += [(*metadata, "avoided", "recovered material", material, method_label, value) for material, value in materials.items()]
+        return {
+            "scores": pd.DataFrame(score_rows, columns=RESULT_TABLES["scores"]),
+            "contributions": pd.DataFrame(contribution_rows, columns=RESULT_TABLES["contributions"]),
+        }
+
+    def query(self, table: str, filters: Dict[str, List[str]]) -> pd.DataFrame:
+        """Rows of a table matching every filter (a list of accepted values per RESULT_FILTERS key)."""
+        with self._lock:
+            frame = self.tables.get(table)
+        return self.filtered(table, frame, filters)
+
+    @staticmethod
+    def filtered(table: str, frame: Optional[pd.DataFrame], filters: Dict[str, List[str]]) -> pd.DataFrame:
+        """Rows of a snapshot of a table matching every filter."""
+        if table not in RESULT_TABLES:
+            raise ValueError(f"Unknown table '{table}'. Use one of: {', '.join(RESULT_TABLES)}")
+        unknown = set(filters) - set(RESULT_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}. Use any of: {', '.join(RESULT_FILTERS)}")
+        mask = pd.Series(True, index=frame.index)
+        for name, values in filters.items():
+            column = RESULT_FILTERS[name]
+            if column not in frame.columns:
+                raise ValueError(f"Table '{table}' has no {name} filter")
+            mask &= frame[column].isin([int(value) for value in values] if column == "Year" else values)
+        return frame[mask].reset_index(drop=True)
+
+    def response(self, table: str, filters: Dict[str, List[str]], response_format: str = "json") -> bytes:
+        """Encoded query result, from the response cache when the same query was answered since the last refresh.
+
+        Server threads share the cache and tables with ``refresh``, so both are only read or changed
+        under the lock; the query itself runs on a snapshot of the table.
+        """
+        if response_format not in RESPONSE_FORMATS:
+            raise ValueError(f"Unknown format '{response_format}'. Use one of: {', '.join(RESPONSE_FORMATS)}")
+        with self._lock:
+            version, run_path, frame = self.version, self.run_path, self.tables.get(table)
+            cache_key = (version, table, tuple(sorted((name, tuple(sorted(values))) for name, values in filters.items())), response_format)
+            body = self.cache.get(cache_key)
+        if body is None:
+            frame = self.filtered(table, frame, filters)
+            body = self.to_arrow(frame) if response_format == "arrow" else json.dumps({
+                "run": run_path.name if run_path else None,
+                "version": version,
+                "rows": len(frame),
+                "data": json.loads(frame.to_json(orient="records")),
+            }).encode("utf-8")
+            with self._lock:
+                self.cache.put(cache_key, body)
+        return body
+
+    @staticmethod
+    def to_arrow(frame: pd.DataFrame) -> bytes:
+        """Arrow IPC stream of a table (requires pyarrow)."""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ValueError("Arrow responses need pyarrow; install it or use format=json") from None
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "run": str(self.run_path) if self.run_path else None,
+                "version": self.version,
+                "partitions": len(self.partitions),
+                "rows": {name: len(frame) for name, frame in self.tables.items()},
+                "cache": self.cache.stats(),
+            }
+
+
+class ResultsService:
+    """Read-only local HTTP service over a ResultsIndex.
+
+    ``GET /scores`` and ``GET /contributions`` take the RESULT_FILTERS as query parameters (repeat one
+    to accept several values) and ``format=json|arrow``; ``GET /`` returns the run and cache status.
+    """
+
+    @staticmethod
+    def handler(index: ResultsIndex):
+        class ResultsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path in ("/", "/status"):
+                    return self._send(200, json.dumps(index.status()).encode("utf-8"), RESPONSE_FORMATS["json"])
+                params = parse_qs(url.query)
+                response_format = params.pop("format", ["json"])[-1]
+                try:
+                    body = index.response(url.path.strip("/"), params, response_format)
+                except ValueError as e:
+                    status = 404 if url.path.strip("/") not in RESULT_TABLES else 400
+                    return self._send(status, json.dumps({"error": str(e)}).encode("utf-8"), RESPONSE_FORMATS["json"])
+                self._send(200, body, RESPONSE_FORMATS[response_format])
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ResultsHandler
+
+    @staticmethod
+    def create(index: ResultsIndex, host: str, port: int) -> ThreadingHTTPServer:
+        """Server bound to host and port (0 picks a free port); loads the run if it was not loaded yet."""
+        if not index.version:
+            index.refresh()
+        return ThreadingHTTPServer((host, port), ResultsService.handler(index))
+
+    @staticmethod
+    def serve(index: ResultsIndex, host: str, port: int, reload_interval: float = 10.0) -> None:
+        """Serve until interrupted, refreshing the index every ``reload_interval`` seconds in the background."""
+        server = ResultsService.create(index, host, port)
+        stop = threading.Event()
+
+        def reload():
+            while not stop.wait(reload_interval):
+                index.refresh()
+
+        threading.Thread(target=reload, daemon=True).start()
+        print(f"📋 Serving LCIA results on http://{server.server_address[0]}:{server.server_address[1]} (Ctrl+C to stop)", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            server.server_close()
@@ -0,0 +1,114 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from code_folder.helpers.constants import SingleLCI, SingleLCIAResult
+
+LCI_KEY_COLUMNS = ["RecyclingRoute", "Product", "Year", "Scenario", "Location"]
+EXCHANGE_KEY_COLUMNS = LCI_KEY_COLUMNS + ["Activity", "Input", "Type"]
+SCORE_KEY_COLUMNS = LCI_KEY_COLUMNS + ["Impact_type", "Method"]
+
+
+class RunDiff:
+    """
+    Compare two runs (LCIs or LCIA results) aligned on route, product, year, scenario and location.
+
+    Both runs are flattened into long tables once; matching, deltas and tolerances are then column
+    operations on the merged table. Foreground activities get new codes in every run, so they are
+    matched by name (``Input`` is ``foreground:<name>``) and background inputs by their key.
+    """
+
+    @staticmethod
+    def lci_metadata(lci: SingleLCI) -> tuple:
+        return (lci.route.value, lci.product.value, lci.year, lci.scenario.value, lci.location.value)
+
+    @staticmethod
+    def exchange_table(lcis: List[SingleLCI]) -> pd.DataFrame:
+        """One row per exchange of every LCI (production exchanges left out), amounts summed per input."""
+        rows = []
+        for lci in lcis:
+            metadata = RunDiff.lci_metadata(lci)
+            foreground_names = {key: f"foreground:{activity['name']}" for key, activity in lci.lci_dict.items()}
+            for activity in lci.lci_dict.values():
+                for exchange in activity["exchanges"]:
+                    if exchange["type"] == "production":
+                        continue
+                    input_label = foreground_names.get(exchange["input"]) or ":".join(map(str, exchange["input"]))
+                    rows.append((*metadata, activity["name"], input_label, exchange["type"], exchange["amount"]))
+        table = pd.DataFrame(rows, columns=EXCHANGE_KEY_COLUMNS + ["Amount"])
+        table["Amount"] = table["Amount"].astype(float)
+        return table.groupby(EXCHANGE_KEY_COLUMNS, sort=False, as_index=False)["Amount"].sum()
+
+    @staticmethod
+    def score_table(lcia_results: List[SingleLCIAResult]) -> pd.DataFrame:
+        """One row per LCI, impact type (normal/avoided) and method."""
+        rows = [
+            (*RunDiff.lci_metadata(result.lci), impact_type, method_label, score)
+            for result in lcia_results
+            for impact_type, impacts in (("normal", result.total_impacts), ("avoided", result.avoided_impacts))
+            for method_label, score in impacts.items()
+        ]
+        table = pd.DataFrame(rows, columns=SCORE_KEY_COLUMNS + ["Score"])
+        table["Score"] = table["Score"].astype(float)
+        return table
+
+    @staticmethod
+    def compare(old: pd.DataFrame, new: pd.DataFrame, key_columns: List[str], value_column: str, rel_tol: float = 1e-6, abs_tol: float = 0.0) -> pd.DataFrame:
+        """Rows of two tables that were added, removed or changed by more than ``abs_tol + rel_tol * max(|old|, |new|)``."""
+        merged = old.merge(new, on=key_columns, how="outer", suffixes=(" old", " new"), indicator=True)
+        old_values, new_values = merged[f"{value_column} old"].to_numpy(), merged[f"{value_column} new"].to_numpy()
+        delta = new_values - old_values
+        tolerance = abs_tol + rel_tol * np.fmax(np.abs(old_values), np.abs(new_values))
+        status = np.select(
+            [merged["_merge"].to_numpy() == "left_only", merged["_merge"].to_numpy() == "right_only", np.abs(delta) > tolerance],
+            ["removed", "added", "changed"],
+            default="",
+        )
+        merged = merged.drop(columns="_merge").assign(Delta=delta, Status=status)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            merged["Relative delta"] = np.where(old_values != 0, delta / np.abs(old_values), np.nan)
+        return merged[merged["Status"] != ""].reset_index(drop=True)
+
+    @staticmethod
+    def diff_exchanges(old_lcis: List[SingleLCI], new_lcis: List[SingleLCI], rel_tol: float = 1e-6, abs_tol: float = 0.0) -> pd.DataFrame:
+        return RunDiff.compare(RunDiff.exchange_table(old_lcis), RunDiff.exchange_table(new_lcis), EXCHANGE_KEY_COLUMNS, "Amount", rel_tol, abs_tol)
+
+    @staticmethod
+    def diff_scores(old_results: List[SingleLCIAResult], new_results: List[SingleLCIAResult], rel_tol: float = 1e-6, abs_tol: float = 0.0) -> pd.DataFrame:
+        return RunDiff.compare(RunDiff.score_table(old_results), RunDiff.score_table(new_results), SCORE_KEY_COLUMNS, "Score", rel_tol, abs_tol)
+
+    @staticmethod
+    def diff(old_run: list, new_run: list, rel_tol: float = 1e-6, abs_tol: float = 0.0) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Diff two runs of LCIs or of LCIA results (whose LCIs are compared too).
+
+        Returns (summary per LCI, exchange changes, score changes); score changes are empty for LCI runs.
+        """
+        old_lcis, new_lcis = RunDiff._lcis(old_run), RunDiff._lcis(new_run)
+        exchanges = RunDiff.diff_exchanges(old_lcis, new_lcis, rel_tol, abs_tol)
+        has_scores = RunDiff._has_scores(old_run) and RunDiff._has_scores(new_run)
+        scores = RunDiff.diff_scores(old_run, new_run, rel_tol, abs_tol) if has_scores else pd.DataFrame(columns=SCORE_KEY_COLUMNS)
+
+        old_keys = pd.DataFrame([RunDiff.lci_metadata(lci) for lci in old_lcis], columns=LCI_KEY_COLUMNS).drop_duplicates()
+        new_keys = pd.DataFrame([RunDiff.lci_metadata(lci) for lci in new_lcis], columns=LCI_KEY_COLUMNS).drop_duplicates()
+        summary = old_keys.merge(new_keys, on=LCI_KEY_COLUMNS, how="outer", indicator=True)
+        summary["Status"] = summary.pop("_merge").map({"left_only": "removed", "right_only": "added", "both": "kept"}).astype(str)
+        summary = summary.merge(exchanges.groupby(LCI_KEY_COLUMNS).size().rename("Changed exchanges").reset_index(), on=LCI_KEY_COLUMNS, how="left")
+        if has_scores and len(scores):
+            score_changes = scores.groupby(LCI_KEY_COLUMNS).agg(**{"Changed scores": ("Status", "size"), "Largest relative score delta": ("Relative delta", lambda values: values.abs().max())})
+            summary = summary.merge(score_changes.reset_index(), on=LCI_KEY_COLUMNS, how="left")
+        else:
+            summary["Changed scores"] = 0
+            summary["Largest relative score delta"] = np.nan
+        summary[["Changed exchanges", "Changed scores"]] = summary[["Changed exchanges", "Changed scores"]].fillna(0).astype(int)
+        summary.loc[(summary["Status"] == "kept") & (summary["Changed exchanges"] + summary["Changed scores"] > 0), "Status"] = "changed"
+        return summary, exchanges, scores
+
+    @staticmethod
+    def _lcis(run: list) -> List[SingleLCI]:
+        return [item.lci if isinstance(item, SingleLCIAResult) else item for item in run]
+
+    @staticmethod
+    def _has_scores(run: list) -> bool:
+        # An empty run could be either kind, so only a non-empty run of LCIA results has scores
+        return bool(run) and all(isinstance(item, SingleLCIAResult) for item in run)
@@ -0,0 +1,125 @@
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from code_folder.helpers.brightway_helpers import BrightwayHelpers
+from code_folder.helpers.constants import (
+    INPUT_DATA_FOLDER,
+    LCI_BUILDER_DTYPES,
+    SUPERSTRUCTURE_NAME,
+    SUPPORTED_YEARS_OBS,
+    SUPPORTED_YEARS_SCENARIO,
+    LCIJob,
+    Location,
+    Product,
+    Route,
+    RunPlan,
+    Scenario,
+)
+from code_folder.helpers.workbook_cache import WorkbookCache
+
+
+class RunPlanner:
+    """Turn run selections into an explicit list of LCI jobs, skipping impossible combinations before any heavy I/O."""
+
+    @staticmethod
+    def plan(
+        route_selection: List[Route],
+        product_selection: List[Product],
+        year_selection: List[int],
+        scenario_selection: List[Scenario],
+        location_selection: List[Location],
+        use_superstructure: bool = False,
+    ) -> RunPlan:
+        """Inspect sheet names, available Year/Scenario values and supported years once per route and return the work list.
+
+        Repeated selections are planned once, in their first position.
+        """
+        route_selection, product_selection, year_selection, scenario_selection, location_selection = (
+            list(dict.fromkeys(selection)) for selection in (route_selection, product_selection, year_selection, scenario_selection, location_selection)
+        )
+        route_inputs = {route: RunPlanner._inspect_route(route) for route in route_selection}
+
+        jobs, skipped = [], Counter()
+        for year in year_selection:
+            for scenario in scenario_selection:
+                if not RunPlanner.is_supported_year(scenario=scenario, year=year):
+                    skipped["year not supported for scenario"] += len(route_selection) * len(product_selection) * len(location_selection)
+                    continue
+                background_db = SUPERSTRUCTURE_NAME if use_superstructure else BrightwayHelpers.resolve_scenario_db_name(scenario=scenario, year=year)
+                scrap_db = BrightwayHelpers.resolve_scrap_db_name(scenario=scenario, year=year)
+                for route in route_selection:
+                    sheet_names, year_scenarios = route_inputs[route]
+                    for product in product_selection:
+                        for location in location_selection:
+                            if sheet_names is None:
+                                skipped["route input files missing"] += 1
+                            elif product.value not in sheet_names:
+                                skipped["no lci_builder sheet for product"] += 1
+                            elif (year, scenario.value) not in year_scenarios:
+                                skipped["no MFA data for year and scenario"] += 1
+                            else:
+                                jobs.append(LCIJob(
+                                    route=route,
+                                    product=product,
+                                    year=year,
+                                    scenario=scenario,
+                                    location=location,
+                                    background_db=background_db,
+                                    scrap_db=scrap_db,
+                                ))
+        return RunPlan(jobs=jobs, skipped=dict(skipped), cost=RunPlanner._estimate_cost(jobs))
+
+    @staticmethod
+    def is_supported_year(scenario: Scenario, year: int) -> bool:
+        """OBS covers historic years, the other scenarios the projection years."""
+        if scenario == Scenario.OBS:
+            return year in SUPPORTED_YEARS_OBS
+        return year in SUPPORTED_YEARS_SCENARIO
+
+    @staticmethod
+    def _inspect_route(route: Route) -> Tuple:
+        """Return (sheet names, {(year, scenario)}) of a route, or (None, set()) if its inputs are missing."""
+        input_folder = INPUT_DATA_FOLDER / route.value
+        if not (input_folder / "rm_output.csv").exists() or not (input_folder / "lci_builder.xlsx").exists():
+            return None, set()
+        sheet_names = set(WorkbookCache.sheet_names(input_folder / "lci_builder.xlsx", dtype=LCI_BUILDER_DTYPES))
+        year_scenario_df = pd.read_csv(input_folder / "rm_output.csv", usecols=["Year", "Scenario"]).drop_duplicates()
+        year_scenarios = {(int(year), str(scenario)) for year, scenario in zip(year_scenario_df["Year"], year_scenario_df["Scenario"])}
+        return sheet_names, year_scenarios
+
+    @staticmethod
+    def _estimate_cost(jobs: List[LCIJob]) -> Dict[str, float]:
+        """Rough cost of a plan: LCIs, input files and bytes to parse, and background databases involved."""
+        routes = {job.route for job in jobs}
+        # Each route's rm_output.csv is streamed once per run
+        csv_bytes = sum((INPUT_DATA_FOLDER / route.value / "rm_output.csv").stat().st_size for route in routes)
+        return {
+            "lcis": len(jobs),
+            "routes": len(routes),
+            "builder sheets": len({(job.route, job.product) for job in jobs}),
+            "partitions (scenario, year)": len({(job.scenario, job.year) for job in jobs}),
+            "background databases": len({job.background_db for job in jobs}),
+            "rm_output.csv MB streamed": round(csv_bytes / 1e6, 1),
+        }
+
+    @staticmethod
+    def partitions(plan: RunPlan) -> Dict[Tuple[int, Scenario], List[LCIJob]]:
+        """Group jobs by (year, scenario), in plan order, as they share a background and scrap database."""
+        partitions: Dict[Tuple[int, Scenario], List[LCIJob]] = {}
+        for job in plan.jobs:
+            partitions.setdefault((job.year, job.scenario), []).append(job)
+        return partitions
+
+    @staticmethod
+    def print_plan(plan: RunPlan, show_jobs: bool = False) -> None:
+        """Dry-run printout of a plan."""
+        print(f"📋 Run plan: {len(plan.jobs)} LCIs to build")
+        for label, value in plan.cost.items():
+            print(f"   {label}: {value}")
+        for reason, count in plan.skipped.items():
+            print(f"   skipped ({reason}): {count}")
+        if show_jobs:
+            for job in plan.jobs:
+                print(f"   - {job.route.value} | {job.product.value} | {job.year} | {job.scenario.value} | {job.location.value} -> {job.background_db}")
@@ -0,0 +1,79 @@
+from typing import List
+
+import numpy as np
+
+from code_folder.helpers.background_solver import BackgroundSolver
+from code_folder.helpers.constants import SensitivityResult, SingleLCI
+from code_folder.helpers.exchange_terms import ExchangeTerms
+
+IMPACT_ROLES = {"normal": "main", "avoided": "avoided"}
+
+
+class SensitivityHelper:
+    """
+    Local (adjoint) sensitivities of an LCI's scores to its lci_builder amounts and Stock/Flow IDs.
+
+    The per-unit scores of all inputs come from the solver's single transposed solve, so each
+    derivative is a product of those scores with the derivatives of the exchange amounts.
+    """
+
+    @staticmethod
+    def analyze(lci: SingleLCI, solver: BackgroundSolver) -> SensitivityResult:
+        """Derivative and elasticity of the normal and avoided scores for every parameter of an LCI, ranked per score."""
+        method_labels = solver.method_labels()
+        # Score weight of one unit of each term's amount (n_terms x n_methods)
+        weights = ExchangeTerms.role_signs(lci)[:, np.newaxis] * solver.term_unit_scores(lci.exchange_terms)
+        amounts = ExchangeTerms.evaluate(lci)[0]
+        amount_derivatives = ExchangeTerms.amount_derivatives(lci)
+        mfa_derivatives = ExchangeTerms.jacobian(lci)
+        mfa_values = np.asarray(lci.mfa_values, dtype=float)
+        flow_ids = np.asarray(lci.mfa_flow_ids, dtype=object)
+
+        builder_rows = {}
+        for index, term in enumerate(lci.exchange_terms):
+            if term.uses_amount:
+                builder_rows.setdefault((term.builder_row, term.label, term.builder_amount), []).append(index)
+
+        scores, parameters = {}, []
+        for impact_type, role in IMPACT_ROLES.items():
+            role_weights = np.where(ExchangeTerms.role_mask(lci, role)[:, np.newaxis], weights, 0.0)
+            role_scores = amounts @ role_weights
+            scores[impact_type] = dict(zip(method_labels, role_scores.tolist()))
+
+            candidates = []
+            for (builder_row, label, builder_amount), indices in builder_rows.items():
+                derivative = amount_derivatives[indices] @ role_weights[indices]
+                candidates.append(("lci_builder Amount", f"{label} (row {builder_row})", builder_amount, derivative, derivative * builder_amount))
+            # d score / d MFA value per row; a Stock/Flow ID scales all of its rows together
+            row_derivatives = mfa_derivatives @ role_weights
+            for flow_id in dict.fromkeys(lci.mfa_flow_ids):
+                rows = flow_ids == flow_id
+                flow_total = mfa_values[rows].sum()
+                relative_derivative = mfa_values[rows] @ row_derivatives[rows]
+                derivative = relative_derivative / flow_total if flow_total else row_derivatives[rows].sum(axis=0)
+                candidates.append(("Stock/Flow ID", flow_id, flow_total, derivative, relative_derivative))
+
+            for column, method_label in enumerate(method_labels):
+                score = role_scores[column]
+                method_rows = [
+                    {
+                        "Impact_type": impact_type,
+                        "Method": method_label,
+                        "Parameter type": parameter_type,
+                        "Parameter": parameter,
+                        "Value": value,
+                        "Derivative": derivative[column],
+                        "Elasticity": relative[column] / score if score else np.nan,
+                    }
+                    for parameter_type, parameter, value, derivative, relative in candidates
+                ]
+                method_rows.sort(key=lambda row: -abs(np.nan_to_num(row["Elasticity"])))
+                for rank, row in enumerate(method_rows, start=1):
+                    row["Rank"] = rank
+                parameters += method_rows
+        return SensitivityResult(lci=lci, scores=scores, parameters=parameters)
+
+    @staticmethod
+    def ranked(result: SensitivityResult, impact_type: str, method_label: str, top: int = 10) -> List[dict]:
+        """The ``top`` most influential parameters of one score."""
+        return [row for row in result.parameters if row["Impact_type"] == impact_type and row["Method"] == method_label][:top]
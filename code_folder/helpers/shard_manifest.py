@@ -0,0 +1,232 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from code_folder.helpers.constants import (
+    INVENTORY_VECTORS_FOLDER,
+    LOADABLE_LCI_DATA_FOLDER,
+    LOADABLE_LCIA_RESULTS_DATA_FOLDER,
+    OUTPUT_DATA_FOLDER,
+    PROJECT_NAME,
+    SHARD_RUNS_FOLDER,
+    RunConfig,
+    SingleLCI,
+)
+from code_folder.helpers.run_planner import RunPlanner
+from code_folder.helpers.storage_helper import StorageHelper
+
+SHARD_KEYS = ("route", "scenario_year")
+# Command a shard is run with; its build writes LCIs and LCIA results but skips the database export
+SHARD_COMMAND = [sys.executable, "-m", "code_folder.cli"]
+SHARD_BUILD_ARGS = ["build", "--lcia", "--no-excel"]
+
+
+class ShardManifest:
+    """
+    Split a run into independent shards, run them as separate processes and merge their results.
+
+    A manifest (JSON) lists one run config per shard. Every shard builds into its own Brightway
+    database (``{database_name}_{shard_id}``) and its own output folder next to the manifest, so
+    shards can run on different machines; ``load_shard_results`` re-keys their LCIs to the merged
+    database name.
+    """
+
+    @staticmethod
+    def create(config: RunConfig, shard_by: str = "route") -> Path:
+        """Plan a run, group its LCIs into shards by route or by (scenario, year) and write the manifest."""
+        if shard_by not in SHARD_KEYS:
+            raise ValueError(f"Unknown shard key '{shard_by}'. Use one of: {', '.join(SHARD_KEYS)}")
+        if shard_by == "route" and config.add_scrap:
+            # Scrap databases are rebuilt per (scenario, year), so route shards would overwrite each other's
+            raise ValueError("Runs with add_scrap must be sharded by scenario_year")
+
+        plan = RunPlanner.plan(
+            route_selection=config.routes,
+            product_selection=config.products,
+            year_selection=config.years,
+            scenario_selection=config.scenarios,
+            location_selection=config.locations,
+            use_superstructure=config.use_superstructure,
+        )
+        groups: Dict[tuple, int] = {}
+        for job in plan.jobs:
+            group = (job.route,) if shard_by == "route" else (job.scenario, job.year)
+            groups[group] = groups.get(group, 0) + 1
+
+        base_config = ShardManifest.config_to_dict(config)
+        shards = []
+        for group, job_count in groups.items():
+            shard_id = f"shard_{len(shards):03d}"
+            if shard_by == "route":
+                label, selection = group[0].value, {"routes": [group[0].value]}
+            else:
+                label, selection = f"{group[0].value}_{group[1]}", {"scenarios": [group[0].value], "years": [group[1]]}
+            shards.append({
+                "id": shard_id,
+                "label": label,
+                "jobs": job_count,
+                "config": {**base_config, **selection, "database_name": f"{config.database_name}_{shard_id}"},
+            })
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        manifest_path = SHARD_RUNS_FOLDER / f"shards_{timestamp}" / "manifest.json"
+        os.makedirs(manifest_path.parent, exist_ok=True)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump({"database_name": config.database_name, "shard_by": shard_by, "config": base_config, "shards": shards}, f, indent=2)
+
+        print(f"✅ Wrote manifest with {len(shards)} shards ({len(plan.jobs)} LCIs, by {shard_by}) to {manifest_path}")
+        for shard in shards:
+            print(f"   {shard['id']}: {shard['label']} ({shard['jobs']} LCIs)")
+        return manifest_path
+
+    @staticmethod
+    def config_to_dict(config: RunConfig) -> dict:
+        """JSON run config (as read by the CLI) of a RunConfig."""
+        raw = asdict(config)
+        for key in ("routes", "products", "scenarios", "locations"):
+            raw[key] = [member.value for member in getattr(config, key)]
+        raw["lcia_methods"] = [list(method) for method in config.lcia_methods]
+        return raw
+
+    @staticmethod
+    def load(manifest_path) -> dict:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def shard(manifest: dict, shard_id: str) -> dict:
+        for shard in manifest["shards"]:
+            if shard["id"] == shard_id:
+                return shard
+        raise ValueError(f"Unknown shard '{shard_id}'. Use one of: {', '.join(shard['id'] for shard in manifest['shards'])}")
+
+    @staticmethod
+    def shard_folder(manifest_path, shard_id: str) -> Path:
+        """Output folder of a shard; it has the same layout as output_data."""
+        return Path(manifest_path).parent / shard_id
+
+    @staticmethod
+    def run_shard(manifest_path, shard_id: str, project_name: Optional[str] = None) -> int:
+        """Run one shard in a child process, logging to ``shard.log`` in its folder. Returns the exit code."""
+        shard = ShardManifest.shard(ShardManifest.load(manifest_path), shard_id)
+        folder = ShardManifest.shard_folder(manifest_path, shard_id)
+        os.makedirs(folder, exist_ok=True)
+        config_path = folder / "run_config.json"
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(shard["config"], f, indent=2)
+
+        env = {**os.environ, "LCA_FUTURAM_OUTPUT_FOLDER": str(folder), "LCA_FUTURAM_PROJECT": project_name or PROJECT_NAME}
+        print(f"Running {shard_id} ({shard['label']}, {shard['jobs']} LCIs) in project {env['LCA_FUTURAM_PROJECT']}", flush=True)
+        start = time.perf_counter()
+        with open(folder / "shard.log", "w", encoding="utf-8") as log:
+            returncode = subprocess.run([*SHARD_COMMAND, "--config", str(config_path), *SHARD_BUILD_ARGS], env=env, stdout=log, stderr=subprocess.STDOUT).returncode
+        seconds = time.perf_counter() - start
+        with open(folder / "status.json", "w", encoding="utf-8") as f:
+            json.dump({"returncode": returncode, "seconds": seconds}, f)
+
+        if returncode == 0:
+            print(f"✅ Finished {shard_id} in {seconds:.0f} s")
+        else:
+            print(f"⚠️ {shard_id} failed with exit code {returncode}; see {folder / 'shard.log'}")
+        return returncode
+
+    @staticmethod
+    def run_local(manifest_path, workers: int = 1, shard_ids: Optional[List[str]] = None) -> Dict[str, int]:
+        """Run shards as local processes, ``workers`` at a time. Returns the exit code per shard.
+
+        Brightway keeps database metadata in one file per project, so with more than one worker every
+        worker runs in its own copy of the project (``{PROJECT_NAME}_worker_{i}``, copied once). Scrap
+        databases get the same codes in every copy, and merging builds the ones missing from the project.
+        """
+        manifest = ShardManifest.load(manifest_path)
+        shard_ids = shard_ids or [shard["id"] for shard in manifest["shards"]]
+        workers = max(1, min(workers, len(shard_ids)))
+        projects = queue.Queue()
+        for project_name in ShardManifest._worker_projects(workers):
+            projects.put(project_name)
+
+        def run(shard_id: str) -> int:
+            project_name = projects.get()
+            try:
+                return ShardManifest.run_shard(manifest_path, shard_id, project_name=project_name)
+            finally:
+                projects.put(project_name)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            returncodes = dict(zip(shard_ids, executor.map(run, shard_ids)))
+        failed = [shard_id for shard_id, returncode in returncodes.items() if returncode != 0]
+        if failed:
+            print(f"⚠️ {len(failed)} of {len(shard_ids)} shards failed: {', '.join(failed)}")
+        else:
+            print(f"✅ All {len(shard_ids)} shards finished")
+        return returncodes
+
+    @staticmethod
+    def _worker_projects(workers: int) -> List[str]:
+        if workers == 1:
+            return [PROJECT_NAME]
+        import bw2data as bd
+
+        project_names = [f"{PROJECT_NAME}_worker_{index}" for index in range(workers)]
+        for project_name in project_names:
+            if project_name not in bd.projects:
+                print(f"Copying project {PROJECT_NAME} to {project_name} for a parallel shard worker", flush=True)
+                bd.projects.set_current(PROJECT_NAME)
+                bd.projects.copy_project(project_name, switch=False)
+        return project_names
+
+    @staticmethod
+    def load_shard_results(manifest_path) -> Tuple[List[SingleLCI], list, object]:
+        """Load the latest LCIs, LCIA results and inventories of every shard, re-keyed to the manifest's database name.
+
+        Raises ValueError if a shard has no saved LCIs or LCIA results.
+        """
+        from code_folder.helpers.inventory_store import InventoryStore
+
+        manifest = ShardManifest.load(manifest_path)
+        lcis, lcia_results, inventory_stores, missing = [], [], [], []
+        for shard in manifest["shards"]:
+            folder = ShardManifest.shard_folder(manifest_path, shard["id"])
+            shard_lcis = StorageHelper.load_latest_lcis(folder / LOADABLE_LCI_DATA_FOLDER.relative_to(OUTPUT_DATA_FOLDER))
+            shard_results = StorageHelper.load_latest_lcia_results(folder / LOADABLE_LCIA_RESULTS_DATA_FOLDER.relative_to(OUTPUT_DATA_FOLDER))
+            if shard_lcis is None or shard_results is None:
+                missing.append(shard["id"])
+                continue
+            # Results were pickled separately from the LCIs, so they are matched back by label
+            rekeyed = {tuple(InventoryStore.entry(lci).values()): ShardManifest._rekey(lci, shard["config"]["database_name"], manifest["database_name"]) for lci in shard_lcis}
+            lcis += rekeyed.values()
+            for result in shard_results:
+                lci = rekeyed.get(tuple(InventoryStore.entry(result.lci).values())) or ShardManifest._rekey(result.lci, shard["config"]["database_name"], manifest["database_name"])
+                lcia_results.append(replace(result, lci=lci))
+            inventory_stores.append(StorageHelper.load_latest_inventories(folder / INVENTORY_VECTORS_FOLDER.relative_to(OUTPUT_DATA_FOLDER)))
+        if missing:
+            raise ValueError(f"Shards without saved LCIs or LCIA results: {', '.join(missing)}")
+
+        inventories = InventoryStore.concatenate(inventory_stores) if all(store is not None for store in inventory_stores) else None
+        print(f"✅ Merged {len(lcis)} LCIs and {len(lcia_results)} LCIA results of {len(manifest['shards'])} shards")
+        return lcis, lcia_results, inventories
+
+    @staticmethod
+    def _rekey(lci: SingleLCI, shard_database: str, database_name: str) -> SingleLCI:
+        """Copy of a shard LCI with its foreground database ``{shard_database}[__background]`` renamed to ``{database_name}[__background]``."""
+        old_name = lci.database_name or shard_database
+        new_name = database_name + old_name[len(shard_database):]
+
+        def key(value):
+            return (new_name, value[1]) if isinstance(value, tuple) and len(value) == 2 and value[0] == old_name else value
+
+        lci_dict = {
+            # Written exchanges also carry their "output" key
+            key(activity_key): {**activity, "exchanges": [{field: key(value) for field, value in exchange.items()} for exchange in activity["exchanges"]]}
+            for activity_key, activity in lci.lci_dict.items()
+        }
+        exchange_terms = [replace(term, input=key(term.input)) for term in lci.exchange_terms]
+        return replace(lci, lci_dict=lci_dict, exchange_terms=exchange_terms, database_name=new_name)
@@ -1,24 +1,33 @@
 from datetime import datetime
 import pickle
+import json
 import os
 import shutil
 
-import bw2data as bd
+import numpy as np
 import pandas as pd
-from bw2io.export.excel import write_lci_excel
 
 from code_folder.helpers.constants import (
     BW_FORMAT_LCIS_DATA_FOLDER,
+    IMPACT_CUBES_FOLDER,
+    INVENTORY_VECTORS_FOLDER,
     LCIA_RESULTS_EXCEL_FOLDER,
     LOADABLE_LCI_DATA_FOLDER,
     LOADABLE_LCIA_RESULTS_DATA_FOLDER,
+    MONTE_CARLO_RESULTS_FOLDER,
+    PIPELINE_RUNS_FOLDER,
+    RUN_DIFFS_FOLDER,
+    SENSITIVITY_RESULTS_FOLDER,
+    SYSTEM_PROCESSES_FOLDER,
 )
+from code_folder.helpers.impact_cube import ImpactCube
 
 class StorageHelper:
     """Utility functions for persisting and loading LCIs, LCIA results, and DB exports."""
     @staticmethod
     def save_lcis(lcis):
         """Save LCIs to a timestamped pickle in output_data/loadable_lcis."""
+        os.makedirs(LOADABLE_LCI_DATA_FOLDER, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"lci_run_{timestamp}.pkl"
         file_path = os.path.join(LOADABLE_LCI_DATA_FOLDER, filename)
@@ -28,16 +37,17 @@ class StorageHelper:
         print(f"✅ Saved {len(lcis)} LCIs to {file_path}")
 
     @staticmethod
-    def load_latest_lcis():
-        """Load the most recent saved LCIs from disk. Returns None if none exist."""
-        files = [f for f in os.listdir(LOADABLE_LCI_DATA_FOLDER) if f.startswith("lci_run_") and f.endswith(".pkl")]
+    def load_latest_lcis(folder=None):
+        """Load the most recent saved LCIs from disk (by default output_data/loadable_lcis). Returns None if none exist."""
+        folder = folder or LOADABLE_LCI_DATA_FOLDER
+        files = [f for f in os.listdir(folder) if f.startswith("lci_run_") and f.endswith(".pkl")] if os.path.isdir(folder) else []
         if not files:
             print("⚠️ No LCI files found in folder.")
             return
 
         files.sort(reverse=True)
         latest_file = files[0]
-        file_path = os.path.join(LOADABLE_LCI_DATA_FOLDER, latest_file)
+        file_path = os.path.join(folder, latest_file)
 
         with open(file_path, "rb") as f:
             lcis = pickle.load(f)
@@ -45,8 +55,11 @@ class StorageHelper:
         return lcis
 
     @staticmethod
-    def save_database_to_excel(database: bd.Database):
+    def save_database_to_excel(database):
         """Export the given Brightway database to Excel into output_data/bw_format_lcis."""
+        # bw2io is slow to import and only needed for this export
+        from bw2io.export.excel import write_lci_excel
+
         os.makedirs(BW_FORMAT_LCIS_DATA_FOLDER, exist_ok=True)
 
         # Use database name from database
@@ -70,6 +83,7 @@ class StorageHelper:
     @staticmethod
     def save_lcia_results(lcia_results):
         """Save LCIA results to a timestamped pickle in output_data/loadable_lcia_results."""
+        os.makedirs(LOADABLE_LCIA_RESULTS_DATA_FOLDER, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"lcia_run_{timestamp}.pkl"
         file_path = os.path.join(LOADABLE_LCIA_RESULTS_DATA_FOLDER, filename)
@@ -79,22 +93,115 @@ class StorageHelper:
         print(f"✅ Saved {len(lcia_results)} LCIA results to {file_path}")
 
     @staticmethod
-    def load_latest_lcia_results():
-        """Load the most recent saved LCIA results from disk. Returns None if none exist."""
-        files = [f for f in os.listdir(LOADABLE_LCIA_RESULTS_DATA_FOLDER) if f.startswith("lcia_run_") and f.endswith(".pkl")]
+    def load_latest_lcia_results(folder=None):
+        """Load the most recent saved LCIA results from disk (by default output_data/loadable_lcia_results). Returns None if none exist."""
+        folder = folder or LOADABLE_LCIA_RESULTS_DATA_FOLDER
+        files = [f for f in os.listdir(folder) if f.startswith("lcia_run_") and f.endswith(".pkl")] if os.path.isdir(folder) else []
         if not files:
             print("⚠️ No LCIA result files found in folder.")
             return
 
         files.sort(reverse=True)
         latest_file = files[0]
-        file_path = os.path.join(LOADABLE_LCIA_RESULTS_DATA_FOLDER, latest_file)
+        file_path = os.path.join(folder, latest_file)
 
         with open(file_path, "rb") as f:
             lcia_results = pickle.load(f)
         print(f"✅ Loaded {len(lcia_results)} LCIA results from {file_path}")
         return lcia_results
 
+    @staticmethod
+    def latest_lcia_run_files(count=2):
+        """Paths of the ``count`` most recent saved LCIA results, newest last."""
+        files = sorted(f for f in os.listdir(LOADABLE_LCIA_RESULTS_DATA_FOLDER) if f.startswith("lcia_run_") and f.endswith(".pkl")) if os.path.isdir(LOADABLE_LCIA_RESULTS_DATA_FOLDER) else []
+        return [os.path.join(LOADABLE_LCIA_RESULTS_DATA_FOLDER, f) for f in files[-count:]]
+
+    @staticmethod
+    def load_run(file_path):
+        """Load a saved run (an lci_run_*.pkl or lcia_run_*.pkl file)."""
+        with open(file_path, "rb") as f:
+            run = pickle.load(f)
+        print(f"✅ Loaded {len(run)} items from {file_path}")
+        return run
+
+    @staticmethod
+    def save_run_diff(summary, exchanges, scores):
+        """Save a run diff (per LCI, exchange and score) to a timestamped Excel file in output_data/run_diffs."""
+        os.makedirs(RUN_DIFFS_FOLDER, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = os.path.join(RUN_DIFFS_FOLDER, f"run_diff_{timestamp}.xlsx")
+        with pd.ExcelWriter(file_path, engine="xlsxwriter") as writer:
+            summary.to_excel(writer, sheet_name="lcis", index=False)
+            scores.to_excel(writer, sheet_name="scores", index=False)
+            exchanges.to_excel(writer, sheet_name="exchanges", index=False)
+
+        print(f"✅ Saved run diff to {file_path}")
+        return file_path
+
+    @staticmethod
+    def save_inventories(inventories):
+        """Save an InventoryStore as a sparse .npz matrix plus a JSON index in output_data/inventory_vectors."""
+        from scipy import sparse
+
+        os.makedirs(INVENTORY_VECTORS_FOLDER, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        matrix_path = os.path.join(INVENTORY_VECTORS_FOLDER, f"inventories_{timestamp}.npz")
+        sparse.save_npz(matrix_path, inventories.matrix)
+        with open(os.path.join(INVENTORY_VECTORS_FOLDER, f"inventories_{timestamp}.json"), "w", encoding="utf-8") as f:
+            json.dump({"biosphere_keys": inventories.biosphere_keys, "entries": inventories.entries}, f)
+
+        print(f"✅ Saved biosphere inventories of {len(inventories.entries)} LCIs to {matrix_path}")
+
+    @staticmethod
+    def load_latest_inventories(folder=None):
+        """Load the most recent saved InventoryStore from disk (by default output_data/inventory_vectors). Returns None if none exist."""
+        from scipy import sparse
+        from code_folder.helpers.inventory_store import InventoryStore
+
+        folder = folder or INVENTORY_VECTORS_FOLDER
+        files = [f for f in os.listdir(folder) if f.startswith("inventories_") and f.endswith(".npz")] if os.path.isdir(folder) else []
+        if not files:
+            print("⚠️ No inventory files found in folder.")
+            return
+
+        files.sort(reverse=True)
+        matrix_path = os.path.join(folder, files[0])
+        with open(matrix_path[:-len(".npz")] + ".json", "r", encoding="utf-8") as f:
+            index = json.load(f)
+        inventories = InventoryStore(
+            biosphere_keys=[tuple(key) for key in index["biosphere_keys"]],
+            matrix=sparse.load_npz(matrix_path),
+            entries=index["entries"],
+        )
+        print(f"✅ Loaded biosphere inventories of {len(inventories.entries)} LCIs from {matrix_path}")
+        return inventories
+
+    @staticmethod
+    def save_impact_cube(impact_cube):
+        """Save an ImpactCube as a timestamped .npz (values plus JSON coordinates) in output_data/impact_cubes."""
+        os.makedirs(IMPACT_CUBES_FOLDER, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = os.path.join(IMPACT_CUBES_FOLDER, f"impact_cube_{timestamp}.npz")
+        np.savez_compressed(file_path, values=impact_cube.values, index=json.dumps({"dims": impact_cube.dims, "coords": impact_cube.coords}))
+
+        print(f"✅ Saved impact cube {dict(zip(impact_cube.dims, impact_cube.values.shape))} to {file_path}")
+
+    @staticmethod
+    def load_latest_impact_cube():
+        """Load the most recent saved ImpactCube from disk. Returns None if none exist."""
+        files = [f for f in os.listdir(IMPACT_CUBES_FOLDER) if f.startswith("impact_cube_") and f.endswith(".npz")] if os.path.isdir(IMPACT_CUBES_FOLDER) else []
+        if not files:
+            print("⚠️ No impact cube files found in folder.")
+            return
+
+        files.sort(reverse=True)
+        file_path = os.path.join(IMPACT_CUBES_FOLDER, files[0])
+        with np.load(file_path) as data:
+            index = json.loads(str(data["index"]))
+            impact_cube = ImpactCube(dims=index["dims"], coords=index["coords"], values=data["values"])
+        print(f"✅ Loaded impact cube from {file_path}")
+        return impact_cube
+
     @staticmethod
     def save_lcia_results_to_excel(lcia_results, lcia_methods):
         """Export LCIA results to Excel with one row per scenario/year/route/product and impact type."""
@@ -139,7 +246,133 @@ class StorageHelper:
         ]
         df = pd.DataFrame(rows, columns=columns)
 
+        contribution_rows = []
+        for result in lcia_results:
+            metadata = {
+                "Scenario": result.lci.scenario.value,
+                "Year": result.lci.year,
+                "Location": result.lci.location.value,
+                "Product": result.lci.product.value,
+                "RecyclingRoute": result.lci.route.value,
+            }
+            for impact_type, methods in result.exchange_contributions.items():
+                for method_label, exchanges in methods.items():
+                    for exchange_name, value in exchanges.items():
+                        contribution_rows.append({**metadata, "Impact_type": impact_type, "Breakdown": "exchange", "Flow": exchange_name, "Method": method_label, "Value": value})
+            for method_label, materials in result.impact_per_element.items():
+                for material, value in materials.items():
+                    contribution_rows.append({**metadata, "Impact_type": "avoided", "Breakdown": "recovered material", "Flow": material, "Method": method_label, "Value": value})
+
+        impact_cube = ImpactCube.from_lcia_results(lcia_results, method_labels)
+
         with pd.ExcelWriter(file_path, engine="xlsxwriter") as writer:
             df.to_excel(writer, sheet_name="impact_per_kg", index=False)
+            impact_cube.to_frame().to_excel(writer, sheet_name="absolute_impacts", index=False)
+            impact_cube.sum(["product", "route"]).to_frame().to_excel(writer, sheet_name="absolute_totals", index=False)
+            if contribution_rows:
+                pd.DataFrame(contribution_rows).to_excel(writer, sheet_name="contributions", index=False)
 
         print(f"✅ Saved LCIA results to Excel at {file_path}")
+
+    @staticmethod
+    def save_monte_carlo_results(monte_carlo_results):
+        """Save Monte Carlo summaries to a timestamped pickle and Excel file in output_data/monte_carlo_results."""
+        if not monte_carlo_results:
+            print("⚠️ No Monte Carlo results to save.")
+            return
+
+        os.makedirs(MONTE_CARLO_RESULTS_FOLDER, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        pickle_path = os.path.join(MONTE_CARLO_RESULTS_FOLDER, f"monte_carlo_run_{timestamp}.pkl")
+        with open(pickle_path, "wb") as f:
+            pickle.dump(monte_carlo_results, f)
+
+        rows = []
+        for result in monte_carlo_results:
+            metadata = {
+                "Scenario": result.lci.scenario.value,
+                "Year": result.lci.year,
+                "Location": result.lci.location.value,
+                "Product": result.lci.product.value,
+                "RecyclingRoute": result.lci.route.value,
+                "Iterations": result.iterations,
+            }
+            for impact_type, methods in result.statistics.items():
+                for method_label, statistics in methods.items():
+                    rows.append({**metadata, "Impact_type": impact_type, "Method": method_label, **statistics})
+
+        excel_path = os.path.join(MONTE_CARLO_RESULTS_FOLDER, f"monte_carlo_results_{timestamp}.xlsx")
+        with pd.ExcelWriter(excel_path, engine="xlsxwriter") as writer:
+            pd.DataFrame(rows).to_excel(writer, sheet_name="monte_carlo", index=False)
+
+        print(f"✅ Saved {len(monte_carlo_results)} Monte Carlo results to {pickle_path} and {excel_path}")
+
+    @staticmethod
+    def save_sensitivity_results(sensitivity_results):
+        """Save ranked sensitivities to a timestamped pickle and Excel file in output_data/sensitivity_results."""
+        if not sensitivity_results:
+            print("⚠️ No sensitivity results to save.")
+            return
+
+        os.makedirs(SENSITIVITY_RESULTS_FOLDER, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        pickle_path = os.path.join(SENSITIVITY_RESULTS_FOLDER, f"sensitivity_run_{timestamp}.pkl")
+        with open(pickle_path, "wb") as f:
+            pickle.dump(sensitivity_results, f)
+
+        rows = []
+        for result in sensitivity_results:
+            metadata = {
+                "Scenario": result.lci.scenario.value,
+                "Year": result.lci.year,
+                "Location": result.lci.location.value,
+                "Product": result.lci.product.value,
+                "RecyclingRoute": result.lci.route.value,
+            }
+            for parameter in result.parameters:
+                rows.append({**metadata, **parameter, "Score": result.scores[parameter["Impact_type"]][parameter["Method"]]})
+
+        excel_path = os.path.join(SENSITIVITY_RESULTS_FOLDER, f"sensitivity_results_{timestamp}.xlsx")
+        with pd.ExcelWriter(excel_path, engine="xlsxwriter") as writer:
+            pd.DataFrame(rows).to_excel(writer, sheet_name="sensitivities", index=False)
+
+        print(f"✅ Saved sensitivities of {len(sensitivity_results)} LCIs to {pickle_path} and {excel_path}")
+
+    @staticmethod
+    def save_system_processes(database_name, data, table):
+        """Save system processes as a Brightway data dict (pickle) and a gzipped long CSV in output_data/system_processes."""
+        os.makedirs(SYSTEM_PROCESSES_FOLDER, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        pickle_path = os.path.join(SYSTEM_PROCESSES_FOLDER, f"{database_name}_{timestamp}.pkl")
+        with open(pickle_path, "wb") as f:
+            pickle.dump(data, f)
+        csv_path = os.path.join(SYSTEM_PROCESSES_FOLDER, f"{database_name}_{timestamp}.csv.gz")
+        table.to_csv(csv_path, index=False)
+
+        print(f"✅ Saved {len(data)} system processes ({len(table)} biosphere flows) to {pickle_path} and {csv_path}")
+
+    @staticmethod
+    def new_pipeline_run_folder():
+        """Create a timestamped folder in output_data/pipeline_runs for the partitions of a pipelined run."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        run_folder = os.path.join(PIPELINE_RUNS_FOLDER, f"pipeline_run_{timestamp}")
+        os.makedirs(run_folder, exist_ok=True)
+        return run_folder
+
+    @staticmethod
+    def save_partition(run_folder, partition_label, lcis, lcia_results):
+        """Save the LCIs and LCIA results of one (scenario, year) partition of a pipelined run."""
+        for prefix, items in (("lci", lcis), ("lcia", lcia_results)):
+            with open(os.path.join(run_folder, f"{prefix}_{partition_label}.pkl"), "wb") as f:
+                pickle.dump(items, f)
+        print(f"✅ Saved {len(lcis)} LCIs and {len(lcia_results)} LCIA results of partition {partition_label} to {run_folder}")
+
+    @staticmethod
+    def load_pipeline_run(run_folder, prefix="lcia"):
+        """Load and concatenate the LCIs ("lci") or LCIA results ("lcia") of all partitions of a pipelined run."""
+        items = []
+        for file_name in sorted(os.listdir(run_folder)):
+            if file_name.startswith(f"{prefix}_") and file_name.endswith(".pkl"):
+                with open(os.path.join(run_folder, file_name), "rb") as f:
+                    items.extend(pickle.load(f))
+        return items
@@ -0,0 +1,123 @@
+import ast
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from code_folder.helpers.background_solver import BackgroundSolver
+from code_folder.helpers.constants import SCENARIO_DIFFERENCE_FOLDER, SUPERSTRUCTURE_NAME
+
+
+class SuperstructureSolver:
+    """
+    Score the scenarios of a premise superstructure database from one set of base matrices.
+
+    Each scenario column of the scenario-difference file is applied as a sparse patch of the
+    technosphere and biosphere matrices, so no separate scenario database needs to exist.
+    """
+    def __init__(self, base: BackgroundSolver, difference_df: pd.DataFrame):
+        self.base = base
+        self.scenario_columns = [column for column in difference_df.columns if column.count(" - ") == 2]
+        self._technosphere_patch = self._patch_positions(difference_df, matrix="technosphere")
+        self._biosphere_patch = self._patch_positions(difference_df, matrix="biosphere")
+        self._technosphere_base = self.base.technosphere_matrix.tocsr()
+        self._biosphere_base = self.base.biosphere_matrix.tocsr()
+        self._cache: Dict[str, BackgroundSolver] = {}
+
+    @classmethod
+    def from_activities(cls, activities: Iterable, lcia_methods: List[tuple], difference_file: Path = None) -> "SuperstructureSolver":
+        """Load the superstructure matrices once, together with its scenario-difference file."""
+        difference_file = difference_file or cls.find_difference_file()
+        return cls(
+            base=BackgroundSolver.from_activities(activities, lcia_methods),
+            difference_df=cls.read_difference_file(difference_file),
+        )
+
+    @staticmethod
+    def find_difference_file(folder: Path = SCENARIO_DIFFERENCE_FOLDER, database_name: str = SUPERSTRUCTURE_NAME) -> Path:
+        """Return the most recent scenario-difference file written by premise for the superstructure database."""
+        candidates = [
+            path for path in Path(folder).glob(f"*{database_name}*")
+            if path.suffix in (".csv", ".xlsx", ".feather")
+        ]
+        if not candidates:
+            raise FileNotFoundError(f"No scenario difference file for '{database_name}' found in {folder}")
+        return max(candidates, key=lambda path: path.stat().st_mtime)
+
+    @staticmethod
+    def read_difference_file(path: Path) -> pd.DataFrame:
+        """Read a premise scenario-difference file (csv, xlsx or feather) and parse its key columns."""
+        path = Path(path)
+        if path.suffix == ".xlsx":
+            difference_df = pd.read_excel(path)
+        elif path.suffix == ".feather":
+            difference_df = pd.read_feather(path)
+        else:
+            difference_df = pd.read_csv(path, sep=None, engine="python")
+        for column in ("from key", "to key"):
+            difference_df[column] = [ast.literal_eval(key) if isinstance(key, str) else tuple(key) for key in difference_df[column]]
+        return difference_df
+
+    def _patch_positions(self, difference_df: pd.DataFrame, matrix: str) -> dict:
+        """Matrix rows, columns and signs of the difference-file exchanges present in the base matrices."""
+        if matrix == "biosphere":
+            selected = difference_df[difference_df["flow type"] == "biosphere"]
+            row_index = self.base.biosphere_index
+        else:
+            selected = difference_df[difference_df["flow type"].isin(["technosphere", "production"])]
+            row_index = self.base.product_index
+        present = [
+            from_key in row_index and to_key in self.base.activity_index
+            for from_key, to_key in zip(selected["from key"], selected["to key"])
+        ]
+        selected = selected[present]
+        return {
+            "rows": np.array([row_index[key] for key in selected["from key"]], dtype=int),
+            "cols": np.array([self.base.activity_index[key] for key in selected["to key"]], dtype=int),
+            # Technosphere inputs are stored as negative values in the technosphere matrix
+            "signs": np.where(selected["flow type"] == "technosphere", -1.0, 1.0),
+            "values": {column: selected[column].to_numpy(dtype=float) for column in self.scenario_columns},
+        }
+
+    @staticmethod
+    def _patched(matrix: sparse.csr_matrix, rows: np.ndarray, cols: np.ndarray, values: np.ndarray) -> sparse.csr_matrix:
+        """Return a copy of matrix with the given entries replaced by values."""
+        patched = matrix.copy()
+        patched.sum_duplicates()
+        if not len(rows):
+            return patched
+        # Duplicate (row, col) pairs in the difference file are separate exchanges: sum them
+        entries = pd.DataFrame({"row": rows, "col": cols, "value": values}).groupby(["row", "col"], sort=False)["value"].sum()
+        rows = entries.index.get_level_values("row").to_numpy()
+        cols = entries.index.get_level_values("col").to_numpy()
+        values = entries.to_numpy()
+
+        stored_keys = np.repeat(np.arange(patched.shape[0], dtype=np.int64), np.diff(patched.indptr)) * patched.shape[1] + patched.indices
+        patch_keys = rows.astype(np.int64) * patched.shape[1] + cols
+        positions = np.searchsorted(stored_keys, patch_keys)
+        found = positions < len(stored_keys)
+        found[found] = stored_keys[positions[found]] == patch_keys[found]
+
+        patched.data[positions[found]] = values[found]
+        if (~found).any():
+            patched = patched + sparse.csr_matrix((values[~found], (rows[~found], cols[~found])), shape=patched.shape)
+        return patched
+
+    def for_scenario(self, scenario_column: str) -> BackgroundSolver:
+        """Return a solver for one scenario column, patching the base matrices (the last solver is kept in memory)."""
+        if scenario_column not in self._cache:
+            if scenario_column not in self.scenario_columns:
+                raise ValueError(f"Scenario '{scenario_column}' not found in scenario difference file. Available: {', '.join(self.scenario_columns)}")
+            technosphere = self._patched(self._technosphere_base, self._technosphere_patch["rows"], self._technosphere_patch["cols"], self._technosphere_patch["signs"] * self._technosphere_patch["values"][scenario_column])
+            biosphere = self._patched(self._biosphere_base, self._biosphere_patch["rows"], self._biosphere_patch["cols"], self._biosphere_patch["signs"] * self._biosphere_patch["values"][scenario_column])
+            self._cache = {scenario_column: BackgroundSolver(
+                technosphere_matrix=technosphere,
+                biosphere_matrix=biosphere,
+                characterization_vectors=dict(zip(self.base.methods, self.base.characterization.T)),
+                product_index=self.base.product_index,
+                activity_index=self.base.activity_index,
+                biosphere_index=self.base.biosphere_index,
+            )}
+        return self._cache[scenario_column]
@@ -0,0 +1,102 @@
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from code_folder.helpers.constants import SingleLCI
+from code_folder.helpers.inventory_store import InventoryStore
+
+
+class SystemProcessHelper:
+    """
+    Aggregated (system) processes of the main and avoided activities of LCIs.
+
+    Each system process keeps the production amount of its foreground activity and has only
+    biosphere exchanges: the cumulative flows of the whole supply chain from the stored inventories,
+    so consumers can characterize it without the background databases or any factorization.
+    """
+
+    @staticmethod
+    def build(inventories: InventoryStore, lcis: List[SingleLCI], database_name: str) -> Tuple[dict, pd.DataFrame]:
+        """System processes of the LCIs of an InventoryStore (``lcis`` in entry order).
+
+        Returns (Brightway data dict for ``Database(database_name).write``, long table of biosphere flows).
+        """
+        if [InventoryStore.entry(lci) for lci in lcis] != inventories.entries:
+            raise ValueError("Stored inventories do not match the LCIs; run run_lcia(store_inventories=True) again for these LCIs.")
+
+        columns, activities = [], []
+        for index, lci in enumerate(lcis):
+            # LCIs that only differ in location share their activities, so the location is not part of the key
+            entry = {key: value for key, value in InventoryStore.entry(lci).items() if key != "location"}
+            for offset, (role, flow_name) in enumerate((("main", lci.main_activity_flow_name), ("avoided", lci.avoided_impacts_flow_name))):
+                activity = next(activity for activity in lci.lci_dict.values() if activity["name"].lower() == flow_name)
+                production = sum(exchange["amount"] for exchange in activity["exchanges"] if exchange["type"] == "production")
+                process_key = json.dumps({**entry, "role": role}, sort_keys=True)
+                code = hashlib.md5(process_key.encode("utf-8")).hexdigest()
+                columns.append(2 * index + offset)
+                activities.append({
+                    "code": code,
+                    "Scenario": lci.scenario.value,
+                    "Year": lci.year,
+                    "Location": lci.location.value,
+                    "Product": lci.product.value,
+                    "RecyclingRoute": lci.route.value,
+                    "Role": role,
+                    # Builder flow names can repeat across routes and products, so those are part of the name
+                    "Activity": f"{activity['name']} ({lci.route.value}, {lci.product.value}, {role})",
+                    "Production": production,
+                })
+        activities = pd.DataFrame(activities, columns=["code", "Scenario", "Year", "Location", "Product", "RecyclingRoute", "Role", "Activity", "Production"])
+        # One system process per key: LCIs of other locations add no new process
+        unique = ~activities["code"].duplicated().to_numpy()
+        activities = activities[unique].reset_index(drop=True)
+        columns = np.asarray(columns, dtype=int)[unique]
+
+        # Stored inventories are for the LCIA demand of -1; a system process holds those of its own production amount
+        scaling = -activities["Production"].to_numpy(dtype=float)
+        flows = sparse.coo_matrix(inventories.matrix[:, columns] @ sparse.diags(scaling))
+        flow_metadata = SystemProcessHelper.flow_metadata(inventories.biosphere_keys)
+        table = activities.iloc[flows.col].reset_index(drop=True)
+        table["Flow database"] = [inventories.biosphere_keys[row][0] for row in flows.row]
+        table["Flow code"] = [inventories.biosphere_keys[row][1] for row in flows.row]
+        flow_rows = pd.DataFrame(
+            [(flow_metadata.get(key, {}).get("name"), "::".join(flow_metadata.get(key, {}).get("categories") or ()), flow_metadata.get(key, {}).get("unit")) for key in inventories.biosphere_keys],
+            columns=["Flow name", "Categories", "Unit"],
+        )
+        table = pd.concat([table, flow_rows.iloc[flows.row].reset_index(drop=True)], axis=1)
+        table["Amount"] = flows.data
+        table = table[table["Amount"] != 0].sort_values(["Activity", "Flow name"], kind="stable").reset_index(drop=True)
+
+        data = {}
+        for activity in activities.itertuples(index=False):
+            key = (database_name, activity.code)
+            data[key] = {
+                "name": activity.Activity,
+                "reference product": activity.Activity,
+                "unit": "kilogram",
+                "location": "RER",
+                "type": "process",
+                "comment": f"Aggregated system process: cumulative biosphere flows of {activity.Activity}, {activity.Scenario} {activity.Year}",
+                "exchanges": [{"input": key, "amount": activity.Production, "type": "production", "unit": "kilogram", "name": activity.Activity}],
+            }
+        for code, flow_database, flow_code, flow_name, unit, amount in zip(table["code"], table["Flow database"], table["Flow code"], table["Flow name"], table["Unit"], table["Amount"]):
+            data[(database_name, code)]["exchanges"].append({"input": (flow_database, flow_code), "amount": amount, "type": "biosphere", "unit": unit, "name": flow_name})
+        return data, table.drop(columns="code")
+
+    @staticmethod
+    def flow_metadata(biosphere_keys: List[tuple]) -> Dict[tuple, dict]:
+        """Name, categories and unit of biosphere flows, read from Brightway in batches."""
+        from bw2data.backends import ActivityDataset
+
+        metadata, codes_by_database = {}, {}
+        for database, code in biosphere_keys:
+            codes_by_database.setdefault(database, []).append(code)
+        for database, codes in codes_by_database.items():
+            for start in range(0, len(codes), 500):
+                batch = ActivityDataset.select(ActivityDataset.code, ActivityDataset.data).where((ActivityDataset.database == database) & (ActivityDataset.code << codes[start:start + 500]))
+                metadata.update({(database, row.code): row.data for row in batch})
+        return metadata
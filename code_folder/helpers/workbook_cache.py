@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+from code_folder.helpers.constants import WORKBOOK_CACHE_FOLDER
+
+
+class WorkbookCache:
+    """
+    Parse Excel workbooks once and keep every sheet in a local binary cache.
+
+    Each workbook gets a cache folder keyed by its path (and the dtypes used to parse it), holding one
+    Parquet file per sheet (pickle when a sheet cannot be stored as Parquet) and a manifest with the
+    file's mtime, size and SHA-256. The cache is reused while mtime and size match, or while the hash
+    still matches after the file was touched, and shared by all processes using the same data folder.
+    """
+    _memory: Dict[tuple, Dict[str, pd.DataFrame]] = {}
+
+    @staticmethod
+    def load(path: Path, dtype: Optional[dict] = None) -> Dict[str, pd.DataFrame]:
+        """Return all sheets of a workbook as {sheet name: DataFrame}, in workbook order."""
+        path = Path(path).resolve()
+        stat = path.stat()
+        memory_key = (str(path), stat.st_mtime_ns, stat.st_size, repr(dtype))
+        if memory_key not in WorkbookCache._memory:
+            WorkbookCache._memory[memory_key] = WorkbookCache._load_from_disk(path, stat, dtype)
+        return WorkbookCache._memory[memory_key]
+
+    @staticmethod
+    def sheet_names(path: Path, dtype: Optional[dict] = None) -> list:
+        return list(WorkbookCache.load(path, dtype=dtype))
+
+    @staticmethod
+    def _cache_folder(path: Path, dtype: Optional[dict]) -> Path:
+        path_key = hashlib.sha1(f"{path}|{dtype!r}".encode()).hexdigest()[:16]
+        return WORKBOOK_CACHE_FOLDER / f"{path.stem}_{path_key}"
+
+    @staticmethod
+    def _file_hash(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _load_from_disk(path: Path, stat: os.stat_result, dtype: Optional[dict]) -> Dict[str, pd.DataFrame]:
+        cache_folder = WorkbookCache._cache_folder(path, dtype)
+        manifest_path = cache_folder / "manifest.json"
+        manifest = None
+        if manifest_path.exists():
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+        file_hash = None
+        if manifest and (manifest["mtime_ns"], manifest["size"]) != (stat.st_mtime_ns, stat.st_size):
+            # Touched or modified: only a content change invalidates the cache
+            file_hash = WorkbookCache._file_hash(path)
+            if file_hash == manifest["sha256"]:
+                manifest.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                WorkbookCache._write_manifest(manifest_path, manifest)
+            else:
+                manifest = None
+
+        if manifest:
+            return {
+                sheet["name"]: pd.read_parquet(cache_folder / sheet["file"]) if sheet["format"] == "parquet" else pd.read_pickle(cache_folder / sheet["file"])
+                for sheet in manifest["sheets"]
+            }
+
+        sheets = pd.read_excel(path, sheet_name=None, dtype=dtype)
+        WorkbookCache._write_cache(cache_folder, path, stat, file_hash or WorkbookCache._file_hash(path), sheets)
+        return sheets
+
+    @staticmethod
+    def _write_cache(cache_folder: Path, path: Path, stat: os.stat_result, file_hash: str, sheets: Dict[str, pd.DataFrame]) -> None:
+        if cache_folder.exists():
+            shutil.rmtree(cache_folder)
+        os.makedirs(cache_folder, exist_ok=True)
+        sheet_entries = []
+        for index, (sheet_name, df) in enumerate(sheets.items()):
+            try:
+                file_name = f"sheet_{index}.parquet"
+                df.to_parquet(cache_folder / file_name, index=False)
+                sheet_format = "parquet"
+            except Exception:
+                # No pyarrow, or mixed-type columns that Parquet cannot store
+                file_name = f"sheet_{index}.pkl"
+                df.to_pickle(cache_folder / file_name)
+                sheet_format = "pickle"
+            sheet_entries.append({"name": sheet_name, "file": file_name, "format": sheet_format})
+        WorkbookCache._write_manifest(cache_folder / "manifest.json", {
+            "path": str(path),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": file_hash,
+            "sheets": sheet_entries,
+        })
+
+    @staticmethod
+    def _write_manifest(manifest_path: Path, manifest: dict) -> None:
+        # Write then rename, so a concurrent reader never sees a partial manifest
+        temporary_path = manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary_path, manifest_path)
@@ -1,12 +1,23 @@
+import hashlib
+import json
 import os
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import Manager, get_context
+from typing import Dict, List, Optional
 import bw2data as bw
-from premise import NewDatabase  # type: ignore
-from code_folder.helpers.constants import PROJECT_NAME, ECOINVENT_NAME, SUPERSTRUCTURE_NAME, SCENARIO_MAP
+from code_folder.helpers.constants import PROJECT_NAME, ECOINVENT_NAME, SUPERSTRUCTURE_NAME, SCENARIO_MAP, SCENARIO_DIFFERENCE_FOLDER, PREMISE_MANIFEST_FILE
 
 
 YEARS: List[int] = [2020, 2030, 2040, 2050]
 
+# Options passed to every NewDatabase; part of the fingerprint, so changing them triggers a rebuild
+NEW_DATABASE_OPTIONS = {
+    "keep_source_db_uncertainty": False,
+    "keep_imports_uncertainty": False,
+    "use_absolute_efficiency": False,
+}
+
 
 def _derive_ecoinvent_version(db_name: str) -> str:
     # Best-effort extraction like "ecoinvent-3.12-cutoff" -> "3.12"
@@ -21,46 +32,187 @@ def _derive_ecoinvent_version(db_name: str) -> str:
     return "3.12"
 
 
-def build_superstructure_db() -> None:
-
+def _get_ecoinvent_key() -> str:
     ecoinvent_key = os.environ.get("PREMISE_ECOINVENT_KEY")
     if not ecoinvent_key:
         raise RuntimeError(
             "Environment variable PREMISE_ECOINVENT_KEY is not set. "
             "Set it to your ecoinvent decryption key and re-run."
         )
+    return ecoinvent_key
+
+
+def _scenario_jobs() -> List[Dict[str, object]]:
+    """One job per (model, pathway, year), named like the scenario databases LCABuilder links to."""
+    return [
+        {"db_name": f"{scenario_label}_{year}", "model": spec["model"], "pathway": spec["pathway"], "year": year}
+        for scenario_label, spec in SCENARIO_MAP.items()
+        for year in YEARS
+    ]
+
+
+def _fingerprint(scenarios: List[Dict[str, object]]) -> str:
+    """Hash of everything a premise database depends on: source database, scenarios, options and premise version."""
+    import premise  # type: ignore
+
+    source_metadata = bw.databases.get(ECOINVENT_NAME, {})
+    payload = {
+        "source_db": ECOINVENT_NAME,
+        "source_version": _derive_ecoinvent_version(ECOINVENT_NAME),
+        "source_modified": source_metadata.get("modified"),
+        "scenarios": [{key: scenario[key] for key in ("model", "pathway", "year")} for scenario in scenarios],
+        "options": NEW_DATABASE_OPTIONS,
+        "premise_version": str(getattr(premise, "__version__", "unknown")),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _load_manifest() -> Dict[str, dict]:
+    if not PREMISE_MANIFEST_FILE.exists():
+        return {}
+    with open(PREMISE_MANIFEST_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _record_in_manifest(db_name: str, fingerprint: str) -> None:
+    """Mark a database as built; written after every success so an interrupted run can resume."""
+    manifest = _load_manifest()
+    manifest[db_name] = {"fingerprint": fingerprint, "built": datetime.now().isoformat(timespec="seconds")}
+    os.makedirs(PREMISE_MANIFEST_FILE.parent, exist_ok=True)
+    with open(PREMISE_MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _is_up_to_date(db_name: str, fingerprint: str, manifest: Dict[str, dict]) -> bool:
+    return db_name in bw.databases and manifest.get(db_name, {}).get("fingerprint") == fingerprint
+
+
+def _build_scenario_database(job: Dict[str, object], ecoinvent_key: str, write_lock) -> str:
+    """Worker: run premise for one scenario and write it to Brightway (writes are serialized by write_lock)."""
+    from premise import NewDatabase  # type: ignore
 
     bw.projects.set_current(PROJECT_NAME)
+    ndb = NewDatabase(
+        scenarios=[{"model": job["model"], "pathway": job["pathway"], "year": job["year"]}],
+        source_db=ECOINVENT_NAME,
+        source_version=_derive_ecoinvent_version(ECOINVENT_NAME),
+        key=ecoinvent_key,
+        # Reuse premise's cached source database and inventories between jobs and runs
+        use_cached_inventories=True,
+        use_cached_database=True,
+        **NEW_DATABASE_OPTIONS,
+    )
+    ndb.update()
+    _write_scenario_database(job["db_name"], ndb, write_lock)
+    return job["db_name"]
+
+
+def _write_scenario_database(db_name: str, ndb, write_lock) -> None:
+    """Write a premise database to Brightway under write_lock.
 
-    source_db = ECOINVENT_NAME
-    source_version = _derive_ecoinvent_version(ECOINVENT_NAME)
+    databases.json is rewritten whole by every registration, so it is reloaded first to keep the
+    databases other workers wrote since this process loaded the project.
+    """
+    with write_lock:
+        bw.databases.load()
+        if db_name in bw.databases:
+            bw.Database(db_name).deregister()
+        ndb.write_db_to_brightway(name=[db_name])
 
-    scenarios: List[Dict[str, object]] = []
-    scenario_db_names: List[str] = []
-    for scenario_label, spec in SCENARIO_MAP.items():
-        for year in YEARS:
-            scenarios.append({"model": spec["model"], "pathway": spec["pathway"], "year": year})
-            scenario_db_names.append(f"{scenario_label}_{year}")
+
+def build_scenario_databases(max_workers: Optional[int] = None, force: bool = False) -> List[str]:
+    """Build every scenario database that is missing or out of date, in parallel processes.
+
+    A database is skipped when its fingerprint (source database and version, scenario, premise
+    options and version) matches the manifest. Failed scenarios are reported and left for the
+    next run; the others are still written. ``max_workers`` defaults to PREMISE_MAX_WORKERS (2),
+    as every premise process holds a full copy of ecoinvent in memory.
+
+    Returns the names of the databases that failed.
+    """
+    ecoinvent_key = _get_ecoinvent_key()
+    bw.projects.set_current(PROJECT_NAME)
+    max_workers = max_workers or int(os.environ.get("PREMISE_MAX_WORKERS", 2))
+
+    manifest = _load_manifest()
+    pending = []
+    for job in _scenario_jobs():
+        fingerprint = _fingerprint([job])
+        if not force and _is_up_to_date(job["db_name"], fingerprint, manifest):
+            print(f"⏭️ Scenario database {job['db_name']} is up to date, skipping.")
+            continue
+        pending.append((job, fingerprint))
+
+    failed = []
+    if not pending:
+        return failed
+
+    with Manager() as manager:
+        write_lock = manager.Lock()
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as executor:
+            futures = {executor.submit(_build_scenario_database, job, ecoinvent_key, write_lock): (job, fingerprint) for job, fingerprint in pending}
+            for future in as_completed(futures):
+                job, fingerprint = futures[future]
+                try:
+                    future.result()
+                except Exception as exc:
+                    failed.append(job["db_name"])
+                    print(f"⚠️ Building scenario database {job['db_name']} failed: {exc}")
+                    continue
+                # Pick up the registrations the workers wrote to databases.json
+                bw.databases.load()
+                if job["db_name"] not in bw.databases:
+                    failed.append(job["db_name"])
+                    print(f"⚠️ Scenario database {job['db_name']} was written but is not registered in project {PROJECT_NAME}")
+                    continue
+                _record_in_manifest(job["db_name"], fingerprint)
+                print(f"✅ Built scenario database {job['db_name']}")
+    bw.databases.load()
+    return failed
+
+
+def build_superstructure_db(write_scenario_databases: bool = True, max_workers: Optional[int] = None, force: bool = False) -> None:
+    """Build the premise scenario databases and the superstructure database with its scenario-difference file.
+
+    Set ``write_scenario_databases`` to False when only ``LCABuilder(use_superstructure=True)`` is used,
+    to skip writing a full database per scenario. Databases whose inputs are unchanged are skipped.
+    """
+    from premise import NewDatabase  # type: ignore
+
+    if write_scenario_databases:
+        build_scenario_databases(max_workers=max_workers, force=force)
+
+    ecoinvent_key = _get_ecoinvent_key()
+    bw.projects.set_current(PROJECT_NAME)
+
+    scenarios: List[Dict[str, object]] = [
+        {"model": job["model"], "pathway": job["pathway"], "year": job["year"]} for job in _scenario_jobs()
+    ]
+    fingerprint = _fingerprint(scenarios)
+    if not force and _is_up_to_date(SUPERSTRUCTURE_NAME, fingerprint, _load_manifest()):
+        print(f"⏭️ Superstructure database {SUPERSTRUCTURE_NAME} is up to date, skipping.")
+        return
 
     ndb = NewDatabase(
         scenarios=scenarios,
-        source_db=source_db,
-        source_version=source_version,
+        source_db=ECOINVENT_NAME,
+        source_version=_derive_ecoinvent_version(ECOINVENT_NAME),
         key=ecoinvent_key,
-        keep_source_db_uncertainty=False,
-        keep_imports_uncertainty=False,
-        use_absolute_efficiency=False,
+        use_cached_inventories=True,
+        use_cached_database=True,
+        **NEW_DATABASE_OPTIONS,
     )
 
     # Update all sectors for a comprehensive superstructure
     ndb.update()
 
-    # Write individual scenario databases
-    ndb.write_db_to_brightway(name=scenario_db_names)
-
     # Single superstructure database with scenario-difference file
     super_name = SUPERSTRUCTURE_NAME
-    ndb.write_superstructure_db_to_brightway(name=super_name)
+    if super_name in bw.databases:
+        bw.Database(super_name).deregister()
+    os.makedirs(SCENARIO_DIFFERENCE_FOLDER, exist_ok=True)
+    ndb.write_superstructure_db_to_brightway(name=super_name, filepath=SCENARIO_DIFFERENCE_FOLDER, file_format="csv")
+    _record_in_manifest(super_name, fingerprint)
 
 
 if __name__ == "__main__":
@@ -4,4 +4,9 @@ setup(
     name="lca_futuram",
     version="0.1",
     packages=find_packages(),
-)
\ No newline at end of file
+    entry_points={
+        "console_scripts": [
+            "lca-futuram=code_folder.cli:main",
+        ],
+    },
+)
@@ -0,0 +1,113 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+ROUTE_FOLDER = "BATT_LIBToPyro1"
+METHODS = [("EF v3.0", "climate change", "GWP"), ("EF v3.0", "acidification", "AE")]
+# Background databases of the toy project, with the CO2 intensity of their processes
+BACKGROUND_FACTORS = {"BAU_2030": 1.0, "BAU_2040": 0.6, "REC_2030": 0.8, "REC_2040": 0.5}
+
+BUILDER_ROWS = [
+    {"Stock/Flow IDs": "F_in", "Materials": "battLiNMC111", "Layer": None, "Linked process": None, "Categories": None, "Region": None, "LCI Flow Name": "NMC111 battery", "Flow Direction": "input", "LCI Flow Type": "production", "Amount": None, "Unit": "kilogram", "Scaled by flows": None, "Recovery efficiency": None},
+    {"Stock/Flow IDs": "F_rec", "Materials": "Ni", "Layer": "4", "Linked process": "ecoinvent:nickel sulfate production", "Categories": None, "Region": "RER", "LCI Flow Name": "nickel sulfate", "Flow Direction": "output", "LCI Flow Type": "recovered", "Amount": None, "Unit": "kilogram", "Scaled by flows": None, "Recovery efficiency": 0.8},
+    {"Stock/Flow IDs": None, "Materials": None, "Layer": None, "Linked process": "ecoinvent:electricity production", "Categories": None, "Region": "RER", "LCI Flow Name": "electricity", "Flow Direction": "input", "LCI Flow Type": "technosphere", "Amount": 2.0, "Unit": "kilowatt hour", "Scaled by flows": "F_in", "Recovery efficiency": None},
+    {"Stock/Flow IDs": None, "Materials": None, "Layer": None, "Linked process": "biosphere:Carbon dioxide, fossil", "Categories": "air, urban air close to ground", "Region": None, "LCI Flow Name": "carbon dioxide", "Flow Direction": "output", "LCI Flow Type": "biosphere", "Amount": 0.1, "Unit": "kilogram", "Scaled by flows": None, "Recovery efficiency": None},
+    {"Stock/Flow IDs": "F_co", "Materials": "Co", "Layer": "3", "Linked process": "ecoinvent:cobalt production", "Categories": None, "Region": "RER", "LCI Flow Name": "cobalt", "Flow Direction": "input", "LCI Flow Type": "technosphere", "Amount": None, "Unit": "kilogram", "Scaled by flows": None, "Recovery efficiency": None},
+]
+
+
+def mfa_rows(year: int, scenario: str, scale: float = 1.0) -> list:
+    """rm_output.csv rows of the toy route for one year and scenario."""
+    return [
+        {"Year": year, "Scenario": scenario, "Stock/Flow ID": "F_in", "Layer 1": "battLiNMC111", "Layer 2": "cell", "Layer 3": "NiO", "Layer 4": "Ni", "Value": 60 * scale},
+        {"Year": year, "Scenario": scenario, "Stock/Flow ID": "F_in", "Layer 1": "battLiNMC111", "Layer 2": "cell", "Layer 3": "CoO", "Layer 4": "Co", "Value": 40 * scale},
+        {"Year": year, "Scenario": scenario, "Stock/Flow ID": "F_rec", "Layer 1": "battLiNMC111", "Layer 2": "cell", "Layer 3": "NiO", "Layer 4": "Ni", "Value": 50 * scale},
+        {"Year": year, "Scenario": scenario, "Stock/Flow ID": "F_co", "Layer 1": "battLiNMC111", "Layer 2": "cell", "Layer 3": "Co", "Layer 4": None, "Value": 5 * scale},
+    ]
+
+
+@pytest.fixture(scope="module")
+def input_data(tmp_path_factory):
+    """Input and output folders of one toy recycling route (BAU and REC, 2025-2040), patched into the helpers.
+
+    The MFA values of BAU are the same every year; REC 2033 differs so it cannot share an LCI.
+    """
+    import code_folder.helpers.lookup_cache as lookup_cache
+    import code_folder.helpers.lca_builder as lca_builder
+    import code_folder.helpers.run_planner as run_planner
+    import code_folder.helpers.storage_helper as storage_helper
+    import code_folder.helpers.workbook_cache as workbook_cache
+
+    data = tmp_path_factory.mktemp("data")
+    route_folder = data / "input_data" / ROUTE_FOLDER
+    route_folder.mkdir(parents=True)
+    rows = []
+    for year in range(2025, 2041):
+        rows += mfa_rows(year, "BAU")
+        rows += mfa_rows(year, "REC", scale=1.5 if year == 2033 else 1.0)
+    pd.DataFrame(rows).to_csv(route_folder / "rm_output.csv", index=False)
+    with pd.ExcelWriter(route_folder / "lci_builder.xlsx") as writer:
+        pd.DataFrame(BUILDER_ROWS).to_excel(writer, sheet_name="battLiNMC111", index=False)
+
+    with pytest.MonkeyPatch.context() as patch:
+        for module in (lca_builder, run_planner):
+            patch.setattr(module, "INPUT_DATA_FOLDER", data / "input_data")
+        for name in dir(storage_helper):
+            if name.endswith("_FOLDER"):
+                patch.setattr(storage_helper, name, data / "output_data" / name.lower())
+                (data / "output_data" / name.lower()).mkdir(parents=True)
+        patch.setattr(workbook_cache, "WORKBOOK_CACHE_FOLDER", data / "cache" / "workbooks")
+        patch.setattr(lookup_cache, "LOOKUP_TABLES_FOLDER", data / "cache" / "lookup_tables")
+        yield data
+
+
+@pytest.fixture(scope="module")
+def bw_project(input_data):
+    """Brightway project in a temporary directory with the toy background databases and methods."""
+    import bw2data as bd
+
+    from code_folder.helpers.brightway_helpers import BrightwayHelpers
+
+    previous = (bd.projects._base_data_dir, bd.projects._base_logs_dir, bd.projects.current)
+    for folder in ("brightway", "brightway_logs"):
+        (input_data / folder).mkdir()
+    bd.projects.change_base_directories(input_data / "brightway", base_logs_dir=input_data / "brightway_logs", project_name="test")
+    BrightwayHelpers.configure_lookup_caches()
+    try:
+        bd.Database("biosphere3").write({
+            ("biosphere3", "co2"): {"name": "Carbon dioxide, fossil", "categories": ("air", "urban air close to ground"), "unit": "kilogram", "type": "emission"},
+            ("biosphere3", "so2"): {"name": "Sulfur dioxide", "categories": ("air",), "unit": "kilogram", "type": "emission"},
+        })
+        for name, factor in BACKGROUND_FACTORS.items():
+            bd.Database(name).write({
+                (name, "elec"): {"name": "electricity production", "location": "RER", "reference product": "electricity", "unit": "kilowatt hour", "exchanges": [
+                    {"input": (name, "elec"), "amount": 1, "type": "production"},
+                    {"input": ("biosphere3", "co2"), "amount": 0.5 * factor, "type": "biosphere"},
+                    {"input": ("biosphere3", "so2"), "amount": 0.001, "type": "biosphere"},
+                ]},
+                (name, "ni"): {"name": "nickel sulfate production", "location": "RER", "reference product": "nickel sulfate", "unit": "kilogram", "exchanges": [
+                    {"input": (name, "ni"), "amount": 1, "type": "production"},
+                    {"input": (name, "elec"), "amount": 2.0, "type": "technosphere"},
+                    {"input": ("biosphere3", "co2"), "amount": 3.0 * factor, "type": "biosphere"},
+                    {"input": ("biosphere3", "so2"), "amount": 0.02, "type": "biosphere"},
+                ]},
+                (name, "co"): {"name": "cobalt production", "location": "RER", "reference product": "cobalt", "unit": "kilogram", "exchanges": [
+                    {"input": (name, "co"), "amount": 1, "type": "production"},
+                    {"input": (name, "elec"), "amount": 5.0, "type": "technosphere"},
+                    {"input": ("biosphere3", "co2"), "amount": 8.0 * factor, "type": "biosphere"},
+                ]},
+            })
+        method = bd.Method(METHODS[0])
+        method.register()
+        method.write([(("biosphere3", "co2"), 1.0)])
+        method = bd.Method(METHODS[1])
+        method.register()
+        method.write([(("biosphere3", "so2"), 1.3)])
+        yield bd
+    finally:
+        bd.projects.change_base_directories(previous[0], base_logs_dir=previous[1], project_name=previous[2], update=False)
+        BrightwayHelpers.configure_lookup_caches()
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers.background_solver import BackgroundSolver
+
+A, B, CO2, SO2 = ("db", "a"), ("db", "b"), ("bio", "co2"), ("bio", "so2")
+
+
+def test_chunked_inventories_match_a_single_solve():
+    solver = BackgroundSolver(
+        technosphere_matrix=sparse.csr_matrix(np.array([[1.0, -0.5], [-0.2, 1.0]])),
+        biosphere_matrix=sparse.csr_matrix(np.array([[2.0, 1.0], [0.0, 3.0]])),
+        characterization_vectors={("EF v3.0", "climate change"): np.array([1.0, 0.0])},
+        product_index={A: 0, B: 1},
+        activity_index={A: 0, B: 1},
+        biosphere_index={CO2: 0, SO2: 1},
+    )
+    foreground = {("fg", "main"): {"exchanges": [
+        {"input": ("fg", "main"), "type": "production", "amount": -2.0},
+        {"input": B, "type": "technosphere", "amount": 1.0},
+        {"input": SO2, "type": "biosphere", "amount": 0.5},
+    ]}}
+    activity_keys = [A, B, ("fg", "main"), A, B]
+
+    chunked = solver.inventories(activity_keys, foreground=foreground, chunk_size=2)
+    single = solver.inventories(activity_keys, foreground=foreground, chunk_size=len(activity_keys))
+
+    assert chunked.shape == (2, 5)
+    np.testing.assert_allclose(chunked.toarray(), single.toarray())
+    supply = np.linalg.solve(solver.technosphere_matrix.toarray(), -np.eye(2))
+    np.testing.assert_allclose(chunked[:, :2].toarray(), solver.biosphere_matrix.toarray() @ supply)
+    assert solver.inventories([], chunk_size=2).shape == (2, 0)
@@ -0,0 +1,37 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.cli import load_run_config
+from code_folder.helpers.constants import Location, Route, RunConfig, Scenario
+
+
+def test_run_config_accepts_enum_names_and_values(tmp_path):
+    config_file = tmp_path / "run.json"
+    config_file.write_text(json.dumps({
+        "routes": ["PYRO_HYDRO", "BATT_LIBToDirectRecycling"],
+        "scenarios": ["OBS"],
+        "locations": ["EU27+4"],
+        "years": ["2030"],
+        "lcia_methods": [["EF v3.0", "climate change", "global warming potential (GWP100)"]],
+    }))
+
+    config = load_run_config(config_file)
+
+    assert config.routes == [Route.PYRO_HYDRO, Route.DIRECT]
+    assert config.scenarios == [Scenario.OBS]
+    assert config.locations == [Location.EU27_4]
+    assert config.years == [2030]
+    assert config.lcia_methods == [("EF v3.0", "climate change", "global warming potential (GWP100)")]
+    assert config.products == RunConfig().products
+
+
+def test_run_config_rejects_unknown_values(tmp_path):
+    config_file = tmp_path / "run.json"
+    config_file.write_text(json.dumps({"routes": ["NOT_A_ROUTE"]}))
+    with pytest.raises(ValueError):
+        load_run_config(config_file)
@@ -0,0 +1,137 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers.constants import ExchangeTerm, Location, Product, Route, Scenario, SingleLCI
+from code_folder.helpers.background_solver import BackgroundSolver
+from code_folder.helpers.exchange_terms import ExchangeTerms
+from code_folder.helpers.lca_builder import LCABuilder
+
+
+def _term(**kwargs):
+    defaults = dict(
+        role="main",
+        input=("bg", "act"),
+        type="technosphere",
+        label="flow",
+        builder_row=0,
+        sign=1.0,
+        builder_amount=1.0,
+        uses_amount=False,
+        factor=1.0,
+        numerator_rows=None,
+        scaling_rows=None,
+        per_input=False,
+    )
+    defaults.update(kwargs)
+    return ExchangeTerm(**defaults)
+
+
+def _lci(terms, lci_dict=None):
+    return SingleLCI(
+        route=Route.PYRO_HYDRO,
+        product=Product.battLiNMC111,
+        scenario=Scenario.BAU,
+        location=Location.EU27_4,
+        year=2030,
+        lci_dict=lci_dict or {},
+        main_activity_flow_name="main",
+        avoided_impacts_flow_name="avoided",
+        total_inflow_amount=100.0,
+        mfa_values=[60.0, 40.0, 50.0, 5.0],
+        mfa_flow_ids=["F_in", "F_in", "F_rec", "F_co"],
+        input_rows=[0, 1],
+        exchange_terms=terms,
+    )
+
+
+def test_evaluate_matches_builder_formulas():
+    lci = _lci([
+        # recovered from the RM: -(50 * 0.8) / 100
+        _term(role="avoided", sign=-1.0, factor=0.8, numerator_rows=[2], per_input=True),
+        # scaled by flows: 2 * 100 / 100 / 2
+        _term(builder_amount=2.0, uses_amount=True, factor=0.5, scaling_rows=[0, 1], per_input=True),
+        # read from the RM: 5 / 100
+        _term(numerator_rows=[3], per_input=True),
+        # fixed amount of a biosphere output
+        _term(type="biosphere", builder_amount=0.1, uses_amount=True),
+    ])
+
+    amounts = ExchangeTerms.evaluate(lci)
+
+    assert np.allclose(amounts, [[-0.4, 1.0, 0.05, 0.1]])
+
+
+def test_evaluate_scales_samples_and_amounts():
+    lci = _lci([
+        _term(numerator_rows=[3], per_input=True),
+        _term(builder_amount=0.1, uses_amount=True),
+    ])
+    samples = np.array([[60.0, 40.0, 50.0, 5.0], [120.0, 80.0, 50.0, 5.0]])
+
+    amounts = ExchangeTerms.evaluate(lci, mfa_values=samples, amount_factors=np.array([[1.0, 1.0], [3.0, 2.0]]))
+
+    assert np.allclose(amounts, [[0.05, 0.1], [0.025, 0.2]])
+
+
+def test_jacobian_matches_finite_differences():
+    lci = _lci([
+        _term(role="avoided", sign=-1.0, factor=0.8, numerator_rows=[2], per_input=True),
+        _term(builder_amount=2.0, uses_amount=True, factor=0.5, scaling_rows=[0, 1], numerator_rows=[3], per_input=True),
+        _term(builder_amount=0.1, uses_amount=True),
+    ])
+    values = np.asarray(lci.mfa_values)
+    step = 1e-6
+
+    finite_differences = np.vstack([
+        (ExchangeTerms.evaluate(lci, mfa_values=values + step * np.eye(len(values))[row]) - ExchangeTerms.evaluate(lci))[0] / step
+        for row in range(len(values))
+    ])
+
+    assert np.allclose(ExchangeTerms.jacobian(lci), finite_differences, atol=1e-6)
+    assert np.allclose(ExchangeTerms.amount_derivatives(lci), [0.0, 0.5 * 5.0 * 100.0 / 100.0, 1.0])
+
+
+def test_contributions_sum_to_the_activity_scores():
+    # elec emits 0.5 co2; ni uses 2 elec and emits 3 co2 (unit scores 0.5 and 4 for climate change)
+    solver = BackgroundSolver(
+        technosphere_matrix=sparse.csr_matrix(np.array([[1.0, -2.0], [0.0, 1.0]])),
+        biosphere_matrix=sparse.csr_matrix(np.array([[0.5, 3.0], [0.0, 0.2]])),
+        characterization_vectors={("EF v3.0", "climate change"): np.array([1.0, 0.0]), ("EF v3.0", "acidification"): np.array([0.0, 1.3])},
+        product_index={("bg", "elec"): 0, ("bg", "ni"): 1},
+        activity_index={("bg", "elec"): 0, ("bg", "ni"): 1},
+        biosphere_index={("bio", "co2"): 0, ("bio", "so2"): 1},
+    )
+    main, avoided = ("fg", "main"), ("fg", "avoided")
+    terms = [
+        _term(input=("bg", "elec"), label="electricity", builder_amount=2.0, uses_amount=True, scaling_rows=[0, 1], per_input=True),
+        _term(input=("bio", "co2"), type="biosphere", label="carbon dioxide", builder_amount=0.1, uses_amount=True),
+        _term(role="avoided", input=("bg", "ni"), label="nickel", sign=-1.0, factor=0.8, numerator_rows=[2], per_input=True),
+        _term(role="avoided", input=("bg", "elec"), label="electricity", sign=-1.0, builder_amount=0.5, uses_amount=True),
+    ]
+    amounts = ExchangeTerms.evaluate(_lci(terms))[0]
+    lci_dict = {
+        main: {"name": "main", "exchanges": [
+            {"input": main, "name": "main", "type": "production", "amount": -1},
+            {"input": ("bg", "elec"), "name": "electricity", "type": "technosphere", "amount": amounts[0]},
+            {"input": ("bio", "co2"), "name": "carbon dioxide", "type": "biosphere", "amount": amounts[1]},
+        ]},
+        avoided: {"name": "avoided", "exchanges": [
+            {"input": avoided, "name": "avoided", "type": "production", "amount": 1},
+            {"input": ("bg", "ni"), "name": "nickel", "type": "technosphere", "amount": amounts[2]},
+            {"input": ("bg", "elec"), "name": "electricity", "type": "technosphere", "amount": amounts[3]},
+        ]},
+    }
+
+    result = object.__new__(LCABuilder).compute_lcia_for_lci(lcia_methods=solver.methods, lci=_lci(terms, lci_dict), solver=solver)
+
+    assert result.total_impacts["climate change"] == pytest.approx(2.0 * 0.5 + 0.1)
+    for label in ("climate change", "acidification"):
+        assert sum(result.exchange_contributions["normal"][label].values()) == pytest.approx(result.total_impacts[label])
+        assert sum(result.exchange_contributions["avoided"][label].values()) == pytest.approx(result.avoided_impacts[label])
+        assert sum(result.impact_per_element[label].values()) == pytest.approx(result.avoided_impacts[label])
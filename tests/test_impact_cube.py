@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers.constants import Location, Product, Route, Scenario, SingleLCI, SingleLCIAResult
+from code_folder.helpers.impact_cube import ImpactCube
+
+
+def _result(product, year, inflow, normal, avoided):
+    lci = SingleLCI(
+        route=Route.PYRO_HYDRO,
+        product=product,
+        scenario=Scenario.BAU,
+        location=Location.EU27_4,
+        year=year,
+        lci_dict={},
+        main_activity_flow_name=f"main - {year}",
+        avoided_impacts_flow_name=f"avoided - {year}",
+        total_inflow_amount=inflow,
+    )
+    return SingleLCIAResult(total_impacts={"climate change": normal}, avoided_impacts={"climate change": avoided}, lci=lci)
+
+
+def test_cube_scales_by_inflow_and_rolls_up_over_products():
+    cube = ImpactCube.from_lcia_results([
+        _result(Product.battLiNMC111, 2030, 10, normal=2.0, avoided=0.5),
+        _result(Product.battLiNMC811, 2030, 4, normal=1.0, avoided=3.0),
+        _result(Product.battLiNMC111, 2040, 5, normal=1.0, avoided=1.0),
+    ])
+
+    single = cube.sel(product=Product.battLiNMC811, year=2030, scenario="BAU", location=Location.EU27_4, route=Route.PYRO_HYDRO, method="climate change")
+    assert single.dims == ("impact_type",)
+    np.testing.assert_allclose(single.values, [4.0, 12.0, -8.0])
+
+    totals = cube.rollup(["year", "impact_type"])
+    assert totals.coords["year"] == [2030, 2040]
+    np.testing.assert_allclose(totals.values, [[24.0, 17.0, 7.0], [5.0, 5.0, 0.0]])
+
+    # Missing combinations stay NaN instead of summing to zero
+    assert np.isnan(cube.sel(product=Product.battLiNMC811, year=2040).sum(["scenario", "location", "route"]).values).all()
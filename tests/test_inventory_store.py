@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers.constants import Location, Product, Route, Scenario, SingleLCI
+from code_folder.helpers.inventory_store import InventoryStore
+
+
+def _lci(year):
+    return SingleLCI(
+        route=Route.PYRO_HYDRO,
+        product=Product.battLiNMC111,
+        scenario=Scenario.BAU,
+        location=Location.EU27_4,
+        year=year,
+        lci_dict={},
+        main_activity_flow_name=f"main - {year}",
+        avoided_impacts_flow_name=f"avoided - {year}",
+        total_inflow_amount=1,
+    )
+
+
+def test_combine_aligns_biosphere_rows_and_reorders_entries():
+    first = ({("bio", "co2"): 0, ("bio", "so2"): 1}, sparse.csc_matrix(np.array([[1.0, 2.0], [0.0, 3.0]])), [_lci(2030)])
+    second = ({("bio", "so2"): 0, ("bio", "ch4"): 1}, sparse.csc_matrix(np.array([[4.0, 5.0], [6.0, 0.0]])), [_lci(2020)])
+
+    store = InventoryStore.combine([first, second]).reordered([1, 0])
+
+    assert store.biosphere_keys == [("bio", "co2"), ("bio", "so2"), ("bio", "ch4")]
+    assert [entry["year"] for entry in store.entries] == [2020, 2030]
+    np.testing.assert_allclose(store.matrix.toarray(), [[0, 0, 1, 2], [4, 5, 0, 3], [6, 0, 0, 0]])
+
+    characterization = np.array([[1.0], [10.0], [100.0]])
+    np.testing.assert_allclose(store.characterize(characterization)[:, 0], [640, 50, 1, 32])
@@ -0,0 +1,237 @@
+import sys
+import time
+from dataclasses import fields
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers.background_solver import BackgroundSolver
+from code_folder.helpers.brightway_helpers import BrightwayHelpers
+from code_folder.helpers.constants import ExchangeTerm, Location, Product, Route, Scenario
+from code_folder.helpers.inventory_store import InventoryStore
+from code_folder.helpers.lca_builder import LCABuilder
+from code_folder.helpers.storage_helper import StorageHelper
+from tests.conftest import BACKGROUND_FACTORS, METHODS, mfa_rows
+
+
+def _build(years, scenarios=(Scenario.BAU,), **kwargs):
+    builder = LCABuilder("fg")
+    builder.build_all_lcis(
+        route_selection=[Route.PYRO_HYDRO],
+        product_selection=[Product.battLiNMC111],
+        year_selection=list(years),
+        scenario_selection=list(scenarios),
+        location_selection=[Location.EU27_4],
+        add_scrap=False,
+        **kwargs,
+    )
+    return builder
+
+
+def _comparable(lci):
+    """Activities and metadata of an LCI, with foreground inputs named instead of keyed by their random codes.
+
+    The fields Database.write adds to the datasets (database, type and exchange outputs) are left out.
+    """
+    names = {key: activity["name"] for key, activity in lci.lci_dict.items()}
+    activities = {
+        activity["name"]: (
+            {field: value for field, value in activity.items() if field not in ("code", "exchanges", "database", "type")},
+            sorted(repr(sorted({**exchange, "input": names.get(tuple(exchange["input"]), exchange["input"]), "output": None}.items())) for exchange in activity["exchanges"]),
+        )
+        for activity in lci.lci_dict.values()
+    }
+    return activities, {field.name: getattr(lci, field.name) for field in fields(lci) if field.name != "lci_dict"}
+
+
+@pytest.mark.parametrize("scenario, year, expected", [
+    (Scenario.BAU, 2030, [("BAU_2030", 1.0)]),
+    (Scenario.REC, 2035, [("REC_2030", 0.5), ("REC_2040", 0.5)]),
+    (Scenario.OBS, 2024, [("BAU_2020", 0.6), ("BAU_2030", 0.4)]),
+    (Scenario.CIR, 2055, [("CIR_2050", 1.0)]),
+])
+def test_resolve_scenario_anchor_weights(scenario, year, expected):
+    weights = BrightwayHelpers.resolve_scenario_anchor_weights(scenario=scenario, year=year)
+    assert [name for name, _ in weights] == [name for name, _ in expected]
+    assert [weight for _, weight in weights] == pytest.approx([weight for _, weight in expected])
+
+
+def test_interpolated_score_is_the_linear_blend_of_the_anchor_scores(bw_project):
+    # The MFA values are the same every year, so only the background differs between the LCIs
+    builder = _build([2030, 2033, 2040])
+    builder.run_lcia(METHODS)
+    exact = {result.lci.year: result for result in builder.lcia_results}
+    builder.lcia_results = []
+    builder.run_interpolated_lcia(METHODS)
+    interpolated = {result.lci.year: result for result in builder.lcia_results}
+
+    for label in exact[2030].total_impacts:
+        for year, weight in ((2030, 0.0), (2033, 0.3), (2040, 1.0)):
+            for impacts in ("total_impacts", "avoided_impacts"):
+                blend = (1 - weight) * getattr(exact[2030], impacts)[label] + weight * getattr(exact[2040], impacts)[label]
+                assert getattr(interpolated[year], impacts)[label] == pytest.approx(blend)
+
+
+def test_scrap_anchor_activities_fall_back_to_the_lci_scrap_database(bw_project):
+    bw_project.Database("scrap_BAU_2033").write({("scrap_BAU_2033", "scrap"): {"name": "scrap", "location": "GLO", "unit": "kilogram", "exchanges": []}})
+    scrap_term = ExchangeTerm(
+        role="main", input=("scrap_BAU_2033", "scrap"), type="technosphere", label="scrap", builder_row=0, sign=1.0,
+        builder_amount=1.0, uses_amount=True, factor=1.0, numerator_rows=None, scaling_rows=None, per_input=False,
+        database="SCRAP", process_name="scrap", location="GLO",
+    )
+    lci = SimpleNamespace(scenario=Scenario.BAU, exchange_terms=[scrap_term], main_activity_flow_name="recycling")
+    weights = BrightwayHelpers.resolve_scenario_anchor_weights(scenario=Scenario.BAU, year=2033)
+
+    # Neither anchor scrap database exists, so both anchors keep the LCI's own scrap inputs
+    activities = LCABuilder._scrap_anchor_activities(lci, weights)
+    assert [activity.key for activity in activities] == [("scrap_BAU_2033", "scrap")]
+
+    del bw_project.databases["scrap_BAU_2033"]
+    with pytest.raises(ValueError, match="scrap_BAU_2030 .* scrap_BAU_2033"):
+        LCABuilder._scrap_anchor_activities(lci, weights)
+
+
+def test_relabeled_lci_matches_the_lci_built_directly(bw_project):
+    shared = _build([2030, 2031], scenarios=[Scenario.REC])
+    direct = _build([2031], scenarios=[Scenario.REC])
+    relabeled = next(lci for lci in shared.lcis if lci.year == 2031)
+    built = next(lci for lci in direct.lcis if lci.year == 2031)
+
+    assert not set(relabeled.lci_dict) & set(shared.lcis[0].lci_dict)
+    assert _comparable(relabeled) == _comparable(built)
+
+
+@pytest.mark.parametrize("column, value", [("Stock/Flow ID", "F_other"), ("Layer 3", "MnO"), ("Layer 4", "Mn"), ("Value", 61.0)])
+def test_mfa_fingerprint_covers_every_column_but_year_and_scenario(column, value):
+    mfa_df = pd.DataFrame(mfa_rows(2030, "BAU"))
+    relabeled = pd.DataFrame(mfa_rows(2031, "REC"))
+    changed = mfa_df.copy()
+    changed.loc[0, column] = value
+
+    assert LCABuilder._mfa_fingerprint(mfa_df) == LCABuilder._mfa_fingerprint(relabeled)
+    assert LCABuilder._mfa_fingerprint(mfa_df) != LCABuilder._mfa_fingerprint(changed)
+
+
+def test_pipelined_build_matches_build_all_lcis(bw_project):
+    selection = dict(
+        route_selection=[Route.PYRO_HYDRO],
+        product_selection=[Product.battLiNMC111],
+        year_selection=[2030, 2033],
+        scenario_selection=[Scenario.BAU, Scenario.REC],
+        location_selection=[Location.EU27_4],
+        add_scrap=False,
+    )
+    built = LCABuilder("fg")
+    built.build_all_lcis(**selection)
+    pipelined = LCABuilder("fg")
+    run_folder = pipelined.run_pipelined(**selection, lcia_methods=METHODS, prefetch=2)
+    pipelined_lcis = StorageHelper.load_pipeline_run(run_folder, prefix="lci")
+
+    key = lambda lci: (lci.scenario.value, lci.year)
+    assert [key(lci) for lci in sorted(pipelined_lcis, key=key)] == [key(lci) for lci in sorted(built.lcis, key=key)]
+    for pipelined_lci, lci in zip(sorted(pipelined_lcis, key=key), sorted(built.lcis, key=key)):
+        assert _comparable(pipelined_lci) == _comparable(lci)
+
+
+@pytest.mark.parametrize("prefetch", [1, 2])
+def test_prefetched_partitions_read_at_most_prefetch_partitions_ahead(prefetch):
+    builder = object.__new__(LCABuilder)
+    reads = []
+    builder._read_mfa_frames = lambda jobs: reads.append(jobs) or {}
+    partitions = {(2030 + index, Scenario.BAU): [index] for index in range(6)}
+
+    for index, (_, jobs, _) in enumerate(builder._prefetched_partitions(partitions, prefetch)):
+        time.sleep(0.05)
+        assert jobs == [index]
+        assert len(reads) <= index + 1 + prefetch
+    assert len(reads) == len(partitions)
+
+
+def test_lcis_are_scored_against_the_solver_of_their_own_background(bw_project, monkeypatch):
+    builder = LCABuilder("fg_partitioned", partition_by_background=True)
+    builder.build_all_lcis(
+        route_selection=[Route.PYRO_HYDRO],
+        product_selection=[Product.battLiNMC111],
+        year_selection=[2030, 2040],
+        scenario_selection=[Scenario.BAU, Scenario.REC],
+        location_selection=[Location.EU27_4],
+        add_scrap=False,
+    )
+    background_of = lambda lci: BrightwayHelpers.resolve_scenario_db_name(scenario=lci.scenario, year=lci.year)
+    assert sorted(background_of(lci) for lci in builder.lcis) == ["BAU_2030", "BAU_2040", "REC_2030", "REC_2040"]
+
+    solved = []
+    from_database = BackgroundSolver.from_database
+    monkeypatch.setattr(BackgroundSolver, "from_database", lambda database_name, lcia_methods: solved.append(database_name) or from_database(database_name, lcia_methods))
+
+    for solver, lci_indices in builder._lci_solvers(METHODS):
+        backgrounds = {database_name for database_name, _ in solver.product_index}
+        for lci_index in lci_indices:
+            lci = builder.lcis[lci_index]
+            assert backgrounds & set(BACKGROUND_FACTORS) == {background_of(lci)}
+            assert builder._lci_database_name(lci) == f"fg_partitioned__{background_of(lci)}"
+    assert sorted(solved) == [f"fg_partitioned__{name}" for name in ("BAU_2030", "BAU_2040", "REC_2030", "REC_2040")]
+
+
+def _assert_inventories_match_scores(builder):
+    inventories = builder.inventories
+    assert inventories.entries == [InventoryStore.entry(result.lci) for result in builder.lcia_results]
+    scores = inventories.characterize(InventoryStore.method_vectors(METHODS, inventories.biosphere_keys))
+    for index, result in enumerate(builder.lcia_results):
+        for column, (_, label, _) in enumerate(METHODS):
+            assert scores[2 * index, column] == pytest.approx(result.total_impacts[label])
+            assert scores[2 * index + 1, column] == pytest.approx(result.avoided_impacts[label])
+
+
+def test_inventories_are_stored_only_when_asked(bw_project):
+    selection = dict(year_selection=[2030, 2033], scenario_selection=[Scenario.BAU, Scenario.REC])
+    builder = _build(selection["year_selection"], scenarios=selection["scenario_selection"])
+    builder.run_lcia(METHODS)
+    assert builder.inventories is None
+
+    # A second run replaces the results, so they stay matched with the inventories
+    builder.run_lcia(METHODS, store_inventories=True)
+    assert len(builder.lcia_results) == len(builder.lcis)
+    _assert_inventories_match_scores(builder)
+
+    pipelined = LCABuilder("fg")
+    pipelined.run_pipelined(
+        route_selection=[Route.PYRO_HYDRO],
+        product_selection=[Product.battLiNMC111],
+        location_selection=[Location.EU27_4],
+        add_scrap=False,
+        lcia_methods=METHODS,
+        store_inventories=True,
+        **selection,
+    )
+    assert len(pipelined.lcia_results) == len(builder.lcis)
+    _assert_inventories_match_scores(pipelined)
+
+
+def test_scrap_databases_get_the_same_codes_in_every_project(bw_project, tmp_path, monkeypatch):
+    import code_folder.helpers.lca_builder as lca_builder
+
+    scrap_file = tmp_path / "scrap_processes.xlsx"
+    with pd.ExcelWriter(scrap_file) as writer:
+        pd.DataFrame([{"database": "ecoinvent", "activity name": "electricity production", "location": "RER", "amount": 0.5, "flow direction": "input", "categories": "", "reference product": "electricity"}]).to_excel(writer, sheet_name="battery scrap", index=False)
+    monkeypatch.setattr(lca_builder, "SCRAP_PROCESSES_FILE", scrap_file)
+
+    builder = LCABuilder("fg")
+    builder.background_db = bw_project.Database("BAU_2030")
+    builder.scrap = bw_project.Database("scrap_BAU_2033")
+    keys = [key for processes in builder.build_scrap_processes() for key in processes]
+    assert keys == [key for processes in builder.build_scrap_processes() for key in processes]
+
+    # A merged LCI linking to a scrap database built in another project copy gets it rebuilt with the same keys
+    scrap_term = ExchangeTerm(
+        role="main", input=keys[0], type="technosphere", label="battery scrap", builder_row=0, sign=1.0,
+        builder_amount=1.0, uses_amount=True, factor=1.0, numerator_rows=None, scaling_rows=None, per_input=False,
+        database="SCRAP", process_name="battery scrap", location="RER",
+    )
+    lci = SimpleNamespace(scenario=Scenario.BAU, year=2033, exchange_terms=[scrap_term])
+    builder._build_missing_scrap_databases([lci])
+    assert [activity.key for activity in bw_project.Database("scrap_BAU_2033")] == keys
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers import lookup_cache
+from code_folder.helpers.lookup_cache import LookupCache, LookupTable
+
+
+class DummyDatabase(list):
+    def __init__(self, name, nodes, modified):
+        super().__init__(nodes)
+        self.name = name
+        self.metadata = {"modified": modified}
+
+
+def test_eviction_policies_and_counters():
+    lru, fifo = LookupCache(max_size=2, policy="lru"), LookupCache(max_size=2, policy="fifo")
+    for cache in (lru, fifo):
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+    assert lru.get("a") == 1 and lru.get("b") is None
+    assert fifo.get("a") is None and fifo.get("b") == 2
+    assert lru.stats()["hits"] == 2 and lru.stats()["misses"] == 1 and lru.stats()["evictions"] == 1
+
+
+def test_lookup_table_resolves_keys_and_rebuilds_when_modified(tmp_path, monkeypatch):
+    monkeypatch.setattr(lookup_cache, "LOOKUP_TABLES_FOLDER", tmp_path)
+    monkeypatch.setattr(LookupTable, "_open", {})
+    nodes = [
+        {"name": "market for nickel", "location": "GLO", "reference product": "nickel", "code": "n1"},
+        {"name": "heat", "location": "RER", "reference product": "heat, district", "code": "h1"},
+        {"name": "heat", "location": "RER", "reference product": "heat, industrial", "code": "h2"},
+        {"name": "Carbon dioxide, fossil", "categories": ("air",), "code": "co2"},
+    ]
+    table = LookupTable.for_database(DummyDatabase("ei", nodes, "2024-01-01"))
+
+    assert table.get(LookupTable.activity_key("market for nickel", "GLO")) == "n1"
+    assert table.get(LookupTable.activity_key("heat", "RER")) is None
+    assert table.is_ambiguous(LookupTable.activity_key("heat", "RER"))
+    assert table.get(LookupTable.activity_key("heat", "RER", "heat, industrial")) == "h2"
+    assert table.get(LookupTable.flow_key("Carbon dioxide, fossil", ["air"])) == "co2"
+    assert table.get(LookupTable.flow_key("Carbon dioxide, fossil", ["water"])) is None
+
+    nodes[0]["code"] = "n2"
+    table = LookupTable.for_database(DummyDatabase("ei", nodes, "2024-02-01"))
+    assert table.get(LookupTable.activity_key("market for nickel", "GLO")) == "n2"
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers.mfa_reader import MFA_COLUMNS, MFAReader
+
+RM_OUTPUT = """Year,Scenario,Stock/Flow ID,Layer 1,Layer 2,Layer 3,Layer 4,Value
+2030,BAU,F_in,battLiNMC111,cell,NiO,Ni,60.0
+2030,BAU,F_in,battLiNMC111,NA,CoO,N/A,40.0
+2030,BAU,F_co,battLiNMC111,cell,Co,,5.0
+2030,REC,F_rec,battLiNMC111,,NiO,NA,50.0
+2031,BAU,F_in,battLiNMC811,cell,N/A,Ni,70.0
+"""
+
+
+def test_read_matches_read_csv_with_fillna(tmp_path):
+    path = tmp_path / "rm_output.csv"
+    path.write_text(RM_OUTPUT)
+    expected = pd.read_csv(path).fillna("")
+
+    mfa_df = MFAReader.read(path)
+    assert list(mfa_df.columns) == MFA_COLUMNS
+    pd.testing.assert_frame_equal(mfa_df.astype(object), expected[MFA_COLUMNS].astype(object))
+
+    filtered = MFAReader.read(path, flow_ids={"F_in", "F_rec"}, products={"battLiNMC111"}, years={2030}, scenarios={"BAU", "REC"})
+    assert filtered["Layer 4"].tolist() == ["Ni", "", ""]
+    assert filtered["Layer 2"].tolist() == ["cell", "", ""]
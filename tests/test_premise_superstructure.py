@@ -0,0 +1,57 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager, get_context
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder import premise_superstructure
+
+PROJECT = "premise_write_test"
+
+
+class _FakeNewDatabase:
+    """Stands in for premise's NewDatabase: writes a one-activity database."""
+    def write_db_to_brightway(self, name):
+        import bw2data as bw
+
+        bw.Database(name[0]).write({(name[0], "a"): {"name": "a", "unit": "kilogram", "exchanges": []}})
+
+
+def _create_project():
+    import bw2data as bw
+
+    bw.projects.set_current(PROJECT)
+
+
+def _write_after_both_loaded(db_name, barrier, write_lock):
+    import bw2data as bw
+
+    bw.projects.set_current(PROJECT)
+    # Both workers hold databases.json in memory before either writes, as with long premise updates
+    barrier.wait()
+    premise_superstructure._write_scenario_database(db_name, _FakeNewDatabase(), write_lock)
+
+
+def _registered_databases():
+    import bw2data as bw
+
+    bw.projects.set_current(PROJECT)
+    return sorted(bw.databases)
+
+
+def test_parallel_workers_keep_each_others_registrations(tmp_path, monkeypatch):
+    monkeypatch.setenv("BRIGHTWAY2_DIR", str(tmp_path))
+    context = get_context("spawn")
+    with context.Pool(1) as pool:
+        pool.apply(_create_project)
+
+    with Manager() as manager:
+        barrier, write_lock = manager.Barrier(2), manager.Lock()
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+            futures = [executor.submit(_write_after_both_loaded, db_name, barrier, write_lock) for db_name in ("db1", "db2")]
+            for future in futures:
+                future.result()
+
+    with context.Pool(1) as pool:
+        assert pool.apply(_registered_databases) == ["db1", "db2"]
@@ -0,0 +1,112 @@
+import json
+import pickle
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers import results_service
+from code_folder.helpers.constants import Location, Product, Route, Scenario, SingleLCI, SingleLCIAResult
+from code_folder.helpers.results_service import ResultsIndex, ResultsService
+
+
+def _result(scenario, year, score):
+    lci = SingleLCI(
+        route=Route.PYRO_HYDRO,
+        product=Product.battLiNMC111,
+        scenario=scenario,
+        location=Location.EU27_4,
+        year=year,
+        lci_dict={},
+        main_activity_flow_name="recycling",
+        avoided_impacts_flow_name="avoided",
+        total_inflow_amount=10,
+    )
+    return SingleLCIAResult(
+        total_impacts={"climate change": score},
+        avoided_impacts={"climate change": 1.0},
+        lci=lci,
+        exchange_contributions={"normal": {"climate change": {"electricity": score}}},
+    )
+
+
+def test_service_filters_caches_and_loads_new_partitions(tmp_path, monkeypatch):
+    run_folder = tmp_path / "pipeline_runs" / "pipeline_run_20250101_120000"
+    run_folder.mkdir(parents=True)
+    monkeypatch.setattr(results_service, "PIPELINE_RUNS_FOLDER", tmp_path / "pipeline_runs")
+    monkeypatch.setattr(results_service, "LOADABLE_LCIA_RESULTS_DATA_FOLDER", tmp_path / "missing")
+    with open(run_folder / "lcia_BAU_2030.pkl", "wb") as f:
+        pickle.dump([_result(Scenario.BAU, 2030, 3.0)], f)
+
+    index = ResultsIndex()
+    server = ResultsService.create(index, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{url}/scores?year=2030&impact_type=net") as response:
+            body = json.load(response)
+        assert body["rows"] == 1 and body["data"][0]["Score"] == 2.0 and body["data"][0]["Absolute"] == 20.0
+        urllib.request.urlopen(f"{url}/scores?year=2030&impact_type=net").read()
+        assert index.cache.hits == 1
+
+        with open(run_folder / "lcia_BAU_2040.pkl", "wb") as f:
+            pickle.dump([_result(Scenario.BAU, 2040, 5.0)], f)
+        assert index.refresh() and not index.refresh()
+        assert set(index.tables["scores"]["Year"]) == {2030, 2040}
+        with urllib.request.urlopen(f"{url}/contributions?year=2040") as response:
+            assert json.load(response)["data"][0]["Value"] == 5.0
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/scores?colour=red")
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class _SlowEntries(OrderedDict):
+    """Cache entries that give other threads time to run between a key lookup and its use."""
+    def __contains__(self, key):
+        found = super().__contains__(key)
+        time.sleep(0.001)
+        return found
+
+
+def test_concurrent_requests_share_a_small_cache(tmp_path, monkeypatch):
+    run_folder = tmp_path / "pipeline_runs" / "pipeline_run_20250101_120000"
+    run_folder.mkdir(parents=True)
+    monkeypatch.setattr(results_service, "PIPELINE_RUNS_FOLDER", tmp_path / "pipeline_runs")
+    monkeypatch.setattr(results_service, "LOADABLE_LCIA_RESULTS_DATA_FOLDER", tmp_path / "missing")
+    years = range(2030, 2034)
+    with open(run_folder / "lcia_BAU.pkl", "wb") as f:
+        pickle.dump([_result(Scenario.BAU, year, float(year - 2025)) for year in years], f)
+
+    # Two cached responses for four distinct queries, so requests keep evicting each other's entries
+    index = ResultsIndex(cache_size=2)
+    index.refresh()
+    index.cache._entries = _SlowEntries()
+    errors = []
+
+    # Each thread answers requests like one of the server's request threads
+    def request(worker):
+        try:
+            for step in range(50):
+                year = years[(worker + step) % len(years)]
+                body = json.loads(index.response("scores", {"year": [str(year)], "impact_type": ["normal"]}))
+                assert body["data"][0]["Score"] == year - 2025
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=request, args=(worker,)) for worker in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert not errors
+    assert index.cache.hits + index.cache.misses == 8 * 50
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers.constants import Location, Product, Route, Scenario, SingleLCI, SingleLCIAResult
+from code_folder.helpers.run_diff import RunDiff
+
+
+def _result(year, code, electricity, score):
+    main = ("fg", code)
+    lci = SingleLCI(
+        route=Route.PYRO_HYDRO,
+        product=Product.battLiNMC111,
+        scenario=Scenario.BAU,
+        location=Location.EU27_4,
+        year=year,
+        lci_dict={main: {"name": f"recycling - {year}", "exchanges": [
+            {"input": main, "type": "production", "amount": -1},
+            {"input": ("BAU_2030", "elec"), "type": "technosphere", "amount": electricity},
+        ]}},
+        main_activity_flow_name=f"recycling - {year}",
+        avoided_impacts_flow_name=f"avoided - {year}",
+        total_inflow_amount=1,
+    )
+    return SingleLCIAResult(total_impacts={"climate change": score}, avoided_impacts={"climate change": 1.0}, lci=lci)
+
+
+def test_diff_aligns_lcis_across_foreground_codes():
+    old = [_result(2030, "a", 2.0, 10.0), _result(2040, "b", 2.0, 10.0)]
+    new = [_result(2030, "c", 2.0 + 1e-9, 10.0 + 1e-9), _result(2040, "d", 2.5, 12.5), _result(2050, "e", 1.0, 5.0)]
+
+    summary, exchanges, scores = RunDiff.diff(old, new, rel_tol=1e-6)
+
+    assert dict(zip(summary["Year"], summary["Status"])) == {2030: "kept", 2040: "changed", 2050: "added"}
+    changed = exchanges[exchanges["Status"] == "changed"]
+    assert changed[["Year", "Input", "Delta"]].values.tolist() == [[2040, "BAU_2030:elec", 0.5]]
+    assert scores[scores["Status"] == "changed"][["Year", "Impact_type", "Relative delta"]].values.tolist() == [[2040, "normal", 0.25]]
+    assert set(scores[scores["Year"] == 2050]["Status"]) == {"added"}
+
+
+def test_diff_against_an_empty_run_reports_added_lcis_without_scores():
+    summary, exchanges, scores = RunDiff.diff([], [_result(2030, "a", 2.0, 10.0)])
+
+    assert summary[["Year", "Status", "Changed scores"]].values.tolist() == [[2030, "added", 0]]
+    assert set(exchanges["Status"]) == {"added"}
+    assert scores.empty
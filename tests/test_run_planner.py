@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers.constants import Location, Product, Route, RunConfig, Scenario
+from code_folder.helpers.run_planner import RunPlanner
+
+
+def _plan(config: RunConfig):
+    return RunPlanner.plan(
+        route_selection=config.routes,
+        product_selection=config.products,
+        year_selection=config.years,
+        scenario_selection=config.scenarios,
+        location_selection=config.locations,
+        use_superstructure=config.use_superstructure,
+    )
+
+
+def test_run_config_expands_to_lci_job_partitions(input_data):
+    config = RunConfig(
+        routes=[Route.PYRO_HYDRO, Route.HYDRO],
+        products=[Product.battLiNMC111, Product.battLiNMC811],
+        years=[2030, 2020, 2033, 2030, 2045],
+        scenarios=[Scenario.BAU, Scenario.OBS],
+        locations=[Location.EU27_4],
+    )
+    plan = _plan(config)
+    partitions = RunPlanner.partitions(plan)
+
+    # 2030 is planned once, OBS only covers historic years and the toy MFA data covers 2025-2040
+    assert list(partitions) == [(2030, Scenario.BAU), (2033, Scenario.BAU)]
+    for (year, scenario), jobs in partitions.items():
+        assert [(job.route, job.product, job.location) for job in jobs] == [(Route.PYRO_HYDRO, Product.battLiNMC111, Location.EU27_4)]
+        assert jobs[0].background_db == "BAU_2030"
+        assert jobs[0].scrap_db == f"scrap_BAU_{year}"
+    assert plan.skipped == {
+        "year not supported for scenario": 4 * 4,
+        "no lci_builder sheet for product": 4,
+        "route input files missing": 4 * 2,
+        "no MFA data for year and scenario": 2,
+    }
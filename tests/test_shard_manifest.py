@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.cli import load_run_config_dict
+from code_folder.helpers.constants import ExchangeTerm, Location, Product, Route, RunConfig, Scenario, SingleLCI
+from code_folder.helpers.shard_manifest import ShardManifest
+
+
+def test_shard_config_round_trips_and_lcis_are_rekeyed():
+    config = RunConfig(routes=[Route.PYRO_HYDRO], scenarios=[Scenario.BAU], partition_by_background=True)
+    assert load_run_config_dict(ShardManifest.config_to_dict(config)) == config
+
+    main, avoided = ("batt_shard_002__BAU_2030", "main"), ("batt_shard_002__BAU_2030", "avoided")
+    lci = SingleLCI(
+        route=Route.PYRO_HYDRO,
+        product=Product.battLiNMC111,
+        scenario=Scenario.BAU,
+        location=Location.EU27_4,
+        year=2030,
+        lci_dict={
+            main: {"name": "main", "exchanges": [{"input": main, "output": main, "type": "production", "amount": -1}, {"input": ("BAU_2030", "elec"), "output": main, "type": "technosphere", "amount": 2.0}]},
+            avoided: {"name": "avoided", "exchanges": [{"input": avoided, "output": avoided, "type": "production", "amount": 1}]},
+        },
+        main_activity_flow_name="main",
+        avoided_impacts_flow_name="avoided",
+        total_inflow_amount=10,
+        exchange_terms=[ExchangeTerm(role="main", input=("BAU_2030", "elec"), type="technosphere", label="electricity", builder_row=2, sign=1.0, builder_amount=2.0, uses_amount=True, factor=1.0, numerator_rows=None, scaling_rows=None, per_input=False)],
+        database_name="batt_shard_002__BAU_2030",
+    )
+
+    rekeyed = ShardManifest._rekey(lci, "batt_shard_002", "batt")
+
+    assert rekeyed.database_name == "batt__BAU_2030"
+    assert set(rekeyed.lci_dict) == {("batt__BAU_2030", "main"), ("batt__BAU_2030", "avoided")}
+    exchanges = rekeyed.lci_dict[("batt__BAU_2030", "main")]["exchanges"]
+    assert [exchange["input"] for exchange in exchanges] == [("batt__BAU_2030", "main"), ("BAU_2030", "elec")]
+    assert {exchange["output"] for exchange in exchanges} == {("batt__BAU_2030", "main")}
+    assert rekeyed.exchange_terms[0].input == ("BAU_2030", "elec")
+    # The shard's own LCI is left untouched
+    assert main in lci.lci_dict
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers.background_solver import BackgroundSolver
+from code_folder.helpers.superstructure_solver import SuperstructureSolver
+
+A, B, CO2, SO2 = ("db", "a"), ("db", "b"), ("bio", "co2"), ("bio", "so2")
+SCENARIO = "remind - SSP2-Base - 2030"
+
+
+def _solver():
+    # b consumes 0.5 a; a emits 2 co2. Technosphere inputs are stored negative.
+    base = BackgroundSolver(
+        technosphere_matrix=sparse.csr_matrix(np.array([[1.0, -0.5], [0.0, 1.0]])),
+        biosphere_matrix=sparse.csr_matrix(np.array([[2.0, 0.0], [0.0, 0.0]])),
+        characterization_vectors={("EF v3.0", "climate change"): np.array([1.0, 0.0]), ("EF v3.0", "acidification"): np.array([0.0, 1.0])},
+        product_index={A: 0, B: 1},
+        activity_index={A: 0, B: 1},
+        biosphere_index={CO2: 0, SO2: 1},
+    )
+    difference_df = pd.DataFrame(
+        [
+            (A, B, "technosphere", 0.8),   # replaces the existing input of a into b
+            (B, A, "technosphere", 0.1),   # input missing from the base matrix
+            (A, A, "production", 2.0),     # replaces the production amount
+            (CO2, A, "biosphere", 1.5),    # duplicate rows of one exchange are summed
+            (CO2, A, "biosphere", 1.0),
+            (SO2, B, "biosphere", 0.4),    # flow missing from the base matrix
+            (("db", "unknown"), B, "technosphere", 9.0),  # not in the matrices: ignored
+        ],
+        columns=["from key", "to key", "flow type", SCENARIO],
+    )
+    return SuperstructureSolver(base, difference_df)
+
+
+def test_for_scenario_patches_replaced_added_and_duplicate_entries_with_matrix_signs():
+    solver = _solver()
+    scenario = solver.for_scenario(SCENARIO)
+
+    technosphere = np.array([[2.0, -0.8], [-0.1, 1.0]])
+    biosphere = np.array([[2.5, 0.0], [0.0, 0.4]])
+    np.testing.assert_allclose(scenario.technosphere_matrix.toarray(), technosphere)
+    np.testing.assert_allclose(scenario.biosphere_matrix.toarray(), biosphere)
+    # The base matrices are left untouched
+    np.testing.assert_allclose(solver.base.technosphere_matrix.toarray(), [[1.0, -0.5], [0.0, 1.0]])
+
+    expected = np.linalg.solve(technosphere.T, biosphere.T @ np.eye(2))
+    np.testing.assert_allclose(scenario.unit_scores, expected)
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from code_folder.helpers.constants import Location, Product, Route, Scenario, SingleLCI
+from code_folder.helpers.inventory_store import InventoryStore
+from code_folder.helpers.system_processes import SystemProcessHelper
+
+
+def _lci(product=Product.battLiNMC111):
+    return SingleLCI(
+        route=Route.PYRO_HYDRO,
+        product=product,
+        scenario=Scenario.BAU,
+        location=Location.EU27_4,
+        year=2030,
+        lci_dict={
+            ("fg", "m"): {"name": "recycling", "exchanges": [{"input": ("fg", "m"), "type": "production", "amount": -1}]},
+            ("fg", "a"): {"name": "avoided", "exchanges": [{"input": ("fg", "a"), "type": "production", "amount": 1}]},
+        },
+        main_activity_flow_name="recycling",
+        avoided_impacts_flow_name="avoided",
+        total_inflow_amount=1,
+    )
+
+
+def test_system_processes_hold_the_flows_of_their_own_production(monkeypatch):
+    monkeypatch.setattr(SystemProcessHelper, "flow_metadata", staticmethod(lambda keys: {("bio", "co2"): {"name": "Carbon dioxide", "categories": ("air",), "unit": "kilogram"}}))
+    lci = _lci()
+    # Inventories for the LCIA demand of -1: 3 kg CO2 for the main activity, a 2 kg credit for the avoided one
+    store = InventoryStore.combine([({("bio", "co2"): 0, ("bio", "so2"): 1}, sparse.csc_matrix(np.array([[3.0, -2.0], [0.0, 0.0]])), [lci])])
+
+    data, table = SystemProcessHelper.build(store, [lci], "fg_system")
+
+    processes = {activity["name"]: activity["exchanges"] for activity in data.values()}
+    assert [(exchange["type"], exchange["amount"]) for exchange in processes["recycling (BATT_LIBToPyro1, battLiNMC111, main)"]] == [("production", -1), ("biosphere", 3.0)]
+    assert [(exchange["type"], exchange["amount"]) for exchange in processes["avoided (BATT_LIBToPyro1, battLiNMC111, avoided)"]] == [("production", 1), ("biosphere", 2.0)]
+    assert table[["Role", "Flow name", "Categories", "Amount"]].values.tolist() == [["avoided", "Carbon dioxide", "air", 2.0], ["main", "Carbon dioxide", "air", 3.0]]
+
+
+def test_system_processes_merge_repeated_lcis_but_not_products(monkeypatch):
+    monkeypatch.setattr(SystemProcessHelper, "flow_metadata", staticmethod(lambda keys: {}))
+    matrix = sparse.csc_matrix(np.array([[3.0, -2.0, 3.0, -2.0]]))
+
+    # The location is not part of the key, so LCIs that repeat everything else share their processes
+    repeated = [_lci(), _lci()]
+    data, _ = SystemProcessHelper.build(InventoryStore.combine([({("bio", "co2"): 0}, matrix, repeated)]), repeated, "fg_system")
+    assert sorted(activity["name"] for activity in data.values()) == ["avoided (BATT_LIBToPyro1, battLiNMC111, avoided)", "recycling (BATT_LIBToPyro1, battLiNMC111, main)"]
+
+    # Products whose builder sheets share a flow name get one process each, with different names
+    products = [_lci(product=Product.battLiNMC111), _lci(product=Product.battLiNMC811)]
+    data, table = SystemProcessHelper.build(InventoryStore.combine([({("bio", "co2"): 0}, matrix, products)]), products, "fg_system")
+    main_processes = [activity for activity in data.values() if activity["exchanges"][0]["amount"] == -1]
+    assert sorted(activity["name"] for activity in main_processes) == ["recycling (BATT_LIBToPyro1, battLiNMC111, main)", "recycling (BATT_LIBToPyro1, battLiNMC811, main)"]
+    assert len(data) == 4 and table["Activity"].nunique() == 4
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import code_folder.helpers.workbook_cache as workbook_cache
+from code_folder.helpers.workbook_cache import WorkbookCache
+
+
+def test_sheets_are_read_from_cache_until_content_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(workbook_cache, "WORKBOOK_CACHE_FOLDER", tmp_path / "cache")
+    workbook = tmp_path / "lci_builder.xlsx"
+    with pd.ExcelWriter(workbook) as writer:
+        pd.DataFrame({"Layer": ["1", None], "Amount": [1.5, 2.0]}).to_excel(writer, sheet_name="first", index=False)
+        pd.DataFrame({"Materials": ["Co"]}).to_excel(writer, sheet_name="second", index=False)
+
+    sheets = WorkbookCache.load(workbook, dtype={"Layer": str})
+    assert list(sheets) == ["first", "second"]
+    assert (tmp_path / "cache").exists()
+
+    WorkbookCache._memory.clear()
+    cached = WorkbookCache.load(workbook, dtype={"Layer": str})
+    pd.testing.assert_frame_equal(cached["first"], sheets["first"])
+
+    with pd.ExcelWriter(workbook) as writer:
+        pd.DataFrame({"Materials": ["Ni"]}).to_excel(writer, sheet_name="second", index=False)
+    WorkbookCache._memory.clear()
+    assert WorkbookCache.sheet_names(workbook, dtype={"Layer": str}) == ["second"]